@@ -0,0 +1,159 @@
+"""
+Runs the benchmark workloads in `workloads.py`, reporting the time per call and the peak memory allocated by one call
+(except for workloads that run in a subprocess), and optionally saves the results as a baseline or compares them
+against a saved baseline.
+
+Examples
+--------
+Save a baseline on the main branch, then compare a change against it::
+
+    python benchmarks/run.py --save baseline.json
+    python benchmarks/run.py --compare baseline.json
+
+The comparison exits with status 1 if any workload is slower or uses more memory than the baseline by more than the
+threshold, so it can gate CI jobs. Run on an otherwise idle machine, and prefer comparing runs from the same machine.
+"""
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+# benchmark the checkout this script is in rather than an installed version
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from workloads import SUBPROCESS_WORKLOADS, WORKLOADS  # noqa: E402
+
+
+def measure(setup, min_time=0.2, repeat=5, memory=True):
+    """
+    Returns the fastest time per call in seconds over `repeat` rounds, where each round calls the workload enough times
+    to run for at least `min_time` seconds, and the peak memory in bytes allocated by one call (None if `memory` is
+    False).
+    """
+    func = setup()
+    func()  # warm up caches and lazy imports
+
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+
+    times = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {'time': min(times), 'peak_memory': peak, 'calls': number * repeat}
+
+
+def run(patterns=None, min_time=0.2, repeat=5):
+    """Measures the workloads whose names match any of the `fnmatch` `patterns` (all if None)."""
+    results = {}
+    for name, setup in WORKLOADS.items():
+        if patterns and not any(fnmatch.fnmatch(name, p) for p in patterns):
+            continue
+        results[name] = measure(setup, min_time, repeat, memory=name not in SUBPROCESS_WORKLOADS)
+        print(f'{name:<45} {_format_time(results[name]["time"]):>10} {_format_bytes(results[name]["peak_memory"]):>10}',
+              flush=True)
+    return results
+
+
+def compare(results, baseline, threshold=0.1):
+    """
+    Prints the ratio of each result to the baseline and returns the names of workloads whose time or peak memory
+    exceeds the baseline by more than `threshold` (a fraction).
+    """
+    regressions = []
+    print(f'\n{"workload":<45} {"time":>10} {"baseline":>10} {"ratio":>7} {"memory":>10} {"baseline":>10} {"ratio":>7}')
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f'{name:<45} {_format_time(result["time"]):>10} {"new":>10}')
+            continue
+        time_ratio = result['time'] / base['time']
+        memory = (result['peak_memory'], base['peak_memory'])
+        mem_ratio = memory[0] / memory[1] if all(memory) else 1.0
+        flag = ''
+        if time_ratio > 1 + threshold or mem_ratio > 1 + threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        elif time_ratio < 1 - threshold:
+            flag = '  faster'
+        print(f'{name:<45} {_format_time(result["time"]):>10} {_format_time(base["time"]):>10} {time_ratio:>7.2f} '
+              f'{_format_bytes(result["peak_memory"]):>10} {_format_bytes(base["peak_memory"]):>10} {mem_ratio:>7.2f}'
+              f'{flag}')
+    return regressions
+
+
+def environment():
+    return {'python': sys.version.split()[0], 'numpy': np.__version__, 'platform': platform.platform(),
+            'machine': platform.machine()}
+
+
+def _format_time(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.2f}{unit}'
+    return f'{seconds / 1e-9:.0f}ns'
+
+
+def _format_bytes(n):
+    if n is None:
+        return '-'
+    for unit, scale in (('MB', 2 ** 20), ('KB', 2 ** 10)):
+        if n >= scale:
+            return f'{n / scale:.1f}{unit}'
+    return f'{n}B'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run cred benchmarks.')
+    parser.add_argument('patterns', nargs='*', help='only run workloads matching these glob patterns')
+    parser.add_argument('--save', help='save results to this JSON file')
+    parser.add_argument('--compare', help='compare results to this saved JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='fraction slower or larger than the baseline reported as a regression (default: 0.1)')
+    parser.add_argument('--min-time', type=float, default=0.2, help='minimum seconds per round (default: 0.2)')
+    parser.add_argument('--repeat', type=int, default=5, help='number of rounds (default: 5)')
+    parser.add_argument('--list', action='store_true', help='list workloads and exit')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print('\n'.join(WORKLOADS))
+        return 0
+
+    results = run(args.patterns, args.min_time, args.repeat)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            print(f'\n{len(regressions)} regression(s): {", ".join(regressions)}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
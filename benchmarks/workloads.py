@@ -0,0 +1,279 @@
+"""
+Benchmark workloads. Each workload is a function decorated with `benchmark` that does any setup and returns a
+function with no arguments that runs the measured operation once.
+"""
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+from cred import businessdays
+from cred import Defeasance, DelayedDrawBorrowing, FederalReserveHolidays, FixedRateBorrowing, FlatCurve, \
+    FloatingRateBorrowing, Monthly, OpenPrepayment, Portfolio, SimpleYieldMaintenance, StepDown, ZeroCurve, following
+from cred.analytics import portfolio_analytics
+from cred.modification import CouponChange, modify
+from cred.montecarlo import HullWhite, MonteCarlo
+from cred.sensitivity import Sensitivity
+from cred.solvers import coupon_for_payment, level_payment
+from cred.synthetic import LoanGenerator
+
+
+WORKLOADS = {}
+# workloads that run in a subprocess, whose memory is not allocated in the benchmark process
+SUBPROCESS_WORKLOADS = set()
+
+START = datetime(2020, 1, 15)
+
+
+def benchmark(name, in_subprocess=False):
+    """Registers a workload under `name`. Pass `in_subprocess=True` if the workload runs in a subprocess, so its peak
+    memory is not measured."""
+    def register(func):
+        WORKLOADS[name] = func
+        if in_subprocess:
+            SUBPROCESS_WORKLOADS.add(name)
+        return func
+    return register
+
+
+def make_borrowing(years=10, months=1, calendar=False, prepayment=None):
+    return FixedRateBorrowing(
+        start_date=START,
+        end_date=START + relativedelta(years=years),
+        freq=Monthly(months),
+        initial_principal=10_000_000.0,
+        coupon=0.045,
+        amort_periods=360 // months,
+        holiday_calendar=FederalReserveHolidays() if calendar else None,
+        pmt_convention=following,
+        prepayment=prepayment
+    )
+
+
+def _schedule(years, months, calendar):
+    def setup():
+        borrowing = make_borrowing(years, months, calendar)
+        return borrowing.schedule
+    return setup
+
+
+for _years in (5, 10, 30):
+    for _months, _freq in ((1, 'monthly'), (3, 'quarterly')):
+        for _calendar in (False, True):
+            benchmark(f'schedule_{_years}y_{_freq}{"_calendar" if _calendar else ""}')(
+                _schedule(_years, _months, _calendar))
+
+
+@benchmark('schedule_10y_monthly_calendar_floating')
+def floating_schedule():
+    curve = ZeroCurve(START, [START + relativedelta(years=1), START + relativedelta(years=10)], [0.01, 0.03])
+    borrowing = FloatingRateBorrowing(START, START + relativedelta(years=10), Monthly(1), 10_000_000.0, curve,
+                                      spread=0.02, floor=0.0, reset_lag=2, rounding=5,
+                                      holiday_calendar=FederalReserveHolidays(), pmt_convention=following)
+
+    def run():
+        # reassigning a term drops the cached index rates and cash flows
+        borrowing.spread = borrowing.spread
+        borrowing.schedule()
+    return run
+
+
+@benchmark('cash_flows_10y_calendar')
+def cash_flows():
+    borrowing = make_borrowing(calendar=True)
+
+    def run():
+        # reassigning a term drops the cached cash flows
+        borrowing.coupon = borrowing.coupon
+        borrowing.cash_flows()
+    return run
+
+
+def _date_grid(years=10, step_days=73):
+    end = START + relativedelta(years=years)
+    dts = []
+    dt = START
+    while dt < end:
+        dts.append(dt)
+        dt += relativedelta(days=step_days)
+    return dts
+
+
+@benchmark('date_index_10y_50_dates')
+def date_index():
+    borrowing = make_borrowing(calendar=True)
+    dts = _date_grid()
+
+    def run():
+        for dt in dts:
+            borrowing.date_index(dt)
+    return run
+
+
+@benchmark('outstanding_principal_10y_50_dates')
+def outstanding_principal():
+    borrowing = make_borrowing(calendar=True)
+    dts = _date_grid()
+
+    def run():
+        for dt in dts:
+            borrowing.outstanding_principal(dt)
+    return run
+
+
+@benchmark('outstanding_principals_10y_50_dates')
+def outstanding_principals():
+    borrowing = make_borrowing(calendar=True)
+    dts = _date_grid()
+    return lambda: borrowing.outstanding_principals(dts)
+
+
+PREPAYMENTS = {
+    'open': lambda: OpenPrepayment(),
+    'step_down': lambda: StepDown([Monthly(12), Monthly(24), Monthly(36)], [0.03, 0.02, 0.01]),
+    'defeasance': lambda: Defeasance(FlatCurve(0.02), open_dt_offset=Monthly(114)),
+    'yield_maintenance': lambda: SimpleYieldMaintenance(FlatCurve(0.02).zero_rate, margin=0.005,
+                                                        open_dt_offset=Monthly(114)),
+}
+
+
+def _required_repayment(name):
+    def setup():
+        borrowing = make_borrowing(calendar=True, prepayment=PREPAYMENTS[name]())
+        dts = _date_grid(step_days=146)
+
+        def run():
+            # quotes share periods within the borrowing context
+            with borrowing:
+                for dt in dts:
+                    borrowing.prepayment.required_repayment(borrowing, dt)
+        return run
+    return setup
+
+
+for _name in PREPAYMENTS:
+    benchmark(f'required_repayment_{_name}_25_dates')(_required_repayment(_name))
+
+
+@benchmark('required_repayment_open_uncached_1_date')
+def required_repayment_uncached():
+    # outside of the borrowing context every period is rebuilt for each quote
+    borrowing = make_borrowing(calendar=True, prepayment=PREPAYMENTS['open']())
+    dt = START + relativedelta(years=5, days=10)
+    return lambda: borrowing.prepayment.required_repayment(borrowing, dt)
+
+
+@benchmark('required_repayments_defeasance_25_dates')
+def required_repayments():
+    borrowing = make_borrowing(calendar=True, prepayment=PREPAYMENTS['defeasance']())
+    dts = _date_grid(step_days=146)
+    return lambda: borrowing.prepayment.required_repayments(borrowing, dts)
+
+
+@benchmark('cash_flows_100_synthetic_loans')
+def synthetic_cash_flows():
+    loans = list(LoanGenerator(seed=0).borrowings(100))
+
+    def run():
+        for _, borrowing in loans:
+            borrowing.initial_principal = borrowing.initial_principal
+            borrowing.cash_flows()
+    return run
+
+
+@benchmark('generate_10000_synthetic_loans')
+def synthetic_columns():
+    return lambda: LoanGenerator(seed=0).columns(0, 10_000)
+
+
+@benchmark('monte_carlo_defeasance_10000_paths_12_dates')
+def monte_carlo_defeasance():
+    curve = ZeroCurve(START, [START + relativedelta(years=1), START + relativedelta(years=10)], [0.01, 0.03])
+    borrowing = make_borrowing(prepayment=Defeasance(df_func=curve))
+    engine = MonteCarlo(HullWhite(curve, START, mean_reversion=0.03, volatility=0.01), n_paths=10_000)
+    dts = [START + relativedelta(months=6 * i) for i in range(12)]
+    return lambda: engine.prepayment_costs(borrowing, dts)
+
+
+@benchmark('key_rate_dv01_1000_synthetic_loans')
+def key_rate_dv01():
+    curve = ZeroCurve(START, [START + relativedelta(years=1), START + relativedelta(years=10)], [0.01, 0.03])
+    portfolio = Portfolio([b for _, b in LoanGenerator(seed=0).borrowings(1000)])
+    portfolio.cash_flows()
+    sensitivity = Sensitivity(curve, START)
+    return lambda: sensitivity.portfolio_values(portfolio)
+
+
+@benchmark('analytics_1000_synthetic_loans')
+def loan_analytics():
+    portfolio = Portfolio([b for _, b in LoanGenerator(seed=0).borrowings(1000)])
+    portfolio.cash_flows()
+    return lambda: portfolio_analytics(portfolio)
+
+
+@benchmark('coupon_for_payment_10000_loans')
+def coupon_solver():
+    principal = np.linspace(1e5, 1e7, 10_000)
+    payments = level_payment(principal, np.linspace(0.0, 0.1, 10_000), 360)
+    return lambda: coupon_for_payment(payments, principal, 360)
+
+
+@benchmark('modify_coupon_year_9_10y_monthly')
+def modify_coupon():
+    borrowing = make_borrowing()
+    borrowing.cash_flows()
+    return lambda: modify(borrowing, CouponChange(0.06, 108))
+
+
+@benchmark('delayed_draw_500_draws_10y_monthly')
+def delayed_draw():
+    draws = {START + relativedelta(days=7 * i): 10_000.0 for i in range(500)}
+
+    def run():
+        borrowing = DelayedDrawBorrowing(START, START + relativedelta(years=10), Monthly(1), 10_000_000.0, 0.05,
+                                         draws=draws, initial_principal=1_000_000.0, unused_fee_rate=0.0025)
+        return borrowing.cash_flows()
+    return run
+
+
+@benchmark('construct_calendar_cold')
+def construct_cold():
+    def run():
+        businessdays._shared_holidays.clear()
+        businessdays._shared_calendars.clear()
+        make_borrowing(calendar=True)
+    return run
+
+
+@benchmark('construct_calendar_warm')
+def construct_warm():
+    make_borrowing(calendar=True)
+    return lambda: make_borrowing(calendar=True)
+
+
+def _import(statement):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+
+    def run():
+        subprocess.run([sys.executable, '-c', statement], check=True, env=env)
+    return run
+
+
+@benchmark('import_python', in_subprocess=True)
+def import_python():
+    return _import('pass')
+
+
+@benchmark('import_cred', in_subprocess=True)
+def import_cred():
+    return _import('import cred')
+
+
+@benchmark('import_cred_schedule', in_subprocess=True)
+def import_cred_schedule():
+    return _import('import cred; from datetime import datetime; '
+                   'cred.FixedRateBorrowing(datetime(2020, 1, 1), datetime(2030, 1, 1), cred.Monthly(1), 1.0, 0.05)'
+                   '.schedule()')
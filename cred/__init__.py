@@ -1,5 +1,48 @@
-from .borrowing import PeriodicBorrowing, FixedRateBorrowing
-from .interest_rate import actual360, thirty360
-from .businessdays import unadjusted, modified_following, preceding, following, FederalReserveHolidays, \
-    LondonBankHolidays, Monthly
-from .prepayment import BasePrepayment, Defeasance, OpenPrepayment, SimpleYieldMaintenance, StepDown
+import importlib
+
+
+# public names and the submodules that define them, imported on first access so that `import cred` does not load
+# pandas or modules that are not used
+_exports = {
+    'PeriodicBorrowing': 'borrowing',
+    'FixedRateBorrowing': 'borrowing',
+    'FloatingRateBorrowing': 'borrowing',
+    'DelayedDrawBorrowing': 'borrowing',
+    'actual360': 'interest_rate',
+    'thirty360': 'interest_rate',
+    'unadjusted': 'businessdays',
+    'modified_following': 'businessdays',
+    'preceding': 'businessdays',
+    'following': 'businessdays',
+    'Monthly': 'businessdays',
+    'FederalReserveHolidays': 'calendars',
+    'LondonBankHolidays': 'calendars',
+    'BasePrepayment': 'prepayment',
+    'Defeasance': 'prepayment',
+    'OpenPrepayment': 'prepayment',
+    'SimpleYieldMaintenance': 'prepayment',
+    'StepDown': 'prepayment',
+    'QuoteCache': 'cache',
+    'SQLiteQuoteCache': 'cache',
+    'ScheduleTemplateCache': 'cache',
+    'Portfolio': 'portfolio',
+    'FlatCurve': 'curves',
+    'ZeroCurve': 'curves',
+    'OvernightIndex': 'rate_index',
+    'CompoundedInArrears': 'rate_index',
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    module = _exports.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'{__name__}.{module}'), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
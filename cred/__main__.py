@@ -0,0 +1,6 @@
+import sys
+
+from cred.cli import main
+
+
+sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Weighted average life, yield to maturity, duration and convexity of borrowings from their cached cash flow arrays.
+
+Analytics for a `Portfolio` are computed for every borrowing at once from the portfolio's columnar cash flows, with
+yields solved by Newton iteration on all borrowings together::
+
+    result = portfolio_analytics(portfolio, dt=datetime(2021, 1, 1))
+    result.ytm  # one yield per borrowing
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from cred.businessdays import as_datetime64
+from cred.interest_rate import periods_in_year
+
+
+LoanAnalytics = namedtuple('LoanAnalytics', ['price', 'wal', 'ytm', 'macaulay_duration', 'modified_duration',
+                                             'convexity'])
+LoanAnalytics.__doc__ = """Analytics of the payments of a borrowing due after an analysis date. `wal` and durations are
+in years, `ytm` is an annual rate and `convexity` is in years squared."""
+
+
+def analytics(borrowing, dt=None, price=None, compounding=None, days_in_year=365.0, tol=1e-12, max_iter=50):
+    """
+    Returns the analytics of the payments of `borrowing` due after `dt`.
+
+    Parameters
+    ----------
+    borrowing: PeriodicBorrowing
+        Borrowing to analyze
+    dt: datetime-like, optional(default=None)
+        Analysis date. Defaults to the borrowing's start date.
+    price: float, optional(default=None)
+        Price the yield is solved for. Defaults to the outstanding principal after `dt`.
+    compounding: str, int, optional(default=None)
+        'continuous' or the number of compounding periods per year of the yield. Defaults to the borrowing's number of
+        interest periods per year.
+    days_in_year: float, optional(default=365.0)
+        Number of days per year used to measure times
+    tol: float, optional(default=1e-12)
+        Yield convergence tolerance
+    max_iter: int, optional(default=50)
+        Maximum number of Newton iterations
+
+    Returns
+    -------
+    LoanAnalytics
+        Analytics as floats, `nan` if no payments are due after `dt`
+    """
+    cfs = borrowing.cash_flows()
+    dt = borrowing.start_date if dt is None else dt
+    m = _compounding([borrowing], compounding)
+    prices = None if price is None else np.array([price], dtype=float)
+    result = _analytics(np.zeros(len(cfs.payment), dtype=np.int64), cfs, np.array([np.datetime64(dt, 'D')]), prices,
+                        m, 1, days_in_year, tol, max_iter)
+    return LoanAnalytics(*(float(v[0]) for v in result))
+
+
+def portfolio_analytics(portfolio, dt=None, prices=None, compounding=None, days_in_year=365.0, tol=1e-12,
+                        max_iter=50):
+    """
+    Returns the analytics of every borrowing in `portfolio`. Yields of all borrowings are solved together by
+    vectorized Newton iteration. See `analytics` for parameters.
+
+    Parameters
+    ----------
+    portfolio: Portfolio
+        Borrowings to analyze
+    dt: datetime-like, optional(default=None)
+        Analysis date for every borrowing. Defaults to each borrowing's start date.
+    prices: list(float), optional(default=None)
+        Price of each borrowing. Defaults to each borrowing's outstanding principal after the analysis date.
+
+    Returns
+    -------
+    LoanAnalytics
+        Analytics as arrays with one element per borrowing
+    """
+    cfs = portfolio.cash_flows()
+    if dt is None:
+        dts = as_datetime64([b.start_date for b in portfolio])
+    else:
+        dts = np.full(len(portfolio), np.datetime64(dt, 'D'))
+    if prices is not None:
+        prices = np.asarray(prices, dtype=float)
+        if len(prices) != len(portfolio):
+            raise ValueError('A price is required for each borrowing.')
+    m = _compounding(portfolio, compounding)
+    return LoanAnalytics(*_analytics(cfs.loan, cfs, dts, prices, m, len(portfolio), days_in_year, tol, max_iter))
+
+
+def _compounding(borrowings, compounding):
+    # compounding periods per year of each borrowing's yield, with `inf` for continuous compounding
+    if compounding == 'continuous':
+        return np.full(len(borrowings), np.inf)
+    if compounding is not None:
+        if not (isinstance(compounding, int) and compounding > 0):
+            raise ValueError("compounding must be 'continuous' or a positive number of periods per year.")
+        return np.full(len(borrowings), float(compounding))
+    return np.array([periods_in_year(b.freq) for b in borrowings], dtype=float)
+
+
+def _log_growth(y, m):
+    # annual log growth at yield `y` compounded `m` times a year, and its first and second derivatives
+    continuous = np.isinf(m)
+    m = np.where(continuous, 1.0, m)
+    growth = np.where(continuous, y, m * np.log1p(y / m))
+    d1 = np.where(continuous, 1.0, 1 / (1 + y / m))
+    d2 = np.where(continuous, 0.0, -1 / (m * (1 + y / m) ** 2))
+    return growth, d1, d2
+
+
+def _analytics(loan, cfs, dts, prices, m, n, days_in_year, tol, max_iter):
+    due = cfs.pmt_date > dts[loan]
+    loan = loan[due]
+    times = (cfs.pmt_date[due] - dts[loan]).astype(float) / days_in_year
+    payments = cfs.payment[due]
+    principal = cfs.principal_pmt[due]
+
+    def total(values):
+        return np.bincount(loan, weights=values, minlength=n)
+
+    outstanding = total(principal)
+    has_pmts = np.bincount(loan, minlength=n) > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        wal = total(times * principal) / outstanding
+    prices = outstanding if prices is None else prices
+
+    # Newton iteration on every yield at once, starting from the simple return over the weighted average time
+    with np.errstate(invalid='ignore', divide='ignore'):
+        y = np.where(has_pmts, (total(payments) / prices - 1) / (total(times * payments) / total(payments)), 0.0)
+    y = np.nan_to_num(y)
+    floor = np.where(np.isinf(m), -np.inf, -m * (1 - 1e-9))
+    for _ in range(max_iter):
+        growth, d1, _ = _log_growth(y, m)
+        pvs = payments * np.exp(-times * growth[loan])
+        f = total(pvs) - prices
+        df = -total(times * pvs) * d1
+        with np.errstate(invalid='ignore', divide='ignore'):
+            step = np.where(has_pmts, f / df, 0.0)
+        y = np.maximum(y - step, floor)
+        if np.all(np.abs(step) <= tol):
+            break
+
+    growth, d1, d2 = _log_growth(y, m)
+    pvs = payments * np.exp(-times * growth[loan])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        value = total(pvs)
+        macaulay = total(times * pvs) / value
+        convexity = total(pvs * (times ** 2 * d1[loan] ** 2 - times * d2[loan])) / value
+
+    nan = np.where(has_pmts, 1.0, np.nan)
+    return (np.where(has_pmts, prices, np.nan), wal * nan, y * nan, macaulay * nan, macaulay * d1 * nan,
+            convexity * nan)
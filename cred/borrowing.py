@@ -1,14 +1,23 @@
+import copy
 import itertools
+from collections import namedtuple
 
-from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
-import pandas as pd
-from cred.businessdays import unadjusted, Monthly
+import numpy as np
+from cred import instrumentation
+from cred.businessdays import unadjusted, Monthly, as_datetime64, as_datetimes, calendar_holidays, shared_calendar
+from cred.fingerprint import fingerprint
 from cred.interest_rate import actual360
+from cred.ledger import BalanceLedger
 from cred.period import Period, InterestPeriod
 
 
+CashFlows = namedtuple('CashFlows', ['start_date', 'end_date', 'pmt_date', 'bop_principal', 'interest_rate',
+                                     'interest_pmt', 'principal_pmt', 'payment', 'eop_principal'])
+CashFlows.__doc__ = """Period values of a borrowing as `numpy` arrays with one element per period. Dates are `datetime64[D]`."""
+
+
 class _Borrowing:
 
     def __init__(self, desc=None):
@@ -33,15 +42,18 @@ class _Borrowing:
             raise IndexError('Cannot access period with index less than 0')
 
         if (self._cache is True) and (i in self._cached_periods.keys()):
+            instrumentation.count('period_cache_hits')
             return self._cached_periods[i]
 
         p = self._create_period(i)
 
         if self._cache is True:
+            instrumentation.count('period_cache_misses')
             self._cached_periods[i] = p
 
         return p
 
+    @instrumentation.timed('create_period')
     def _create_period(self, i):
         if i < 0:
             raise ValueError('Value for period index must be greater than or equal to 0')
@@ -118,6 +130,8 @@ class PeriodicBorrowing(_Borrowing):
                  calc_convention=unadjusted, pmt_convention=unadjusted, holiday_calendar=None, desc=None,
                  prepayment=None):
 
+        self._cash_flows = None
+        self._fingerprint = None
         super().__init__(desc)
         self.period_type = InterestPeriod
         self.start_date = start_date
@@ -135,14 +149,46 @@ class PeriodicBorrowing(_Borrowing):
         self.adjust_calc_date = calc_convention
         self.adjust_pmt_date = pmt_convention
 
+    # attributes that do not affect the schedule
+    _non_schedule_attrs = {'desc', 'prepayment', 'quote_cache', 'schedule_templates', 'schedule_store'}
+
+    # optional cred.cache.QuoteCache used by repayment_amount
+    quote_cache = None
+
+    # optional cred.cache.ScheduleTemplateCache used to build schedules that are linear in principal
+    schedule_templates = None
+
+    # optional cred.store.ScheduleStore of precomputed cash flows
+    schedule_store = None
+
+    def __setattr__(self, name, value):
+        # reassigning any public attribute may change the schedule, so drop cached values
+        super().__setattr__(name, value)
+        if not name.startswith('_') and name not in self._non_schedule_attrs:
+            self.__dict__['_cash_flows'] = None
+            self.__dict__['_fingerprint'] = None
+
+    def __getstate__(self):
+        # pickle terms only: holidays and cached values are rebuilt or looked up in the receiving process, the
+        # calendar is replaced by a shared instance without computed holidays and process-local caches are dropped
+        state = self.__dict__.copy()
+        for name in ('_holidays', '_periods', 'quote_cache', 'schedule_templates', 'schedule_store'):
+            state.pop(name, None)
+        state['_cash_flows'] = None
+        state['_cached_periods'] = {}
+        state['_holiday_calendar'] = shared_calendar(self._holiday_calendar)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__dict__['_holiday_calendar'] = shared_calendar(self._holiday_calendar)
+        self.__dict__['_holidays'] = calendar_holidays(self._holiday_calendar)
+
     def _get_holiday_calendar(self):
         return self._holiday_calendar
 
     def _set_holiday_calendar(self, calendar):
-        if calendar is None:
-            self._holidays = None
-        else:
-            self._holidays = calendar.holidays(datetime(1970, 1, 1), datetime(2200, 1, 1))
+        self._holidays = calendar_holidays(calendar)
         self._holiday_calendar = calendar
 
     holiday_calendar = property(_get_holiday_calendar, _set_holiday_calendar)
@@ -155,6 +201,16 @@ class PeriodicBorrowing(_Borrowing):
     def periods(self):
         return self._schedule_periods()
 
+    def period_count(self):
+        """Returns the number of interest periods in the borrowing. Only period end dates are calculated unless cash
+        flows are already cached."""
+        if self._cash_flows is not None:
+            return len(self._cash_flows.payment)
+        i = 0
+        while self.period_end_date(i) is not None:
+            i += 1
+        return i
+
     # Indexing and accessing values
     def date_period(self, dt, inc_period_end=False):
         """
@@ -241,21 +297,19 @@ class PeriodicBorrowing(_Borrowing):
         -------
         list((date, float))
         """
-        if first_dt is None:
-            first_dt = pd.Timestamp.min
-        if last_dt is None:
-            last_dt = pd.Timestamp.max
-
-        periods = self._schedule_periods()
-        pmts = [p.get_payment() for p in periods]
-
-        if pmt_dt:
-            dts = [p.get_pmt_date() for p in periods]
-            dt_mask = [(dt >= first_dt) & (dt <= last_dt) for dt in dts]
+        if self._from_cash_flows():
+            cfs = self.cash_flows()
+            pmts = cfs.payment.tolist()
+            dts = as_datetimes(cfs.pmt_date if pmt_dt else cfs.end_date)
         else:
-            dts = [p.get_end_date() for p in periods]
-            dt_mask = [(dt >= first_dt) & (dt <= last_dt) for dt in dts]
-
+            periods = self._schedule_periods()
+            pmts = [p.get_payment() for p in periods]
+            if pmt_dt:
+                dts = [p.get_pmt_date() for p in periods]
+            else:
+                dts = [p.get_end_date() for p in periods]
+
+        dt_mask = [(first_dt is None or dt >= first_dt) and (last_dt is None or dt <= last_dt) for dt in dts]
         return list(zip(itertools.compress(dts, dt_mask), itertools.compress(pmts, dt_mask)))
 
     def accrued_interest(self, dt, include_dt=False):
@@ -336,7 +390,7 @@ class PeriodicBorrowing(_Borrowing):
 
         periods = self._schedule_periods()
 
-        outstanding = self.initial_principal
+        outstanding = self._funded_principal(dt)
 
         for p in periods:
             if include_dt and dt > p.get_pmt_date():
@@ -346,7 +400,42 @@ class PeriodicBorrowing(_Borrowing):
 
         return outstanding
 
+    def outstanding_principals(self, dts, include_dt=False):
+        """
+        Vectorized `outstanding_principal` for a list of dates, calculated from the cached `cash_flows`. Dates prior to
+        the start date are `nan`.
+
+        Parameters
+        ----------
+        dts: list(datetime-like)
+            As-of dates
+        include_dt: bool, optional(default=False)
+            Indicates whether to include principal payments due on each date
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        cfs = self.cash_flows()
+        dts = as_datetime64(dts)
+        # payment dates may not be sorted if a leading stub pays on its start date
+        order = np.argsort(cfs.pmt_date, kind='stable')
+        paid = np.concatenate([[0.0], np.cumsum(cfs.principal_pmt[order])])
+        paid = paid[np.searchsorted(cfs.pmt_date[order], dts, side='left' if include_dt else 'right')]
+        outstanding = self._funded_principal(dts) - paid
+        outstanding[dts < as_datetime64(self.start_date)] = np.nan
+        return outstanding
+
+    def _funded_principal(self, dts):
+        """Principal funded on or before each date in `dts`, before any principal payments."""
+        return self.initial_principal
+
+    def _fundings(self):
+        """Dates and amounts of principal funded as `datetime64[D]` and float arrays."""
+        return as_datetime64([self.start_date]), np.array([self.initial_principal], dtype=float)
+
     # Building the schedule
+    @instrumentation.timed('schedule_build')
     def _schedule_periods(self):
         self._start_caching()
         periods = []
@@ -360,8 +449,92 @@ class PeriodicBorrowing(_Borrowing):
         self._stop_caching()
         return periods
 
+    def cash_flows(self):
+        """
+        Returns the borrowing's period values as a `CashFlows` named tuple of read-only `numpy` arrays. The arrays are
+        built from the schedule once and cached until any public attribute of the borrowing is reassigned. Changes made
+        in place (e.g. editing a custom amortization list) are not detected.
+
+        Returns
+        -------
+        CashFlows
+        """
+        if self._cash_flows is None:
+            instrumentation.count('cash_flows_cache_misses')
+            self._cash_flows = self._build_cash_flows()
+        else:
+            instrumentation.count('cash_flows_cache_hits')
+        return self._cash_flows
+
+    def _build_cash_flows(self):
+        if self.schedule_store is not None:
+            cfs = self.schedule_store.get(self)
+            if cfs is not None:
+                return cfs
+        if self.schedule_templates is not None and self._linear_in_principal():
+            return self.schedule_templates.cash_flows(self)
+        return self._cash_flows_from_periods()
+
+    def _cash_flows_from_periods(self):
+        periods = self._schedule_periods()
+        cfs = CashFlows(
+            start_date=as_datetime64([p.get_start_date() for p in periods]),
+            end_date=as_datetime64([p.get_end_date() for p in periods]),
+            pmt_date=as_datetime64([p.get_pmt_date() for p in periods]),
+            bop_principal=np.array([p.get_bop_principal() for p in periods], dtype=float),
+            interest_rate=np.array([getattr(p, 'interest_rate', np.nan) for p in periods], dtype=float),
+            interest_pmt=np.array([p.get_interest_pmt() for p in periods], dtype=float),
+            principal_pmt=np.array([p.get_principal_pmt() for p in periods], dtype=float),
+            payment=np.array([p.get_payment() for p in periods], dtype=float),
+            eop_principal=np.array([p.eop_principal for p in periods], dtype=float)
+        )
+        for arr in cfs:
+            arr.flags.writeable = False
+        return cfs
+
+    def _from_cash_flows(self):
+        """True if `cash_flows` are served from a schedule store or template, so the schedule and payments are built
+        from them rather than from periods."""
+        if self.schedule_templates is not None and self._linear_in_principal():
+            return True
+        return self.schedule_store is not None and (self._cash_flows is not None or self in self.schedule_store)
+
+    def _linear_in_principal(self):
+        """True if every period value other than dates and rates scales linearly with `initial_principal`, which allows
+        the schedule to be built from a unit principal template."""
+        return False
+
+    def _unit_principal_copy(self):
+        """Returns a copy of the borrowing with an initial principal of 1.0 and no caches."""
+        unit = copy.copy(self)
+        unit._cached_periods = {}
+        unit.schedule_templates = None
+        unit.schedule_store = None
+        unit.prepayment = None
+        unit.initial_principal = 1.0
+        return unit
+
+    def _schedule_from_cash_flows(self, cfs):
+        import pandas as pd
+        return pd.DataFrame({
+            'index': np.arange(len(cfs.payment)),
+            'start_date': cfs.start_date.astype('datetime64[ns]'),
+            'end_date': cfs.end_date.astype('datetime64[ns]'),
+            'payment_date': cfs.pmt_date.astype('datetime64[ns]'),
+            'bop_principal': cfs.bop_principal,
+            'interest_rate': cfs.interest_rate,
+            'interest_payment': cfs.interest_pmt,
+            'principal_payment': cfs.principal_pmt,
+            'payment': cfs.payment,
+            'eop_principal': cfs.eop_principal
+        }).set_index('index')
+
     def schedule(self):
-        """Returns the borrowing's cash flow schedule as a `pandas.DataFrame`."""
+        """Returns the borrowing's cash flow schedule as a `pandas.DataFrame`. Use `cash_flows` for period values
+        without importing `pandas`."""
+        if self._from_cash_flows():
+            return self._schedule_from_cash_flows(self.cash_flows())
+        import pandas as pd
         periods = self._schedule_periods()
         schedule = [p.schedule() for p in periods]
         df = pd.DataFrame(schedule).set_index('index')
@@ -463,12 +636,61 @@ class PeriodicBorrowing(_Borrowing):
         """Period beginning balance less the period principal payment."""
         return period.bop_principal - period.principal_payment
 
+    # Terms
+    def _terms(self):
+        """Returns a tuple of `(name, value)` pairs for every term that affects the borrowing's schedule. Subclasses
+        with additional terms should extend it."""
+        return (
+            ('type', type(self)),
+            ('start_date', self.start_date),
+            ('end_date', self.end_date),
+            ('freq', self.freq),
+            ('initial_principal', self.initial_principal),
+            ('first_reg_start', self.first_reg_start),
+            ('year_frac', self.year_frac),
+            ('calc_convention', self.adjust_calc_date),
+            ('pmt_convention', self.adjust_pmt_date),
+            ('holiday_calendar', self.holiday_calendar)
+        )
+
+    def fingerprint(self):
+        """
+        Returns a SHA-256 hex digest of the borrowing's schedule terms (see `schedule_fingerprint`) and its prepayment
+        terms, if any. The fingerprint is deterministic across processes, so it can be used to dedupe borrowings or key
+        results cached on disk. Functions are identified by their qualified names (see `cred.fingerprint`).
+
+        Returns
+        -------
+        str
+        """
+        if self.prepayment is None:
+            return self.schedule_fingerprint()
+        return fingerprint((self.schedule_fingerprint(), self.prepayment))
+
+    def schedule_fingerprint(self):
+        """
+        Returns a SHA-256 hex digest of the terms that affect the borrowing's schedule: dates, frequency, principal,
+        day count, business day conventions, holiday calendar and any subclass terms such as coupon and amortization.
+        Borrowings with the same schedule fingerprint have the same schedule. Cached until a public attribute is
+        reassigned.
+
+        Returns
+        -------
+        str
+        """
+        if self._fingerprint is None:
+            self._fingerprint = fingerprint(self._terms())
+        return self._fingerprint
+
     # Prepayment
     def repayment_amount(self, dt):
         """Required repayment amount including any prepayment premiums as defined by the `prepayment` object. See
-        `borrowing.outstanding_principal` for clean balance."""
+        `borrowing.outstanding_principal` for clean balance. If `quote_cache` is set, repeated quotes are served from
+        the cache."""
         if self.prepayment is None:
             raise AttributeError('Must define a prepayment calculator attribute.')
+        if self.quote_cache is not None:
+            return self.quote_cache.repayment_amount(self, dt)
         return self.prepayment.required_repayment(self, dt)
 
 
@@ -503,30 +725,59 @@ class FixedRateBorrowing(PeriodicBorrowing):
         If `amort_periods` is a number (i.e. amortization with constant principal and interest payments), then defines
         the leading number of full interest only periods. Calculated from the `first_reg_start` date, so any leading
         stub periods are ignored.
+    modifications: list(cred.modification.LoanModification), optional(default=None)
+        Modifications of the loan terms, such as coupon changes and principal paydowns, applied in order. See
+        `cred.modification.modify` to apply a modification to an existing borrowing.
     **kwargs
         Keyword arguments passed to superclass (PeriodicBorrowing) initialization. Ex. `desc` for borrowing description,
         `year_frac` for day count convention, `pmt_convention` for business day adjustment, `first_reg_start`, etc.
     """
 
     def __init__(self, start_date, end_date, freq, initial_principal, coupon, amort_periods=None, io_periods=0,
-                 **kwargs):
+                 modifications=None, **kwargs):
         super().__init__(start_date, end_date, freq, initial_principal, **kwargs)
         self.coupon = coupon
         self.amort_periods = amort_periods
         self.io_periods = io_periods
+        self.modifications = modifications
 
     def interest_rate(self, period):
-        return self.coupon
+        return self._coupon(period.index)
+
+    def _coupon(self, i):
+        coupon = self.coupon
+        for modification in self.modifications or ():
+            coupon = modification.coupon(self, i, coupon)
+        return coupon
+
+    def _linear_in_principal(self):
+        # custom amortization amounts do not scale with principal and subclasses may override period values
+        return (type(self) is FixedRateBorrowing and not hasattr(self.amort_periods, '__getitem__') and
+                not self.modifications)
+
+    def _terms(self):
+        return super()._terms() + (
+            ('coupon', self.coupon),
+            ('amort_periods', self.amort_periods),
+            ('io_periods', self.io_periods),
+            ('modifications', self.modifications)
+        )
 
     def principal_payment(self, period):
         # interest only if amort is None
         if self.amort_periods is None:
-            return self._interest_only(period)
+            amt = self._interest_only(period)
         # if amort value implements __getitem__, get amort value for period
         elif hasattr(self.amort_periods, '__getitem__'):
-            return self.amort_periods[period.index]
+            amt = self.amort_periods[period.index]
         # else try calculating amortization based on number of amort periods
-        return self._constant_pmt_amort(period)
+        else:
+            amt = self._constant_pmt_amort(period)
+        if not self.modifications:
+            return amt
+        # principal paydowns, up to the outstanding balance
+        paydown = sum(modification.paydown(self, period.index) for modification in self.modifications)
+        return min(amt + paydown, period.bop_principal)
 
     def _interest_only(self, period):
         if period.end_date == self.end_date:
@@ -544,9 +795,311 @@ class FixedRateBorrowing(PeriodicBorrowing):
         if period.end_date == self.end_date:
             return period.bop_principal
         # periodic amortization
+        if self.modifications:
+            return self._reamortized_pmt(period) - period.interest_payment
         periodic_ir = self.coupon / 12
         if periodic_ir == 0:
             return self.initial_principal / self.amort_periods
 
         pmt = periodic_ir / (1 - (1 + periodic_ir) ** -self.amort_periods) * self.initial_principal
         return pmt - period.interest_payment
+
+    def _reamortized_pmt(self, period):
+        # level payment from the latest modification that reamortizes the loan on or before the period, amortizing the
+        # balance at that period over the remaining amortization periods at the coupon in effect
+        start = max((k for k in (m.reamortization_index(self) for m in self.modifications)
+                     if k is not None and k <= period.index), default=None)
+        if start is None:
+            balance, coupon, n = self.initial_principal, self.coupon, self.amort_periods
+        else:
+            first_amort = self.io_periods + (self.start_date != self.first_reg_start)
+            balance = self.period(start).bop_principal if start < period.index else period.bop_principal
+            coupon = self._coupon(start)
+            n = self.amort_periods - max(start - first_amort, 0)
+        periodic_ir = coupon / 12
+        if periodic_ir == 0:
+            return balance / n
+        return periodic_ir / (1 - (1 + periodic_ir) ** -n) * balance
+
+
+class FloatingRateBorrowing(PeriodicBorrowing):
+    """
+    PeriodicBorrowing subclass for floating rate borrowings that pay an index rate plus a spread.
+
+    The index rate of each period is fixed `reset_lag` business days before the period start date and projected from
+    `index_curve` as the simply compounded forward rate from the reset date over `index_tenor`. If `index_curve` is a
+    `cred.rate_index.CompoundedInArrears` index, the index rate of each period is instead the daily index compounded
+    over the period's calculation dates, with the lookback, lockout and observation shift of the index, and
+    `reset_lag`, `index_tenor`, `index_days_in_year` and `fixings` are not used. Rates for every period are computed in
+    one vectorized evaluation the first time any period value is needed, and cached until a public attribute of the
+    borrowing is reassigned. Changes made to the curve in place are not detected.
+
+    The period interest rate is the index rate, rounded to `rounding` decimal places and bounded by `floor` and `cap`,
+    plus `spread`.
+
+    Parameters
+    ----------
+    start_date: datetime-like
+        Borrowing start date
+    end_date: datetime-like
+        Borrowing end date
+    freq: Monthly, dateutil.relativedelta.relativedelta
+        Interest period frequency
+    initial_principal
+        Initial principal amount of the borrowing
+    index_curve: cred.curves.Curve, cred.rate_index.CompoundedInArrears
+        Curve used to project the index rate, or daily index compounded in arrears
+    spread: float, optional(default=0.0)
+        Margin added to the index rate
+    floor: float, optional(default=None)
+        Minimum index rate
+    cap: float, optional(default=None)
+        Maximum index rate
+    reset_lag: int, optional(default=0)
+        Number of business days (using the borrowing's holidays) before each period start date that the index rate is
+        fixed
+    rounding: int, optional(default=None)
+        Number of decimal places the index rate is rounded to, e.g. 5 for 0.00001. Not rounded if `None`.
+    index_tenor: dateutil.relativedelta.relativedelta, optional(default=None)
+        Term of the index rate. Defaults to `freq`.
+    index_days_in_year: float, optional(default=360.0)
+        Number of days per year in the index rate's actual day count
+    fixings: dict, optional(default=None)
+        Index rates that have already been fixed, by reset date. Used instead of projected rates for matching reset
+        dates.
+    amort_periods: object, optional(default=None)
+        If None (default), will be calculated as interest only. Otherwise a custom amortization schedule that
+        implements `__getitem__` with the principal payment for period i at index i, including the balloon payment.
+    **kwargs
+        Keyword arguments passed to superclass (PeriodicBorrowing) initialization
+    """
+
+    def __init__(self, start_date, end_date, freq, initial_principal, index_curve, spread=0.0, floor=None, cap=None,
+                 reset_lag=0, rounding=None, index_tenor=None, index_days_in_year=360.0, fixings=None,
+                 amort_periods=None, **kwargs):
+        self._rates = None
+        super().__init__(start_date, end_date, freq, initial_principal, **kwargs)
+        if floor is not None and cap is not None and floor > cap:
+            raise ValueError('floor must not be greater than cap.')
+        if reset_lag < 0:
+            raise ValueError('reset_lag must not be negative.')
+        self.index_curve = index_curve
+        self.spread = spread
+        self.floor = floor
+        self.cap = cap
+        self.reset_lag = reset_lag
+        self.rounding = rounding
+        self.index_tenor = index_tenor
+        self.index_days_in_year = index_days_in_year
+        self.fixings = fixings
+        self.amort_periods = amort_periods
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if not name.startswith('_') and name not in self._non_schedule_attrs:
+            self.__dict__['_rates'] = None
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state['_rates'] = None
+        return state
+
+    def reset_dates(self):
+        """Returns the index reset date of each period as a `numpy` array of `datetime64[D]` values."""
+        starts = as_datetime64([self.period_start_date(i) for i in range(self.period_count())])
+        if self.reset_lag == 0:
+            return starts
+        holidays = np.asarray([] if self.holidays is None else self.holidays, dtype='datetime64[D]')
+        return np.busday_offset(starts, -self.reset_lag, roll='following', holidays=holidays)
+
+    def index_rates(self):
+        """Returns the rounded index rate of each period, before the floor, cap and spread, as a `numpy` array. Rates
+        are fixings for reset dates in `fixings` and otherwise projected from `index_curve`."""
+        if hasattr(self.index_curve, 'period_rates'):
+            n = self.period_count()
+            rates = self.index_curve.period_rates([self.period_start_date(i) for i in range(n)],
+                                                  [self.period_end_date(i) for i in range(n)])
+            return rates if self.rounding is None else np.round(rates, self.rounding)
+        resets = self.reset_dates()
+        tenor = self.freq if self.index_tenor is None else self.index_tenor
+        ends = as_datetime64([dt + tenor for dt in as_datetimes(resets)])
+        rates = self.index_curve.forward_rates(resets, ends, self.index_days_in_year)
+        for dt, rate in (self.fixings or {}).items():
+            rates[resets == np.datetime64(dt, 'D')] = rate
+        if self.rounding is not None:
+            rates = np.round(rates, self.rounding)
+        return rates
+
+    def period_rates(self):
+        """Returns the interest rate of each period as a read-only `numpy` array. Cached until a public attribute is
+        reassigned."""
+        if self._rates is None:
+            rates = self.index_rates()
+            if self.floor is not None or self.cap is not None:
+                rates = np.clip(rates, self.floor, self.cap)
+            rates = rates + self.spread
+            rates.flags.writeable = False
+            self._rates = rates
+        return self._rates
+
+    def interest_rate(self, period):
+        return float(self.period_rates()[period.index])
+
+    def principal_payment(self, period):
+        if self.amort_periods is None:
+            return super().principal_payment(period)
+        return self.amort_periods[period.index]
+
+    def _terms(self):
+        return super()._terms() + (
+            ('index_curve', self.index_curve),
+            ('spread', self.spread),
+            ('floor', self.floor),
+            ('cap', self.cap),
+            ('reset_lag', self.reset_lag),
+            ('rounding', self.rounding),
+            ('index_tenor', self.index_tenor),
+            ('index_days_in_year', self.index_days_in_year),
+            ('fixings', self.fixings),
+            ('amort_periods', self.amort_periods)
+        )
+
+
+class DelayedDrawBorrowing(PeriodicBorrowing):
+    """
+    PeriodicBorrowing subclass for fixed rate, interest only delayed-draw and construction loans that fund
+    `initial_principal` at the start date and draw more of the `commitment` on later dates.
+
+    The initial funding and draws are kept in a `cred.ledger.BalanceLedger`. Interest for each period accrues on the
+    period's average daily outstanding balance and the optional unused fee accrues on its average undrawn commitment,
+    both for the period's `year_frac`, so with actual day counts each draw accrues from the day it is funded. Each
+    period's `draws` are added to its ending balance, and the balance is repaid at the end date.
+
+    Parameters
+    ----------
+    start_date: datetime-like
+        Borrowing start date
+    end_date: datetime-like
+        Borrowing end date
+    freq: Monthly, dateutil.relativedelta.relativedelta
+        Interest period frequency
+    commitment: float
+        Maximum total amount funded
+    coupon: float
+        Fixed interest rate
+    draws: dict, list((datetime-like, float)), optional(default=None)
+        Draw amounts by date, from the start date and before the end date
+    initial_principal: float, optional(default=0.0)
+        Amount funded at the start date
+    unused_fee_rate: float, optional(default=0.0)
+        Annual fee rate on the undrawn commitment, paid with each period's payment
+    **kwargs
+        Keyword arguments passed to superclass (PeriodicBorrowing) initialization
+    """
+
+    def __init__(self, start_date, end_date, freq, commitment, coupon, draws=None, initial_principal=0.0,
+                 unused_fee_rate=0.0, **kwargs):
+        self._ledger = None
+        super().__init__(start_date, end_date, freq, initial_principal, **kwargs)
+        self.commitment = commitment
+        self.coupon = coupon
+        self.draws = draws
+        self.unused_fee_rate = unused_fee_rate
+        self.ledger()
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if not name.startswith('_') and name not in self._non_schedule_attrs:
+            self.__dict__['_ledger'] = None
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state['_ledger'] = None
+        return state
+
+    def ledger(self):
+        """Returns the `BalanceLedger` of the initial funding and draws. Cached until a public attribute is
+        reassigned."""
+        if self._ledger is None:
+            draws = list(self.draws.items()) if isinstance(self.draws, dict) else list(self.draws or [])
+            draw_dates = as_datetime64([dt for dt, _ in draws])
+            if len(draw_dates) and (draw_dates.min() < np.datetime64(self.start_date, 'D') or
+                                    draw_dates.max() >= np.datetime64(self.end_date, 'D')):
+                raise ValueError('Draws must be dated from the start date and before the end date.')
+            ledger = BalanceLedger([self.start_date] + [dt for dt, _ in draws],
+                                   [self.initial_principal] + [amt for _, amt in draws])
+            if ledger.total() > self.commitment * (1 + 1e-12):
+                raise ValueError(f'Total funding {ledger.total():,.2f} exceeds the commitment {self.commitment:,.2f}.')
+            self._ledger = ledger
+        return self._ledger
+
+    def set_period_values(self, period):
+        period.add_start_date(self.period_start_date(period.index))
+        period.add_end_date(self.period_end_date(period.index))
+        period.add_pmt_date(self.pmt_date(period.index))
+        period.add_bop_principal(self.bop_principal(period))
+        period.add_display_field(self.period_draws(period), 'draws')
+        period.add_display_field(self.interest_rate(period), 'interest_rate')
+        period.add_interest_pmt(self.interest_payment(period))
+        period.add_payment(self.unused_fee(period), 'unused_fee')
+        period.add_principal_pmt(self.principal_payment(period))
+        period.add_display_field(self.period_payment(period), 'payment')
+        period.add_display_field(self.eop_principal(period), 'eop_principal')
+
+    def period_draws(self, period):
+        """Returns the amount drawn from the period's start date to before its end date, not including the initial
+        funding."""
+        draws = self.ledger().changes(period.start_date, period.end_date)
+        return draws - self.initial_principal if period.index == 0 else draws
+
+    def interest_rate(self, period):
+        return self.coupon
+
+    def interest_payment(self, period):
+        """Returns the interest accrued on the period's average daily outstanding balance."""
+        yf = self.year_frac(period.start_date, period.end_date)
+        return period.interest_rate * yf * self.ledger().average_balance(period.start_date, period.end_date)
+
+    def unused_fee(self, period):
+        """Returns the unused fee accrued on the period's average daily undrawn commitment."""
+        if not self.unused_fee_rate:
+            return 0.0
+        yf = self.year_frac(period.start_date, period.end_date)
+        undrawn = self.commitment - self.ledger().average_balance(period.start_date, period.end_date)
+        return self.unused_fee_rate * yf * undrawn
+
+    def principal_payment(self, period):
+        if period.end_date >= self.end_date:
+            return period.bop_principal + period.draws
+        return 0
+
+    def period_payment(self, period):
+        return period.interest_payment + period.unused_fee + period.principal_payment
+
+    def eop_principal(self, period):
+        return period.bop_principal + period.draws - period.principal_payment
+
+    def accrued_interest(self, dt, include_dt=False):
+        """Returns the interest accrued on the average daily outstanding balance from the start of the interest period
+        in which `dt` falls to `dt`. See `PeriodicBorrowing.accrued_interest`."""
+        period = self.date_period(dt, inc_period_end=False)
+        if dt > period.get_end_date():
+            return 0
+        end = min(dt + relativedelta(days=1 * include_dt), period.get_end_date())
+        start = period.get_start_date()
+        return self.coupon * self.year_frac(start, end) * self.ledger().average_balance(start, end)
+
+    def _funded_principal(self, dts):
+        return self.ledger().balance(dts)
+
+    def _fundings(self):
+        ledger = self.ledger()
+        return ledger.dates, ledger.amounts
+
+    def _terms(self):
+        return super()._terms() + (
+            ('commitment', self.commitment),
+            ('coupon', self.coupon),
+            ('draws', self.draws),
+            ('unused_fee_rate', self.unused_fee_rate)
+        )
@@ -1,42 +1,70 @@
 import calendar as cal
+import copy
+from datetime import datetime, timedelta
+
+import numpy as np
 from dateutil.relativedelta import relativedelta
-from pandas.tseries.holiday import *
 
+from cred.fingerprint import fingerprint
+
+
+HOLIDAYS_START = datetime(1970, 1, 1)
+HOLIDAYS_END = datetime(2200, 1, 1)
+
+# holidays and canonical calendar instances shared by every borrowing in the process, keyed by calendar fingerprint
+_shared_holidays = {}
+_shared_calendars = {}
 
-class FederalReserveHolidays(AbstractHolidayCalendar):
+
+def __getattr__(name):
+    # holiday calendars subclass pandas calendars, so pandas is only imported when a calendar is used
+    if name in ('FederalReserveHolidays', 'LondonBankHolidays'):
+        from cred import calendars
+        return getattr(calendars, name)
+    # names this module re-exported from `pandas.tseries.holiday` (e.g. `Holiday`, `AbstractHolidayCalendar`) before
+    # the calendars moved to `cred.calendars`
+    if not name.startswith('_'):
+        try:
+            from pandas.tseries import holiday
+        except ImportError:
+            holiday = None
+        if hasattr(holiday, name):
+            return getattr(holiday, name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def calendar_holidays(calendar):
     """
-    U.S. Federal Reserve banking holidays. Holidays are thought to be accurate, but you should verify independently.
+    Returns the holidays observed by `calendar` from 1970 through 2199. Holidays are calculated once per process for
+    each distinct calendar (by type, name and rules) and the same object is shared by every borrowing using an
+    equivalent calendar. Returns `None` if `calendar` is `None`.
     """
+    if calendar is None:
+        return None
+    key = fingerprint(calendar)
+    holidays = _shared_holidays.get(key)
+    if holidays is None:
+        holidays = calendar.holidays(HOLIDAYS_START, HOLIDAYS_END)
+        _shared_holidays[key] = holidays
+    return holidays
 
-    rules = [
-        Holiday("New Years Day", month=1, day=1, observance=sunday_to_monday),
-        USMartinLutherKingJr,
-        USPresidentsDay,
-        Holiday("Memorial Day", start_date=datetime(1970, 1, 1), month=5, day=31, offset=DateOffset(weekday=MO(-1))),
-        Holiday("July 4th", month=7, day=4, observance=sunday_to_monday),
-        USLaborDay,
-        Holiday("Columbus Day", start_date=datetime(1971, 1, 1), month=10, day=1, offset=DateOffset(weekday=MO(2))),
-        Holiday("Veterans Day", month=11, day=11, observance=sunday_to_monday),
-        USThanksgivingDay,
-        Holiday("Christmas", month=12, day=25, observance=sunday_to_monday)
-    ]
-
-
-class LondonBankHolidays(AbstractHolidayCalendar):
+
+def shared_calendar(calendar):
     """
-    London banking holidays. Holidays are thought to be accurate, but you should verify independently.
+    Returns a canonical instance equivalent to `calendar` (by type, name and rules) that is shared within the process.
+    Canonical instances do not carry computed holidays, so they are small to pickle, and pickling many borrowings that
+    reference the same canonical instance only serializes it once.
     """
-
-    rules = [
-        Holiday('New Years Day', month=1, day=1, observance=next_workday),  # Since 1971?
-        Holiday('Good Friday', month=1, day=1, offset=[Easter(), Day(-2)]),
-        EasterMonday,
-        Holiday('Early May Holiday', start_date=datetime(1978, 1, 1), month=5, day=1, offset=DateOffset(weekday=MO(1))),
-        Holiday('Spring Holiday', start_date=datetime(1971, 1, 1), month=5, day=31, offset=DateOffset(weekday=MO(-1))),
-        Holiday('Summer Holiday', start_date=datetime(1971, 1, 1), month=8, day=31, offset=DateOffset(weekday=MO(-1))),
-        Holiday("Christmas", month=12, day=25, observance=next_monday),
-        Holiday('Boxing Day', month=12, day=26, observance=next_monday_or_tuesday)
-    ]
+    if calendar is None:
+        return None
+    key = fingerprint(calendar)
+    shared = _shared_calendars.get(key)
+    if shared is None:
+        shared = copy.copy(calendar)
+        if getattr(shared, '_cache', None) is not None:
+            shared._cache = None
+        _shared_calendars[key] = shared
+    return shared
 
 
 def is_observed_holiday(dt, holidays):
@@ -51,6 +79,16 @@ def is_month_end(dt):
     return dt.day == cal.monthrange(dt.year, dt.month)[1]
 
 
+def as_datetime64(dts):
+    """Returns a `numpy` array of `datetime64[D]` values for the datetime-like values in `dts`."""
+    return np.array(dts, dtype='datetime64[D]')
+
+
+def as_datetimes(dts):
+    """Returns a list of `datetime.datetime` values for an array of `datetime64` values."""
+    return list(np.asarray(dts).astype('datetime64[us]').astype(object))
+
+
 def preceding(dt, holidays):
     """
     Return the previous business day if `dt` is on a weekend or a date in `holidays`.
@@ -108,6 +146,12 @@ class Monthly:
     def __repr__(self):
         return f'Months: {self.months}'
 
+    def __eq__(self, other):
+        return isinstance(other, Monthly) and self.months == other.months
+
+    def __hash__(self):
+        return hash((Monthly, self.months))
+
     def __add__(self, other):
         if is_month_end(other):
             return other + relativedelta(months=self.months + 1, day=1, days=-1)
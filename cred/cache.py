@@ -0,0 +1,443 @@
+import numbers
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from cred import instrumentation
+from cred.fingerprint import fingerprint
+
+
+QuoteCacheInfo = namedtuple('QuoteCacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+TemplateCacheInfo = namedtuple('TemplateCacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+_MISSING = object()
+
+# maximum number of keys looked up per query
+_BATCH = 500
+
+
+def _next_curve_version(version):
+    """Returns the version after `version`: the next integer for integer versions and otherwise a new random hex
+    string, since other identifiers such as curve dates have no successor."""
+    if isinstance(version, numbers.Integral) and not isinstance(version, bool):
+        return int(version) + 1
+    return uuid.uuid4().hex
+
+
+class QuoteCache:
+    """
+    Bounded least recently used (LRU) cache for prepayment quotes. Quotes are keyed by the borrowing's schedule
+    fingerprint, the prepayment object's `fingerprint`, the curve version and the repayment date, so structurally
+    identical borrowings share cached quotes.
+
+    Caching is opt-in. Assign the cache to a borrowing's `quote_cache` attribute (or to
+    `PeriodicBorrowing.quote_cache` to cache every borrowing) and `repayment_amount` will use it.
+
+    Call `refresh_curves` when the discount or index curves used by prepayment objects are updated in place so that
+    stale quotes are not returned.
+
+    Parameters
+    ----------
+    maxsize: int, optional(default=4096)
+        Maximum number of quotes to keep
+    curve_version: hashable, optional(default=0)
+        Identifier of the current curve set, included in every cache key
+    """
+
+    def __init__(self, maxsize=4096, curve_version=0):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1.')
+        self.maxsize = maxsize
+        self.curve_version = curve_version
+        self._quotes = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, borrowing, dt, prepayment=None):
+        """Cache key for a quote of `borrowing` on `dt` using `prepayment` (defaults to the borrowing's
+        prepayment)."""
+        if prepayment is None:
+            prepayment = borrowing.prepayment
+        return borrowing.schedule_fingerprint(), prepayment.fingerprint(), self.curve_version, dt
+
+    def repayment_amount(self, borrowing, dt, prepayment=None):
+        """
+        Returns the required repayment amount for `borrowing` on `dt`, calculating it with
+        `prepayment.required_repayment` and caching it on a miss.
+
+        Parameters
+        ----------
+        borrowing: PeriodicBorrowing
+            Borrowing to quote
+        dt: datetime-like
+            Date of repayment
+        prepayment: BasePrepayment, optional(default=None)
+            Prepayment object used to calculate the quote. Defaults to the borrowing's `prepayment` attribute.
+
+        Returns
+        -------
+        float
+        """
+        if prepayment is None:
+            prepayment = borrowing.prepayment
+        key = self.key(borrowing, dt, prepayment)
+        amt = self.get(key)
+        if amt is _MISSING:
+            amt = prepayment.required_repayment(borrowing, dt)
+            self.put(key, amt)
+        return amt
+
+    def get(self, key, default=_MISSING):
+        """Returns the cached quote for `key` and marks it as recently used, or `default` if not cached."""
+        with self._lock:
+            try:
+                amt = self._quotes[key]
+            except KeyError:
+                self.misses += 1
+                instrumentation.count('quote_cache_misses')
+                return default
+            self._quotes.move_to_end(key)
+            self.hits += 1
+            instrumentation.count('quote_cache_hits')
+            return amt
+
+    def put(self, key, amt):
+        """Adds a quote to the cache, evicting the least recently used quote if the cache is full."""
+        with self._lock:
+            self._quotes[key] = amt
+            self._quotes.move_to_end(key)
+            while len(self._quotes) > self.maxsize:
+                self._quotes.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, borrowing=None):
+        """Removes cached quotes for borrowings with the same terms as `borrowing`, or all quotes if `None`."""
+        with self._lock:
+            if borrowing is None:
+                self._quotes.clear()
+                return
+            terms = borrowing.schedule_fingerprint()
+            for key in [k for k in self._quotes if k[0] == terms]:
+                del self._quotes[key]
+
+    def refresh_curves(self, curve_version=None):
+        """
+        Marks curves as refreshed. Sets the curve version to `curve_version`, or if `None` increments an integer
+        version or replaces any other version with a new random identifier, and drops all quotes priced off prior
+        curves.
+        """
+        if curve_version is None:
+            curve_version = _next_curve_version(self.curve_version)
+        with self._lock:
+            self.curve_version = curve_version
+            self._quotes.clear()
+
+    def clear(self):
+        """Removes all quotes and resets statistics."""
+        with self._lock:
+            self._quotes.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def info(self):
+        """Returns cache statistics as a `QuoteCacheInfo` named tuple."""
+        return QuoteCacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self._quotes))
+
+    def __len__(self):
+        return len(self._quotes)
+
+    def __repr__(self):
+        return f'QuoteCache(maxsize={self.maxsize}, curve_version={self.curve_version!r}, size={len(self)})'
+
+
+class SQLiteQuoteCache:
+    """
+    Persistent prepayment quote cache stored in a local SQLite database, so quotes survive process restarts and can
+    be shared by processes on the same machine.
+
+    Quotes are keyed by the borrowing's schedule fingerprint, the prepayment object's `fingerprint`, the curve
+    identifier and the repayment date. Fingerprints are deterministic across processes and identify curve functions
+    by their qualified names, and lambdas and local functions also by their code and closure values (see
+    `cred.fingerprint.stable_token`). When more than `maxsize` quotes are stored, the least recently used quotes are
+    removed.
+
+    Has the same interface as `QuoteCache`, so it can be assigned to a borrowing's `quote_cache` attribute. Use
+    `repayment_amounts` to read and write quotes for many dates in one transaction.
+
+    Quotes stored in a file are read by later processes, so a cache stored in a file requires an explicit
+    `curve_version` that identifies the curves quotes are priced off, such as the curve date or a fingerprint of the
+    curve values, and `refresh_curves` requires the new identifier.
+
+    Parameters
+    ----------
+    path: str, path-like
+        Path to the database file. Created if it does not exist. Use ':memory:' for a cache that is not persisted.
+    maxsize: int, optional(default=1000000)
+        Maximum number of quotes to keep
+    curve_version: str, int, optional(default=None)
+        Identifier of the current curve set, included in every cache key. Required unless `path` is ':memory:', for
+        which it defaults to 0.
+    """
+
+    def __init__(self, path, maxsize=1_000_000, curve_version=None):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1.')
+        if curve_version is None:
+            if not _in_memory(path):
+                raise ValueError('curve_version is required for a quote cache stored in a file.')
+            curve_version = 0
+        self.path = path
+        self.maxsize = maxsize
+        self.curve_version = curve_version
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30.0)
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS quotes (borrowing TEXT, prepayment TEXT, curve TEXT, dt TEXT, amount REAL, '
+                'used INTEGER, PRIMARY KEY (borrowing, prepayment, curve, dt)) WITHOUT ROWID'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS quotes_used ON quotes (used)')
+        self._used, self._size = self._conn.execute('SELECT COALESCE(MAX(used), 0), COUNT(*) FROM quotes').fetchone()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, borrowing, dt, prepayment=None):
+        """Cache key for a quote of `borrowing` on `dt` using `prepayment` (defaults to the borrowing's
+        prepayment)."""
+        if prepayment is None:
+            prepayment = borrowing.prepayment
+        return borrowing.schedule_fingerprint(), prepayment.fingerprint(), str(self.curve_version), _date_key(dt)
+
+    def repayment_amount(self, borrowing, dt, prepayment=None):
+        """Returns the required repayment amount for `borrowing` on `dt`, calculating it with
+        `prepayment.required_repayment` and caching it on a miss. See `QuoteCache.repayment_amount`."""
+        return self.repayment_amounts(borrowing, [dt], prepayment)[0]
+
+    def repayment_amounts(self, borrowing, dts, prepayment=None):
+        """
+        Returns the required repayment amount for `borrowing` on each date in `dts`. Cached quotes are read in one
+        query and missing quotes are calculated together (with `required_repayments` if the prepayment object provides
+        it) and written in one transaction.
+
+        Returns
+        -------
+        list
+        """
+        if prepayment is None:
+            prepayment = borrowing.prepayment
+        dts = list(dts)
+        terms = (borrowing.schedule_fingerprint(), prepayment.fingerprint(), str(self.curve_version))
+        keys = [terms + (_date_key(dt),) for dt in dts]
+        cached = self.get_many(keys)
+
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        if missing:
+            miss_dts = [dts[i] for i in missing]
+            if hasattr(prepayment, 'required_repayments'):
+                amts = [None if np.isnan(amt) else float(amt)
+                        for amt in prepayment.required_repayments(borrowing, miss_dts)]
+            else:
+                amts = [prepayment.required_repayment(borrowing, dt) for dt in miss_dts]
+            self.put_many({keys[i]: amt for i, amt in zip(missing, amts)})
+            cached.update({keys[i]: amt for i, amt in zip(missing, amts)})
+        return [cached[key] for key in keys]
+
+    def get(self, key, default=_MISSING):
+        """Returns the cached quote for `key` and marks it as recently used, or `default` if not cached."""
+        return self.get_many([key]).get(tuple(key), default)
+
+    def get_many(self, keys):
+        """Returns a dict of the cached quotes for `keys` that are in the cache and marks them as recently used."""
+        keys = list(dict.fromkeys(tuple(k) for k in keys))
+        found = {}
+        with self._lock, self._conn:
+            for i in range(0, len(keys), _BATCH):
+                batch = keys[i:i + _BATCH]
+                rows = self._conn.execute(
+                    'SELECT borrowing, prepayment, curve, dt, amount FROM quotes '
+                    'WHERE (borrowing, prepayment, curve, dt) IN (VALUES ' +
+                    ', '.join(['(?, ?, ?, ?)'] * len(batch)) + ')',
+                    [v for key in batch for v in key]
+                ).fetchall()
+                found.update({tuple(row[:4]): row[4] for row in rows})
+            if found:
+                self._conn.executemany(
+                    'UPDATE quotes SET used = ? WHERE borrowing = ? AND prepayment = ? AND curve = ? AND dt = ?',
+                    [(self._next_used(),) + key for key in found]
+                )
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        instrumentation.count('quote_cache_hits', len(found))
+        instrumentation.count('quote_cache_misses', len(keys) - len(found))
+        return found
+
+    def put(self, key, amt):
+        """Adds a quote to the cache, evicting the least recently used quotes if the cache is full."""
+        self.put_many({tuple(key): amt})
+
+    def put_many(self, quotes):
+        """Adds a dict of quotes by key to the cache in one transaction, evicting the least recently used quotes if
+        the cache is full."""
+        with self._lock, self._conn:
+            rows = [tuple(key) + (amt, self._next_used()) for key, amt in quotes.items()]
+            inserted = self._conn.executemany('INSERT OR IGNORE INTO quotes VALUES (?, ?, ?, ?, ?, ?)', rows)
+            self._size += inserted.rowcount
+            self._conn.executemany(
+                'UPDATE quotes SET amount = ?, used = ? '
+                'WHERE borrowing = ? AND prepayment = ? AND curve = ? AND dt = ?',
+                [row[4:] + row[:4] for row in rows]
+            )
+            if self._size > self.maxsize:
+                self._evict()
+
+    def _next_used(self):
+        self._used += 1
+        return self._used
+
+    def _evict(self):
+        # other processes may have added quotes, so count before evicting
+        self._size = self._conn.execute('SELECT COUNT(*) FROM quotes').fetchone()[0]
+        excess = self._size - self.maxsize
+        if excess > 0:
+            self._conn.execute(
+                'DELETE FROM quotes WHERE used IN (SELECT used FROM quotes ORDER BY used LIMIT ?)', (excess,)
+            )
+            self._size -= excess
+            self.evictions += excess
+
+    def invalidate(self, borrowing=None):
+        """Removes cached quotes for borrowings with the same terms as `borrowing`, or all quotes if `None`."""
+        with self._lock, self._conn:
+            if borrowing is None:
+                self._conn.execute('DELETE FROM quotes')
+            else:
+                self._conn.execute('DELETE FROM quotes WHERE borrowing = ?', (borrowing.schedule_fingerprint(),))
+            self._size = self._conn.execute('SELECT COUNT(*) FROM quotes').fetchone()[0]
+
+    def refresh_curves(self, curve_version=None):
+        """
+        Marks curves as refreshed. Sets the curve version to `curve_version`. `curve_version` is required for caches
+        stored in a file; for ':memory:' caches `None` increments an integer version. Quotes priced off prior curves are
+        kept (so switching back to a prior curve identifier reuses them) until they are evicted.
+        """
+        if curve_version is None:
+            if not _in_memory(self.path) or not isinstance(self.curve_version, numbers.Integral):
+                raise ValueError('curve_version is required to refresh the curves of this quote cache.')
+            curve_version = self.curve_version + 1
+        self.curve_version = curve_version
+
+    def clear(self):
+        """Removes all quotes and resets statistics."""
+        self.invalidate()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def info(self):
+        """Returns cache statistics as a `QuoteCacheInfo` named tuple."""
+        return QuoteCacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self))
+
+    def close(self):
+        """Closes the database connection."""
+        self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM quotes').fetchone()[0]
+
+    def __repr__(self):
+        return f'SQLiteQuoteCache({str(self.path)!r}, maxsize={self.maxsize}, curve_version={self.curve_version!r})'
+
+
+def _in_memory(path):
+    return str(path) == ':memory:'
+
+
+def _date_key(dt):
+    return str(np.datetime64(dt, 's'))
+
+
+class ScheduleTemplateCache:
+    """
+    Cache of unit principal schedules shared across borrowings that differ only in principal amount.
+
+    Fixed rate borrowings with interest only or constant payment amortization have schedules that are linear in
+    `initial_principal` once dates, coupon and amortization terms are set. The cache builds a schedule with a
+    principal of 1.0 once per distinct set of terms and scales it by each borrowing's principal, so `cash_flows`,
+    `schedule` and `payments` skip building periods. Borrowings with custom amortization, and subclasses, are always
+    built directly.
+
+    Assign the cache to a borrowing's `schedule_templates` attribute, or to `PeriodicBorrowing.schedule_templates` to
+    use it for every borrowing.
+
+    Parameters
+    ----------
+    maxsize: int, optional(default=1024)
+        Maximum number of templates to keep
+    """
+
+    _money_fields = ('bop_principal', 'interest_pmt', 'principal_pmt', 'payment', 'eop_principal')
+
+    def __init__(self, maxsize=1024):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1.')
+        self.maxsize = maxsize
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, borrowing):
+        """Template key for `borrowing`: a fingerprint of its schedule terms other than the initial principal."""
+        return fingerprint(tuple(t for t in borrowing._terms() if t[0] != 'initial_principal'))
+
+    def unit_cash_flows(self, borrowing):
+        """Returns the cached `CashFlows` for a borrowing with the same terms as `borrowing` and a principal of 1.0."""
+        key = self.key(borrowing)
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+                self.hits += 1
+                return template
+            self.misses += 1
+
+        template = borrowing._unit_principal_copy().cash_flows()
+        with self._lock:
+            self._templates[key] = template
+            while len(self._templates) > self.maxsize:
+                self._templates.popitem(last=False)
+        return template
+
+    def cash_flows(self, borrowing):
+        """Returns the `CashFlows` for `borrowing` scaled from its unit principal template."""
+        template = self.unit_cash_flows(borrowing)
+        principal = borrowing.initial_principal
+        cfs = template._replace(**{f: getattr(template, f) * principal for f in self._money_fields})
+        for arr in cfs:
+            arr.flags.writeable = False
+        return cfs
+
+    def clear(self):
+        """Removes all templates and resets statistics."""
+        with self._lock:
+            self._templates.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """Returns cache statistics as a `TemplateCacheInfo` named tuple."""
+        return TemplateCacheInfo(self.hits, self.misses, self.maxsize, len(self._templates))
+
+    def __len__(self):
+        return len(self._templates)
+
+    def __repr__(self):
+        return f'ScheduleTemplateCache(maxsize={self.maxsize}, size={len(self)})'
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from pandas.tseries.holiday import AbstractHolidayCalendar, DateOffset, Day, Easter, EasterMonday, Holiday, MO, \
+    USLaborDay, USMartinLutherKingJr, USPresidentsDay, USThanksgivingDay, next_monday, next_monday_or_tuesday, \
+    next_workday, sunday_to_monday
+
+
+class FederalReserveHolidays(AbstractHolidayCalendar):
+    """
+    U.S. Federal Reserve banking holidays. Holidays are thought to be accurate, but you should verify independently.
+    """
+
+    rules = [
+        Holiday("New Years Day", month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        Holiday("Memorial Day", start_date=datetime(1970, 1, 1), month=5, day=31, offset=DateOffset(weekday=MO(-1))),
+        Holiday("July 4th", month=7, day=4, observance=sunday_to_monday),
+        USLaborDay,
+        Holiday("Columbus Day", start_date=datetime(1971, 1, 1), month=10, day=1, offset=DateOffset(weekday=MO(2))),
+        Holiday("Veterans Day", month=11, day=11, observance=sunday_to_monday),
+        USThanksgivingDay,
+        Holiday("Christmas", month=12, day=25, observance=sunday_to_monday)
+    ]
+
+
+class LondonBankHolidays(AbstractHolidayCalendar):
+    """
+    London banking holidays. Holidays are thought to be accurate, but you should verify independently.
+    """
+
+    rules = [
+        Holiday('New Years Day', month=1, day=1, observance=next_workday),  # Since 1971?
+        Holiday('Good Friday', month=1, day=1, offset=[Easter(), Day(-2)]),
+        EasterMonday,
+        Holiday('Early May Holiday', start_date=datetime(1978, 1, 1), month=5, day=1, offset=DateOffset(weekday=MO(1))),
+        Holiday('Spring Holiday', start_date=datetime(1971, 1, 1), month=5, day=31, offset=DateOffset(weekday=MO(-1))),
+        Holiday('Summer Holiday', start_date=datetime(1971, 1, 1), month=8, day=31, offset=DateOffset(weekday=MO(-1))),
+        Holiday("Christmas", month=12, day=25, observance=next_monday),
+        Holiday('Boxing Day', month=12, day=26, observance=next_monday_or_tuesday)
+    ]
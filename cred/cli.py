@@ -0,0 +1,251 @@
+"""
+Command line batch runner for loan tapes. Run `cred --help` (or `python -m cred --help`) for usage.
+
+Reads a CSV loan tape (see `cred.tape.LoanTape` for columns) in chunks, evaluates the requested metrics for every
+borrowing, optionally across worker processes, and writes one output table per metric to the output directory:
+
+* schedule: period values of every borrowing (`schedules`)
+* balances: outstanding principal of every borrowing on each `--dates` date (`balances`)
+* prepayment: required repayment amount of every borrowing with prepayment terms on each `--dates` date
+  (`prepayment`)
+
+Tables are written incrementally as CSV files or, with `--format npz`, as one `.npz` file of columns per tape chunk.
+Runs without network access.
+"""
+import argparse
+import contextlib
+import csv
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from cred import parallel
+from cred.cache import SQLiteQuoteCache
+from cred.curves import FlatCurve
+from cred.fingerprint import fingerprint
+from cred.tape import LoanTape, SCHEDULE_COLUMNS, read_amortizations, schedule_columns, write_csv_rows
+
+
+METRICS = ('schedule', 'balances', 'prepayment')
+FORMATS = ('csv', 'npz')
+
+_quote_caches = {}
+
+_TABLES = {
+    'schedule': ('schedules', SCHEDULE_COLUMNS),
+    'balances': ('balances', ('loan_id', 'date', 'outstanding_principal')),
+    'prepayment': ('prepayment', ('loan_id', 'date', 'repayment_amount'))
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='cred', description='Evaluate schedules and quotes for a CSV loan tape.')
+    parser.add_argument('tape', help='path to CSV loan tape')
+    parser.add_argument('output', help='directory for output files (created if missing)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='number of worker processes, 0 for one per CPU (default: 1)')
+    parser.add_argument('-c', '--chunk-size', type=int, default=10000,
+                        help='number of tape rows read and evaluated at a time (default: 10000)')
+    parser.add_argument('--worker-chunk-size', type=int, default=None,
+                        help='number of borrowings sent to a worker at a time (default: about four per worker)')
+    parser.add_argument('-f', '--format', choices=FORMATS, default='csv', help='output format (default: csv)')
+    parser.add_argument('-m', '--metrics', default='schedule',
+                        help=f'comma separated metrics to compute from {", ".join(METRICS)} (default: schedule)')
+    parser.add_argument('-d', '--dates', default=None,
+                        help='comma separated as-of dates for balances and prepayment metrics')
+    parser.add_argument('--date-format', default='%Y-%m-%d',
+                        help='strptime format of dates in the tape and --dates (default: %%Y-%%m-%%d)')
+    parser.add_argument('--amortizations', default=None,
+                        help='CSV file of custom amortization schedules referenced by the tape')
+    parser.add_argument('--quote-cache', default=None,
+                        help='SQLite file of prepayment quotes reused across runs with the same curve '
+                             '(created if missing)')
+    parser.add_argument('--flat-rate', type=float, default=None,
+                        help='continuously compounded flat rate for defeasance and yield maintenance terms')
+    args = parser.parse_args(argv)
+
+    args.metrics = [m.strip() for m in args.metrics.split(',') if m.strip()]
+    for metric in args.metrics:
+        if metric not in METRICS:
+            parser.error(f'unknown metric {metric!r}, choose from {", ".join(METRICS)}')
+    try:
+        args.dates = [datetime.strptime(d.strip(), args.date_format)
+                      for d in args.dates.split(',')] if args.dates else []
+    except ValueError as e:
+        parser.error(f'invalid --dates: {e}')
+    if not args.dates and set(args.metrics) & {'balances', 'prepayment'}:
+        parser.error('--dates is required for balances and prepayment metrics')
+    if args.workers < 0 or args.chunk_size < 1:
+        parser.error('--workers must be at least 0 and --chunk-size at least 1')
+    return args
+
+
+def main(argv=None):
+    """Runs the batch runner with command line arguments `argv` (defaults to `sys.argv`) and returns the exit
+    status."""
+    args = parse_args(argv)
+    try:
+        os.makedirs(args.output, exist_ok=True)
+        tape = LoanTape(
+            args.tape,
+            amortizations=read_amortizations(args.amortizations) if args.amortizations else None,
+            date_format=args.date_format,
+            chunksize=args.chunk_size,
+            curve=FlatCurve(args.flat_rate) if args.flat_rate is not None else None
+        )
+        stats = run(tape, args.output, args.metrics, args.dates, workers=args.workers or None,
+                    chunksize=args.worker_chunk_size, fmt=args.format, quote_cache=args.quote_cache)
+    except (OSError, ValueError, TypeError, sqlite3.Error) as e:
+        print(f'cred: error: {e}', file=sys.stderr)
+        return 1
+    print(format_stats(stats))
+    return 0
+
+
+def run(tape, output, metrics, dts=(), workers=1, chunksize=None, fmt='csv', quote_cache=None):
+    """
+    Evaluates `metrics` for every borrowing in `tape` and writes one table per metric to directory `output`. If
+    `quote_cache` is the path of a `cred.cache.SQLiteQuoteCache` database, each process reads and writes prepayment
+    quotes through it, keyed by a fingerprint of the tape's curve as the curve version.
+
+    Returns
+    -------
+    dict
+        Counts of loans and rows per table, and seconds spent reading, evaluating and writing
+    """
+    stats = {'loans': 0, 'chunks': 0, 'read': 0.0, 'evaluate': 0.0, 'write': 0.0}
+    if quote_cache is not None:
+        quote_cache = (quote_cache, fingerprint(tape.curve))
+    stats.update({f'{_TABLES[m][0]}_rows': 0 for m in metrics})
+    start = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        # writers opened before a failing open are closed on exit
+        writers = {}
+        for m in metrics:
+            writers[m] = _writer(fmt, output, *_TABLES[m])
+            stack.callback(writers[m].close)
+        pool = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+        if pool is not None:
+            stack.callback(pool.shutdown)
+        chunks = tape.chunks()
+        while True:
+            t0 = time.perf_counter()
+            chunk = next(chunks, None)
+            t1 = time.perf_counter()
+            stats['read'] += t1 - t0
+            if chunk is None:
+                break
+            loan_ids = [loan_id for loan_id, _ in chunk]
+            borrowings = [borrowing for _, borrowing in chunk]
+            results = parallel.map_borrowings(_evaluate, borrowings, metrics, list(dts), quote_cache, workers=workers,
+                                              chunksize=chunksize, executor=pool)
+            t2 = time.perf_counter()
+            stats['evaluate'] += t2 - t1
+            for metric, writer in writers.items():
+                columns = _columns(metric, loan_ids, [r[metric] for r in results], dts)
+                writer.write(columns)
+                stats[f'{_TABLES[metric][0]}_rows'] += len(columns['loan_id'])
+            stats['write'] += time.perf_counter() - t2
+            stats['loans'] += len(chunk)
+            stats['chunks'] += 1
+    stats['elapsed'] = time.perf_counter() - start
+    return stats
+
+
+def format_stats(stats):
+    """Returns run statistics as printable lines of throughput and timing."""
+    elapsed = stats['elapsed']
+    lines = [f"loans: {stats['loans']:,} in {stats['chunks']:,} chunks, {elapsed:.3f}s "
+             f"({stats['loans'] / elapsed if elapsed else 0.0:,.1f} loans/s)"]
+    for key, value in stats.items():
+        if key.endswith('_rows'):
+            lines.append(f"{key[:-5]}: {value:,} rows ({value / elapsed if elapsed else 0.0:,.1f} rows/s)")
+    lines.append(f"read: {stats['read']:.3f}s, evaluate: {stats['evaluate']:.3f}s, write: {stats['write']:.3f}s")
+    return '\n'.join(lines)
+
+
+def _evaluate(borrowing, metrics, dts, quote_cache=None):
+    result = {}
+    if 'schedule' in metrics:
+        result['schedule'] = borrowing.cash_flows()
+    if 'balances' in metrics:
+        result['balances'] = borrowing.outstanding_principals(dts)
+    if 'prepayment' in metrics:
+        result['prepayment'] = _repayment_amounts(borrowing, dts, quote_cache)
+    return result
+
+
+def _repayment_amounts(borrowing, dts, quote_cache=None):
+    if borrowing.prepayment is None:
+        return np.full(len(dts), np.nan)
+    if quote_cache is not None:
+        return np.array(_quote_cache(quote_cache).repayment_amounts(borrowing, dts), dtype=float)
+    if hasattr(borrowing.prepayment, 'required_repayments'):
+        return borrowing.prepayment.required_repayments(borrowing, dts)
+    # quotes outside of the borrowing term are None
+    return np.array([borrowing.repayment_amount(dt) for dt in dts], dtype=float)
+
+
+def _quote_cache(key):
+    # one connection per process and curve version
+    if key not in _quote_caches:
+        path, curve_version = key
+        _quote_caches[key] = SQLiteQuoteCache(path, curve_version=curve_version)
+    return _quote_caches[key]
+
+
+def _columns(metric, loan_ids, values, dts):
+    if metric == 'schedule':
+        return schedule_columns(loan_ids, values)
+    name = _TABLES[metric][1][2]
+    dts = np.array(dts, dtype='datetime64[D]')
+    return {
+        'loan_id': np.repeat(np.array(loan_ids, dtype=object), len(dts)),
+        'date': np.tile(dts, len(loan_ids)),
+        name: np.concatenate(values) if values else np.array([], dtype=float)
+    }
+
+
+def _writer(fmt, output, table, columns):
+    if fmt == 'csv':
+        return _CsvWriter(os.path.join(output, f'{table}.csv'), columns)
+    return _NpzWriter(output, table)
+
+
+class _CsvWriter:
+
+    def __init__(self, path, columns):
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, columns):
+        write_csv_rows(self.writer, columns)
+
+    def close(self):
+        self.file.close()
+
+
+class _NpzWriter:
+
+    def __init__(self, output, table):
+        self.output = output
+        self.table = table
+        self.chunks = 0
+
+    def write(self, columns):
+        columns = {k: v.astype(str) if v.dtype == object else v for k, v in columns.items()}
+        np.savez(os.path.join(self.output, f'{self.table}-{self.chunks:05d}.npz'), **columns)
+        self.chunks += 1
+
+    def close(self):
+        pass
+
+
+if __name__ == '__main__':
+    sys.exit(main())
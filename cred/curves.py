@@ -0,0 +1,166 @@
+import numpy as np
+
+from cred.businessdays import as_datetime64
+from cred.fingerprint import fingerprint
+
+
+class Curve:
+    """
+    Base class for discount curves. Curves are plain picklable objects, so prepayment objects that use them can be sent
+    to worker processes, and they evaluate discount factors for arrays of dates in one call.
+
+    A curve can be passed anywhere a discount factor function is expected (e.g. `Defeasance(df_func=curve)`) and its
+    `zero_rate` method anywhere an index rate function is expected (e.g.
+    `SimpleYieldMaintenance(rate_func=curve.zero_rate)`).
+
+    Subclasses implement `zero_rates`, which returns zero rates for times in years from `base_date`.
+
+    Parameters
+    ----------
+    base_date: datetime-like
+        Date from which curve times are measured
+    compounding: str, int, optional(default='continuous')
+        'continuous' or the number of compounding periods per year for zero rates
+    days_in_year: float, optional(default=365.0)
+        Number of days per year used to convert dates into times
+    """
+
+    def __init__(self, base_date, compounding='continuous', days_in_year=365.0):
+        if compounding != 'continuous' and not (isinstance(compounding, int) and compounding > 0):
+            raise ValueError("compounding must be 'continuous' or a positive number of periods per year.")
+        self.base_date = base_date
+        self.compounding = compounding
+        self.days_in_year = days_in_year
+
+    def zero_rates(self, times):
+        """Returns zero rates for an array of times in years from `base_date`. Must be implemented by subclasses."""
+        raise NotImplementedError
+
+    def times(self, dts):
+        """Returns the time in years from `base_date` to each date in `dts`."""
+        days = (as_datetime64(dts) - as_datetime64(self.base_date)).astype(float)
+        return days / self.days_in_year
+
+    def _log_dfs(self, times):
+        times = np.asarray(times, dtype=float)
+        rates = self.zero_rates(times)
+        if self.compounding == 'continuous':
+            return -rates * times
+        return -self.compounding * times * np.log1p(rates / self.compounding)
+
+    def discount_factors(self, start_dts, end_dts):
+        """
+        Returns discount factors from each start date to the matching end date. Accepts arrays or lists of dates of the
+        same length (or a single start date).
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        return np.exp(self._log_dfs(self.times(end_dts)) - self._log_dfs(self.times(start_dts)))
+
+    def discount_factor(self, dt1, dt2):
+        """Returns the discount factor from `dt1` to `dt2`."""
+        return float(self.discount_factors([dt1], [dt2])[0])
+
+    def __call__(self, dt1, dt2):
+        return self.discount_factor(dt1, dt2)
+
+    def zero_rate(self, dt1, dt2):
+        """Returns the annualized rate between `dt1` and `dt2` implied by the curve using the curve's compounding.
+        Returns the instantaneous rate at `dt1` if the dates are the same."""
+        t = float((self.times([dt2]) - self.times([dt1]))[0])
+        if t == 0:
+            return float(self.zero_rates(self.times([dt1]))[0])
+        log_df = np.log(self.discount_factor(dt1, dt2))
+        if self.compounding == 'continuous':
+            return float(-log_df / t)
+        return float(self.compounding * np.expm1(-log_df / (self.compounding * t)))
+
+    def forward_rates(self, start_dts, end_dts, days_in_year=360.0):
+        """
+        Returns simply compounded forward rates from each start date to the matching end date implied by the curve,
+        with accrual measured as actual days over `days_in_year` (e.g. 360 for money market indexes). Accepts arrays or
+        lists of dates of the same length. End dates must be after start dates.
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        start_dts, end_dts = as_datetime64(start_dts), as_datetime64(end_dts)
+        accrual = (end_dts - start_dts).astype(float) / days_in_year
+        return np.expm1(-np.log(self.discount_factors(start_dts, end_dts))) / accrual
+
+    def fingerprint(self):
+        """Returns a SHA-256 hex digest of the curve type and parameters."""
+        return fingerprint((type(self), self._params()))
+
+    def _params(self):
+        return {k: v for k, v in vars(self).items() if not k.startswith('_')}
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({", ".join(f"{k}={v!r}" for k, v in self._params().items())})'
+
+
+class FlatCurve(Curve):
+    """
+    Curve with the same zero rate for every term.
+
+    Parameters
+    ----------
+    rate: float
+        Annualized zero rate
+    compounding: str, int, optional(default='continuous')
+        'continuous' or the number of compounding periods per year
+    days_in_year: float, optional(default=365.0)
+        Number of days per year used to convert dates into times
+    """
+
+    def __init__(self, rate, compounding='continuous', days_in_year=365.0):
+        super().__init__(base_date=np.datetime64('1970-01-01'), compounding=compounding, days_in_year=days_in_year)
+        self.rate = rate
+
+    def zero_rates(self, times):
+        return np.full(np.shape(times), float(self.rate))
+
+    def _log_dfs(self, times):
+        # zero rates are measured from any date, so discount factors only depend on the time between dates
+        times = np.asarray(times, dtype=float)
+        if self.compounding == 'continuous':
+            return -self.rate * times
+        return -self.compounding * times * np.log1p(self.rate / self.compounding)
+
+
+class ZeroCurve(Curve):
+    """
+    Curve defined by zero rates at pillar dates. Zero rates are linearly interpolated in time between pillars and held
+    flat before the first and after the last pillar.
+
+    Parameters
+    ----------
+    base_date: datetime-like
+        Curve date from which zero rates are measured
+    dates: list(datetime-like)
+        Pillar dates in ascending order
+    rates: list(float)
+        Annualized zero rate at each pillar date
+    compounding: str, int, optional(default='continuous')
+        'continuous' or the number of compounding periods per year
+    days_in_year: float, optional(default=365.0)
+        Number of days per year used to convert dates into times
+    """
+
+    def __init__(self, base_date, dates, rates, compounding='continuous', days_in_year=365.0):
+        if len(dates) != len(rates):
+            raise ValueError('Lists of pillar dates and rates must be the same lengths.')
+        if len(dates) == 0:
+            raise ValueError('Curve must have at least one pillar.')
+        super().__init__(base_date=base_date, compounding=compounding, days_in_year=days_in_year)
+        self.dates = list(dates)
+        self.rates = [float(r) for r in rates]
+        self._pillar_times = self.times(self.dates)
+        if np.any(np.diff(self._pillar_times) <= 0):
+            raise ValueError('Pillar dates must be in ascending order.')
+
+    def zero_rates(self, times):
+        return np.interp(times, self._pillar_times, self.rates)
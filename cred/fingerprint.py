@@ -0,0 +1,98 @@
+import functools
+import hashlib
+import inspect
+import numbers
+from datetime import date, datetime
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+
+def fingerprint(value):
+    """
+    Returns a deterministic SHA-256 hex digest of `value`. The digest only depends on the content of `value`, so it is
+    the same across processes and sessions and can be used to key caches on disk or in worker processes.
+
+    See `stable_token` for how values are represented.
+    """
+    return hashlib.sha256(stable_token(value).encode('utf-8')).hexdigest()
+
+
+def stable_token(value):
+    """
+    Returns a string that represents `value` independently of object identity or memory addresses.
+
+    * Numbers, strings, dates, `relativedelta` offsets and `None` are represented by their value. Integral floats are
+      represented like the equal integer, so terms read as floats from a tape match terms given as integers.
+    * Lists, tuples, dicts and array-likes (`numpy` arrays, `pandas.Series`) are represented by their elements.
+    * Functions and classes are represented by their module and qualified name. Lambdas and functions defined inside
+      other functions, whose names are not unique, are also represented by their compiled code, default arguments and
+      the values of the variables they close over, so closures from one factory with different parameters have
+      different tokens. Bound methods are represented by their object and method name.
+    * Holiday calendars are represented by their type, name and rules.
+    * Objects with a `fingerprint` method are represented by its return value. Other objects are represented by their
+      type and public attributes.
+    """
+    if value is None or isinstance(value, bool):
+        return repr(value)
+    if isinstance(value, numbers.Integral):
+        return f'i:{int(value)}'
+    if isinstance(value, numbers.Real):
+        value = float(value)
+        return f'i:{int(value)}' if value.is_integer() else f'f:{value!r}'
+    if isinstance(value, str):
+        return f's:{value!r}'
+    if isinstance(value, (datetime, date)):
+        return f'd:{value.isoformat()}'
+    if isinstance(value, np.datetime64):
+        return f'd:{np.datetime_as_string(value)}'
+    if isinstance(value, relativedelta):
+        return repr(value)
+    if inspect.ismethod(value):
+        return f'{stable_token(value.__self__)}.{value.__func__.__name__}'
+    if isinstance(value, type) or (callable(value) and hasattr(value, '__qualname__')):
+        return _function_token(value)
+    if isinstance(value, functools.partial):
+        return 'partial' + stable_token((value.func, value.args, value.keywords))
+    if hasattr(value, 'fingerprint'):
+        return f'{_type_name(value)}:{value.fingerprint()}'
+    if hasattr(value, 'tolist'):
+        return stable_token(value.tolist())
+    if isinstance(value, (list, tuple)):
+        return '[' + ','.join(stable_token(v) for v in value) + ']'
+    if isinstance(value, dict):
+        items = sorted((stable_token(k), stable_token(v)) for k, v in value.items())
+        return '{' + ','.join(f'{k}={v}' for k, v in items) + '}'
+    if isinstance(value, (set, frozenset)):
+        return '{' + ','.join(sorted(stable_token(v) for v in value)) + '}'
+    if hasattr(value, 'rules') and hasattr(value, 'holidays'):
+        return _type_name(value) + stable_token({'name': getattr(value, 'name', None), 'rules': list(value.rules)})
+    if hasattr(value, '__dict__'):
+        return _type_name(value) + stable_token({k: v for k, v in vars(value).items() if not k.startswith('_')})
+    return f'{_type_name(value)}:{value!r}'
+
+
+def _type_name(value):
+    return f'{type(value).__module__}.{type(value).__qualname__}'
+
+
+def _function_token(func):
+    name = f'{func.__module__}.{func.__qualname__}'
+    code = getattr(func, '__code__', None)
+    if code is None or ('<lambda>' not in func.__qualname__ and '<locals>' not in func.__qualname__):
+        return name
+    cells = []
+    for cell in func.__closure__ or ():
+        try:
+            contents = cell.cell_contents
+        except ValueError:
+            contents = None
+        # a recursive local function closes over itself
+        cells.append('<self>' if contents is func else stable_token(contents))
+    defaults = stable_token((func.__defaults__, func.__kwdefaults__))
+    return f'{name}({_code_token(code)};{defaults};[{",".join(cells)}])'
+
+
+def _code_token(code):
+    consts = ','.join(_code_token(c) if inspect.iscode(c) else stable_token(c) for c in code.co_consts)
+    return f'{code.co_code.hex()}:{stable_token(list(code.co_names))}:[{consts}]'
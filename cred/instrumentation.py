@@ -0,0 +1,256 @@
+"""
+Opt-in counters and step timings for the schedule and quote hot paths.
+
+Instrumentation is off by default. Timed methods are only wrapped while it is enabled, so disabled instrumentation
+adds no call overhead to them, and each counter costs one function call with a global lookup. Enable it for a block
+with `instrument` or for the rest of the process with `enable`::
+
+    with instrument() as stats:
+        borrowing.repayment_amount(dt)
+    print(stats.report())
+
+Timed steps record the number of calls and the cumulative time of creating a period with `set_period_values`
+('create_period', so its calls are the number of periods created), schedule builds ('schedule_build') and each
+prepayment class's `required_repayment`. Business day adjustments are called for every date and are not timed
+separately; their time is part of the steps that call them. Recursive calls of a step (e.g. creating
+a period that creates the previous period) are counted but timed once, so step times are wall time spent in the step.
+Counters record period cache hits and misses, cash flow cache hits and misses and quote cache hits and misses.
+
+With a `sample_rate` below one, each outermost instrumented call (e.g. a quote) is recorded with that probability
+together with everything it calls, so counts per sampled call are exact and `Stats.estimate` scales totals by the
+sample rate. Statistics are kept per process and are not synchronized across threads.
+"""
+import contextlib
+import functools
+import random
+import time
+
+
+class Stats:
+    """
+    Counters and step timings collected while instrumentation is enabled.
+
+    Attributes
+    ----------
+    counts: dict
+        Number of events by name, e.g. 'period_cache_hits'
+    calls: dict
+        Number of calls by step name
+    times: dict
+        Cumulative seconds by step name
+    samples: int
+        Number of outermost instrumented calls recorded
+    sample_rate: float
+        Sample rate the statistics were collected at
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.calls = {}
+        self.times = {}
+        self.samples = 0
+        self.sample_rate = 1.0
+        self._running = set()
+
+    def __repr__(self):
+        return f'Stats(samples={self.samples}, sample_rate={self.sample_rate}, counts={self.counts})'
+
+    def reset(self):
+        """Clears all counts and timings."""
+        self.counts = {}
+        self.calls = {}
+        self.times = {}
+        self.samples = 0
+
+    def merge(self, other):
+        """Adds the counts and timings of `other` (e.g. collected in a worker process) to these statistics."""
+        for name, n in other.counts.items():
+            self.counts[name] = self.counts.get(name, 0) + n
+        for name, n in other.calls.items():
+            self.calls[name] = self.calls.get(name, 0) + n
+        for name, t in other.times.items():
+            self.times[name] = self.times.get(name, 0.0) + t
+        self.samples += other.samples
+        return self
+
+    def estimate(self, name):
+        """Returns the count of event or step `name` scaled by the sample rate, an estimate of the total number of
+        events while instrumentation was enabled."""
+        n = self.counts.get(name, self.calls.get(name, 0))
+        return n / self.sample_rate
+
+    def as_dict(self):
+        """Returns the statistics as a dict of plain values, e.g. for logging."""
+        return {'samples': self.samples, 'sample_rate': self.sample_rate, 'counts': dict(self.counts),
+                'calls': dict(self.calls), 'times': dict(self.times)}
+
+    def report(self):
+        """Returns a printable table of counts and step timings."""
+        lines = [f'samples: {self.samples:,} (sample rate {self.sample_rate:g})']
+        for name in sorted(self.counts):
+            lines.append(f'{name:<45} {self.counts[name]:>12,}')
+        for name in sorted(self.times, key=self.times.get, reverse=True):
+            calls = self.calls[name]
+            lines.append(f'{name:<45} {calls:>12,} calls {self.times[name]:>10.4f}s '
+                         f'{self.times[name] / calls * 1e6:>10.1f}us/call')
+        return '\n'.join(lines)
+
+
+_stats = None
+_sample_rate = 1.0
+_random = random.Random()
+_depth = 0
+_recording = False
+# (class, attribute, method, step) of each timed method and whether their wrappers are installed
+_methods = []
+_installed = False
+
+
+def enable(stats=None, sample_rate=1.0, seed=None):
+    """
+    Enables instrumentation and returns the `Stats` that collects it.
+
+    Parameters
+    ----------
+    stats: Stats, optional(default=None)
+        Statistics to add to. A new `Stats` is created if `None`.
+    sample_rate: float, optional(default=1.0)
+        Probability that each outermost instrumented call is recorded, greater than 0 and at most 1
+    seed: int, optional(default=None)
+        Seed for sampling
+
+    Returns
+    -------
+    Stats
+    """
+    global _stats, _sample_rate
+    if not 0.0 < sample_rate <= 1.0:
+        raise ValueError('sample_rate must be greater than 0 and at most 1.')
+    stats = Stats() if stats is None else stats
+    stats.sample_rate = sample_rate
+    if seed is not None:
+        _random.seed(seed)
+    _stats, _sample_rate = stats, sample_rate
+    _install()
+    return stats
+
+
+def disable():
+    """Disables instrumentation and returns the `Stats` that was collecting it, if any."""
+    global _stats
+    stats, _stats = _stats, None
+    _uninstall()
+    return stats
+
+
+def active():
+    """Returns the `Stats` collecting instrumentation, or `None` if instrumentation is disabled."""
+    return _stats
+
+
+@contextlib.contextmanager
+def instrument(stats=None, sample_rate=1.0, seed=None):
+    """
+    Context manager that enables instrumentation for its block and yields the `Stats` collecting it. Restores the
+    previously active instrumentation, if any, on exit. See `enable` for parameters.
+    """
+    previous = (_stats, _sample_rate)
+    stats = enable(stats, sample_rate, seed)
+    try:
+        yield stats
+    finally:
+        if previous[0] is None:
+            disable()
+        else:
+            enable(*previous)
+
+
+def count(name, n=1):
+    """Adds `n` to the count of event `name` if instrumentation is enabled and the current call is sampled."""
+    stats = _stats
+    if stats is None:
+        return
+    if _depth == 0:
+        if _sample_rate < 1.0 and _random.random() >= _sample_rate:
+            return
+    elif not _recording:
+        return
+    stats.counts[name] = stats.counts.get(name, 0) + n
+
+
+def call(step, func, *args, **kwargs):
+    """Calls `func` with `args` and `kwargs`, recording it as step `step` if instrumentation is enabled."""
+    if _stats is None:
+        return func(*args, **kwargs)
+    return _call(step, func, args, kwargs)
+
+
+def timed(step=None):
+    """Decorator that records calls of the decorated method as step `step` (defaults to the method's qualified name)
+    if instrumentation is enabled. The class keeps the undecorated method and a recording wrapper is only installed
+    while instrumentation is enabled. Use `call` to time functions that are not methods."""
+    def decorate(func):
+        return _TimedMethod(func, func.__qualname__ if step is None else step)
+    return decorate
+
+
+class _TimedMethod:
+    """Placeholder that registers a timed method when its class is created and puts the undecorated method back."""
+
+    def __init__(self, func, step):
+        self.func = func
+        self.step = step
+
+    def __set_name__(self, owner, name):
+        setattr(owner, name, self.func)
+        _methods.append((owner, name, self.func, self.step))
+        if _installed:
+            setattr(owner, name, _wrapper(self.func, self.step))
+
+
+def _wrapper(func, step):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _stats is None:
+            return func(*args, **kwargs)
+        return _call(step, func, args, kwargs)
+    return wrapper
+
+
+def _install():
+    global _installed
+    if not _installed:
+        for owner, name, func, step in _methods:
+            setattr(owner, name, _wrapper(func, step))
+        _installed = True
+
+
+def _uninstall():
+    global _installed
+    if _installed:
+        for owner, name, func, _ in _methods:
+            setattr(owner, name, func)
+        _installed = False
+
+
+def _call(step, func, args, kwargs):
+    global _depth, _recording
+    stats = _stats
+    if _depth == 0:
+        _recording = _sample_rate >= 1.0 or _random.random() < _sample_rate
+        if _recording:
+            stats.samples += 1
+    outermost = _recording and step not in stats._running
+    if _recording:
+        stats.calls[step] = stats.calls.get(step, 0) + 1
+    if outermost:
+        stats._running.add(step)
+        start = time.perf_counter()
+    _depth += 1
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _depth -= 1
+        if outermost:
+            stats.times[step] = stats.times.get(step, 0.0) + time.perf_counter() - start
+            stats._running.discard(step)
@@ -0,0 +1,125 @@
+"""
+Sorted ledgers of dated balance changes, such as the fundings and draws of delayed-draw and construction loans.
+
+A `BalanceLedger` keeps its events sorted by date with prefix sums of the balance and of the balance times days, so
+the balance on any date and the sum of daily balances over any date range are found by binary search, in O(log n) for
+n event dates, rather than by stepping through days or events::
+
+    ledger = BalanceLedger(['2021-01-01', '2021-03-15'], [5_000_000.0, 2_000_000.0])
+    ledger.balance('2021-02-01')                        # 5,000,000
+    ledger.average_balance('2021-03-01', '2021-04-01')  # weighted by days outstanding
+"""
+import numpy as np
+
+from cred.businessdays import as_datetime64
+
+
+class BalanceLedger:
+    """
+    Balance built from dated changes. A change is included in the balance from the start of its date, so a draw
+    accrues interest from the day it is funded. Changes on the same date are combined.
+
+    Parameters
+    ----------
+    dates: list(datetime-like)
+        Dates of the balance changes, in any order
+    amounts: list(float)
+        Balance change on each date, positive for fundings and draws and negative for repayments
+    """
+
+    def __init__(self, dates=(), amounts=()):
+        dates = as_datetime64(list(dates))
+        amounts = np.asarray(amounts, dtype=float).reshape(-1)
+        if len(dates) != len(amounts):
+            raise ValueError('An amount is required for each date.')
+        self.dates, inverse = np.unique(dates, return_inverse=True)
+        self.amounts = np.bincount(inverse.reshape(-1), weights=amounts, minlength=len(self.dates))
+        # balance from each event date and the sum of daily balances from the first event date to each event date
+        self._balances = np.cumsum(self.amounts)
+        days = np.diff(self.dates).astype(float)
+        self._balance_days = np.concatenate([[0.0], np.cumsum(self._balances[:-1] * days)])
+        for arr in (self.dates, self.amounts, self._balances, self._balance_days):
+            arr.flags.writeable = False
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({len(self)} dates, balance={self.total():,.2f})'
+
+    def add(self, dates, amounts):
+        """Returns a new ledger with the changes of this ledger and the changes `amounts` on `dates`."""
+        return BalanceLedger(np.concatenate([self.dates, as_datetime64(list(dates))]),
+                             np.concatenate([self.amounts, np.asarray(amounts, dtype=float).reshape(-1)]))
+
+    def total(self):
+        """Returns the balance after every change."""
+        return float(self._balances[-1]) if len(self) else 0.0
+
+    def _index(self, dts, include_dt):
+        # number of events on or before (or only before) each date
+        return np.searchsorted(self.dates, as_datetime64(dts), side='right' if include_dt else 'left')
+
+    def balance(self, dts, include_dt=True):
+        """
+        Returns the balance on each date in `dts`, or on a single date.
+
+        Parameters
+        ----------
+        dts: datetime-like, list(datetime-like)
+            As-of dates
+        include_dt: bool, optional(default=True)
+            Include changes dated on each as-of date
+
+        Returns
+        -------
+        float, numpy.ndarray
+        """
+        k = self._index(dts, include_dt)
+        balances = np.concatenate([[0.0], self._balances])[k]
+        return float(balances) if balances.ndim == 0 else balances
+
+    def changes(self, starts, ends):
+        """Returns the sum of changes dated from each of `starts` to each of `ends`, including start dates and
+        excluding end dates."""
+        total = np.concatenate([[0.0], self._balances])
+        diff = total[self._index(ends, False)] - total[self._index(starts, False)]
+        return float(diff) if diff.ndim == 0 else diff
+
+    def _cumulative_balance_days(self, dts):
+        # sum of daily balances from the first event date to each date, excluding the date
+        dts = as_datetime64(dts)
+        k = self._index(dts, False) - 1
+        i = np.maximum(k, 0)
+        if not len(self):
+            return np.zeros(dts.shape)
+        days = (dts - self.dates[i]).astype(float)
+        return np.where(k >= 0, self._balance_days[i] + self._balances[i] * days, 0.0)
+
+    def balance_days(self, starts, ends):
+        """
+        Returns the sum of the daily balances from each of `starts` to each of `ends`, including start dates and
+        excluding end dates. Dividing by the number of days gives the average daily balance.
+
+        Parameters
+        ----------
+        starts: datetime-like, list(datetime-like)
+            First dates
+        ends: datetime-like, list(datetime-like)
+            Dates after the last dates
+
+        Returns
+        -------
+        float, numpy.ndarray
+        """
+        total = self._cumulative_balance_days(ends) - self._cumulative_balance_days(starts)
+        return float(total) if total.ndim == 0 else total
+
+    def average_balance(self, starts, ends):
+        """Returns the average daily balance from each of `starts` to each of `ends`, including start dates and
+        excluding end dates."""
+        days = (as_datetime64(ends) - as_datetime64(starts)).astype(float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            average = np.where(days > 0, self.balance_days(starts, ends) / np.where(days > 0, days, 1.0),
+                               self.balance(starts))
+        return float(average) if average.ndim == 0 else average
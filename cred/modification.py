@@ -0,0 +1,203 @@
+"""
+Loan modifications, such as coupon changes and principal paydowns, and incremental schedule regeneration.
+
+Modifications take effect from a period index or from the interest period in which a date falls. `modify` returns a
+modified copy of a `FixedRateBorrowing` whose schedule reuses the unchanged periods before the modification from the
+original borrowing's cached cash flows and only computes the periods from the effective period onward::
+
+    result = modify(borrowing, CouponChange(0.055, effective=datetime(2023, 1, 1)))
+    result.schedule  # new schedule
+    result.diff      # changes from the old schedule
+"""
+import copy
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+from cred.borrowing import CashFlows, FixedRateBorrowing
+from cred.businessdays import as_datetimes
+
+
+ModificationResult = namedtuple('ModificationResult', ['borrowing', 'schedule', 'diff'])
+ModificationResult.__doc__ = """Modified borrowing, its schedule as a `pandas.DataFrame` and a `pandas.DataFrame` of
+the changes in period values (new less old) for each changed period, indexed by period index."""
+
+_DIFF_FIELDS = ('bop_principal', 'interest_rate', 'interest_pmt', 'principal_pmt', 'payment', 'eop_principal')
+
+
+class LoanModification:
+    """
+    Base class for modifications of a `FixedRateBorrowing`'s terms. Subclasses override `coupon`, `paydown` and
+    `reamortization_index` to change period values from the effective period onward.
+
+    Parameters
+    ----------
+    effective: int, datetime-like
+        Index of the first modified period, or a date in the first modified interest period
+    """
+
+    def __init__(self, effective):
+        self.effective = effective
+
+    def effective_index(self, borrowing):
+        """Returns the index of the first period the modification applies to."""
+        if isinstance(self.effective, (int, np.integer)):
+            return int(self.effective)
+        return borrowing.date_index(self.effective)
+
+    def coupon(self, borrowing, i, coupon):
+        """Returns the coupon of period `i` given the coupon before this modification."""
+        return coupon
+
+    def paydown(self, borrowing, i):
+        """Returns the additional principal paid in period `i`."""
+        return 0.0
+
+    def reamortization_index(self, borrowing):
+        """Returns the index of the first period whose level payment is recalculated for the remaining balance and
+        amortization periods, or None if the level payment does not change."""
+        return None
+
+    def _resolved(self, borrowing):
+        # copy with the effective date resolved to a period index, so periods do not look up the date
+        resolved = copy.copy(self)
+        resolved.effective = self.effective_index(borrowing)
+        return resolved
+
+    def __repr__(self):
+        params = ', '.join(f'{k}={v!r}' for k, v in vars(self).items() if not k.startswith('_'))
+        return f'{self.__class__.__name__}({params})'
+
+
+class CouponChange(LoanModification):
+    """
+    Changes the coupon from the effective period onward. Amortizing loans with a number of amortization periods are
+    reamortized at the new coupon over the remaining amortization periods.
+
+    Parameters
+    ----------
+    coupon: float
+        New coupon rate
+    effective: int, datetime-like
+        Index of the first period at the new coupon, or a date in that interest period
+    """
+
+    def __init__(self, coupon, effective):
+        super().__init__(effective)
+        self.coupon_rate = coupon
+
+    def coupon(self, borrowing, i, coupon):
+        return self.coupon_rate if i >= self.effective_index(borrowing) else coupon
+
+    def reamortization_index(self, borrowing):
+        return self.effective_index(borrowing)
+
+
+class PrincipalPaydown(LoanModification):
+    """
+    Additional principal paid with the effective period's payment. By default later payments are unchanged, so the
+    balance amortizes faster and the balloon is smaller. If `recast` is True, the level payment of an amortizing loan is
+    recalculated from the next period for the reduced balance over the remaining amortization periods.
+
+    Parameters
+    ----------
+    amount: float
+        Principal paid down, up to the period's outstanding balance
+    effective: int, datetime-like
+        Index of the period the paydown is paid in, or a date in that interest period
+    recast: bool, optional(default=False)
+        Recalculate the level payment after the paydown
+    """
+
+    def __init__(self, amount, effective, recast=False):
+        super().__init__(effective)
+        self.amount = amount
+        self.recast = recast
+
+    def paydown(self, borrowing, i):
+        return self.amount if i == self.effective_index(borrowing) else 0.0
+
+    def reamortization_index(self, borrowing):
+        return self.effective_index(borrowing) + 1 if self.recast else None
+
+
+def modify(borrowing, *modifications):
+    """
+    Applies `modifications` to a copy of `borrowing` and returns the modified borrowing with its schedule and the
+    changes from the original schedule.
+
+    The original borrowing's cash flows are built once (or read from its cache) and the periods before the first
+    modified period are reused, so only the periods from the first modified period onward are calculated. The modified
+    borrowing's cash flows are cached, so applying further modifications to it is incremental as well.
+
+    Parameters
+    ----------
+    borrowing: FixedRateBorrowing
+        Borrowing to modify. Not changed.
+    *modifications: LoanModification
+        Modifications applied after any existing modifications of the borrowing
+
+    Returns
+    -------
+    ModificationResult
+    """
+    if not isinstance(borrowing, FixedRateBorrowing):
+        raise TypeError('Only FixedRateBorrowings can be modified.')
+    if not modifications:
+        raise ValueError('At least one modification is required.')
+    old = borrowing.cash_flows()
+    modifications = [m._resolved(borrowing) for m in modifications]
+    first = min(m.effective for m in modifications)
+    if not 0 <= first < len(old.payment):
+        raise ValueError(f'Modification period {first} is outside of the borrowing term.')
+
+    modified = copy.copy(borrowing)
+    # the copy does not share the original's caching context, even if modified inside `with borrowing:`
+    modified._in_context = False
+    modified._cache = False
+    modified._periods = {}
+    modified.modifications = list(borrowing.modifications or []) + modifications
+    modified._cached_periods = _periods_from_cash_flows(borrowing, old, first)
+    new = modified._cash_flows_from_periods()
+    modified._cached_periods = {}
+    modified._cash_flows = new
+    return ModificationResult(modified, modified._schedule_from_cash_flows(new), _diff(old, new))
+
+
+def _periods_from_cash_flows(borrowing, cfs, n):
+    # the first `n` periods rebuilt from cash flow arrays with the values `set_period_values` gives them
+    dates = {f: as_datetimes(getattr(cfs, f)[:n]) for f in ('start_date', 'end_date', 'pmt_date')}
+    if not isinstance(borrowing.start_date, datetime):
+        dates = {f: [dt.date() for dt in dts] for f, dts in dates.items()}
+    periods = {}
+    for i in range(n):
+        period = borrowing.period_type(i)
+        period.add_start_date(dates['start_date'][i])
+        period.add_end_date(dates['end_date'][i])
+        period.add_pmt_date(dates['pmt_date'][i])
+        period.add_bop_principal(float(cfs.bop_principal[i]))
+        period.add_display_field(float(cfs.interest_rate[i]), 'interest_rate')
+        period.add_interest_pmt(float(cfs.interest_pmt[i]))
+        period.add_principal_pmt(float(cfs.principal_pmt[i]))
+        period.add_display_field(float(cfs.payment[i]), 'payment')
+        period.add_display_field(float(cfs.eop_principal[i]), 'eop_principal')
+        periods[i] = period
+    return periods
+
+
+def _diff(old, new):
+    import pandas as pd
+    n = max(len(old.payment), len(new.payment))
+
+    def padded(cfs, field):
+        values = np.full(n, np.nan)
+        values[:len(cfs.payment)] = getattr(cfs, field)
+        return values
+
+    diff = pd.DataFrame({f: padded(new, f) - padded(old, f) for f in _DIFF_FIELDS}, index=pd.RangeIndex(n, name='index'))
+    changed = (diff.to_numpy() != 0).any(axis=1)
+    return diff[changed]
+
+
+__all__ = ['CashFlows', 'CouponChange', 'LoanModification', 'ModificationResult', 'PrincipalPaydown', 'modify']
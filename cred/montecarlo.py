@@ -0,0 +1,503 @@
+"""
+Monte Carlo valuation of borrowings and prepayment costs over simulated short rate paths.
+
+A short rate model fitted to a discount curve simulates its state on a grid of dates for every path at once, and
+gives each path's discount curve at any simulated date in closed form. Floating rate cash flows, present values and
+defeasance and yield maintenance costs are then evaluated for all paths of a date with array operations rather than
+by calling `required_repayment` once per scenario::
+
+    model = HullWhite(curve, base_date, mean_reversion=0.03, volatility=0.01)
+    engine = MonteCarlo(model, n_paths=10_000, seed=42)
+    costs = engine.prepayment_costs(borrowing, dts)
+    expected_costs = costs.mean(axis=0)
+
+Paths are simulated in shards of `shard_size` paths, each with its own random generator seeded from `seed` and the
+shard number, so results are reproducible and do not depend on the number of worker processes shards are evaluated in.
+"""
+import math
+
+import numpy as np
+
+from cred import parallel
+from cred.borrowing import FloatingRateBorrowing
+from cred.businessdays import as_datetime64, as_datetimes
+from cred.interest_rate import periods_in_year
+from cred.prepayment import Defeasance, SimpleYieldMaintenance
+
+
+class ShortRateModel:
+    """
+    Base class for short rate models fitted to an initial discount curve. Times are measured in years of the curve's
+    `days_in_year` from `base_date`.
+
+    Subclasses implement `simulate`, `short_rates` and `log_bond_prices`.
+
+    Parameters
+    ----------
+    curve: cred.curves.Curve
+        Initial discount curve the model is fitted to
+    base_date: datetime-like
+        Valuation date, the first date of simulated paths
+    """
+
+    def __init__(self, curve, base_date):
+        self.curve = curve
+        self.base_date = base_date
+        self._base_time = float(curve.times([base_date])[0])
+
+    def times(self, dts):
+        """Returns the time in years from `base_date` to each date in `dts`."""
+        return self.curve.times(dts) - self._base_time
+
+    def initial_log_discount(self, times):
+        """Returns the log of the initial curve's discount factor from `base_date` to each time."""
+        times = np.asarray(times, dtype=float)
+        return self.curve._log_dfs(self._base_time + times) - self.curve._log_dfs(self._base_time)
+
+    def initial_forward_rates(self, times, h=1e-4):
+        """Returns the initial curve's instantaneous forward rate at each time."""
+        times = np.asarray(times, dtype=float)
+        return (self.initial_log_discount(times - h) - self.initial_log_discount(times + h)) / (2 * h)
+
+    def simulate(self, times, n_paths, rng):
+        """Returns the model state of `n_paths` paths at each time in `times`, starting at 0, as an array with one row
+        per path. Must be implemented by subclasses."""
+        raise NotImplementedError
+
+    def short_rates(self, times, states):
+        """Returns the instantaneous short rate for states simulated at `times`. Must be implemented by subclasses."""
+        raise NotImplementedError
+
+    def log_bond_prices(self, t, states, maturities):
+        """Returns the log of the zero coupon bond price at time `t` for each state (rows) and maturity (columns). Must
+        be implemented by subclasses."""
+        raise NotImplementedError
+
+    def __repr__(self):
+        params = ', '.join(f'{k}={v!r}' for k, v in vars(self).items() if not k.startswith('_'))
+        return f'{self.__class__.__name__}({params})'
+
+
+def _ou_step_sd(mean_reversion, dt):
+    # standard deviation after `dt` of an Ornstein-Uhlenbeck process with unit volatility
+    if mean_reversion == 0:
+        return np.sqrt(dt)
+    return np.sqrt(-np.expm1(-2 * mean_reversion * dt) / (2 * mean_reversion))
+
+
+def _simulate_ou(times, n_paths, rng, mean_reversion, volatility):
+    times = np.asarray(times, dtype=float)
+    steps = np.diff(times)
+    decay = np.exp(-mean_reversion * steps)
+    sd = volatility * _ou_step_sd(mean_reversion, steps)
+    shocks = rng.standard_normal((n_paths, len(steps)))
+    states = np.zeros((n_paths, len(times)))
+    for i in range(len(steps)):
+        states[:, i + 1] = states[:, i] * decay[i] + sd[i] * shocks[:, i]
+    return states
+
+
+class HullWhite(ShortRateModel):
+    """
+    One factor Hull-White model, dr = (theta(t) - a r) dt + sigma dW, with theta fitted to the initial curve. The
+    state is the deviation of the short rate from its mean path, simulated exactly between grid dates, and bond prices
+    are analytic.
+
+    Parameters
+    ----------
+    curve: cred.curves.Curve
+        Initial discount curve
+    base_date: datetime-like
+        Valuation date
+    mean_reversion: float
+        Mean reversion speed `a`, greater than zero
+    volatility: float
+        Short rate volatility `sigma`
+    """
+
+    def __init__(self, curve, base_date, mean_reversion, volatility):
+        if mean_reversion <= 0:
+            raise ValueError('mean_reversion must be greater than zero.')
+        if volatility < 0:
+            raise ValueError('volatility must not be negative.')
+        super().__init__(curve, base_date)
+        self.mean_reversion = mean_reversion
+        self.volatility = volatility
+
+    def simulate(self, times, n_paths, rng):
+        return _simulate_ou(times, n_paths, rng, self.mean_reversion, self.volatility)
+
+    def short_rates(self, times, states):
+        a, sigma = self.mean_reversion, self.volatility
+        times = np.asarray(times, dtype=float)
+        drift = self.initial_forward_rates(times) + sigma ** 2 / (2 * a ** 2) * np.expm1(-a * times) ** 2
+        return states + drift
+
+    def _b(self, t, maturities):
+        return -np.expm1(-self.mean_reversion * (maturities - t)) / self.mean_reversion
+
+    def _v(self, t, maturities):
+        a, sigma = self.mean_reversion, self.volatility
+        tau = maturities - t
+        return sigma ** 2 / a ** 2 * (tau + 2 / a * np.exp(-a * tau) - 1 / (2 * a) * np.exp(-2 * a * tau) - 3 / (2 * a))
+
+    def log_bond_prices(self, t, states, maturities):
+        maturities = np.asarray(maturities, dtype=float)
+        forward = self.initial_log_discount(maturities) - self.initial_log_discount(t)
+        convexity = 0.5 * (self._v(t, maturities) - self._v(0.0, maturities) + self._v(0.0, np.float64(t)))
+        return (forward + convexity)[np.newaxis, :] - np.multiply.outer(states, self._b(t, maturities))
+
+
+class LognormalForwardModel(ShortRateModel):
+    """
+    Scenario model with lognormal rates. The initial forward curve is scaled on each path by a lognormal factor with a
+    mean of one, whose log follows a mean reverting process, so rates stay positive if the initial forward rates are.
+    The model is not arbitrage free: simulated discount factors are centered on the initial curve's forward discount
+    factors rather than calibrated to reprice the curve.
+
+    Parameters
+    ----------
+    curve: cred.curves.Curve
+        Initial discount curve
+    base_date: datetime-like
+        Valuation date
+    volatility: float
+        Volatility of the log of the scaling factor
+    mean_reversion: float, optional(default=0.0)
+        Mean reversion speed of the log of the scaling factor
+    """
+
+    def __init__(self, curve, base_date, volatility, mean_reversion=0.0):
+        if volatility < 0 or mean_reversion < 0:
+            raise ValueError('volatility and mean_reversion must not be negative.')
+        super().__init__(curve, base_date)
+        self.volatility = volatility
+        self.mean_reversion = mean_reversion
+
+    def simulate(self, times, n_paths, rng):
+        return _simulate_ou(times, n_paths, rng, self.mean_reversion, self.volatility)
+
+    def scaling_factors(self, times, states):
+        """Returns the factor the initial forward curve is scaled by for states simulated at `times`."""
+        variance = (self.volatility * _ou_step_sd(self.mean_reversion, np.asarray(times, dtype=float))) ** 2
+        return np.exp(states - variance / 2)
+
+    def short_rates(self, times, states):
+        return self.scaling_factors(times, states) * self.initial_forward_rates(times)
+
+    def log_bond_prices(self, t, states, maturities):
+        maturities = np.asarray(maturities, dtype=float)
+        forward = self.initial_log_discount(maturities) - self.initial_log_discount(t)
+        return np.multiply.outer(self.scaling_factors(t, states), forward)
+
+
+class RatePaths:
+    """
+    Model states of simulated paths on a grid of dates, with one row per path. Discount factors and rates observed on
+    a grid date are returned as arrays with one row per path.
+
+    Parameters
+    ----------
+    model: ShortRateModel
+        Model the paths were simulated with
+    dates: numpy.ndarray
+        Ascending `datetime64[D]` grid dates, starting on the model's base date
+    states: numpy.ndarray
+        Model state of each path (rows) on each grid date (columns)
+    """
+
+    def __init__(self, model, dates, states):
+        self.model = model
+        self.dates = dates
+        self.times = model.times(dates)
+        self.states = states
+        self._log_numeraire = None
+
+    def __len__(self):
+        return self.states.shape[0]
+
+    def __repr__(self):
+        return f'RatePaths({len(self)} paths on {len(self.dates)} dates from {self.dates[0]} to {self.dates[-1]})'
+
+    def _column(self, dt):
+        i = np.searchsorted(self.dates, np.datetime64(dt, 'D'))
+        if i == len(self.dates) or self.dates[i] != np.datetime64(dt, 'D'):
+            raise ValueError(f'{dt} is not a simulated date.')
+        return i
+
+    def short_rates(self):
+        """Returns the instantaneous short rate of each path on each grid date."""
+        return self.model.short_rates(self.times, self.states)
+
+    def discount_factors(self, dt, end_dts):
+        """Returns the discount factor from grid date `dt` to each date in `end_dts` on each path."""
+        i = self._column(dt)
+        maturities = self.model.times(as_datetime64(end_dts))
+        return np.exp(self.model.log_bond_prices(self.times[i], self.states[:, i], maturities))
+
+    def zero_rates(self, dt, end_dt, compounding=None, days_in_year=None):
+        """Returns the zero rate from grid date `dt` to `end_dt` on each path, compounded and measured like the model's
+        curve unless `compounding` and `days_in_year` are given. Returns the short rate if the dates are the same."""
+        curve = self.model.curve
+        compounding = curve.compounding if compounding is None else compounding
+        days_in_year = curve.days_in_year if days_in_year is None else days_in_year
+        t = (np.datetime64(end_dt, 'D') - np.datetime64(dt, 'D')).astype(float) / days_in_year
+        if t == 0:
+            i = self._column(dt)
+            return self.model.short_rates(self.times[i:i + 1], self.states[:, i:i + 1])[:, 0]
+        log_dfs = np.log(self.discount_factors(dt, [end_dt])[:, 0])
+        if compounding == 'continuous':
+            return -log_dfs / t
+        return compounding * np.expm1(-log_dfs / (compounding * t))
+
+    def forward_rates(self, dt, start_dts, end_dts, days_in_year=360.0):
+        """Returns simply compounded forward rates from each start date to the matching end date observed on grid date
+        `dt` on each path, with accrual measured as actual days over `days_in_year`."""
+        start_dts, end_dts = as_datetime64(start_dts), as_datetime64(end_dts)
+        accrual = (end_dts - start_dts).astype(float) / days_in_year
+        return np.expm1(-np.log(self.discount_factors(dt, end_dts) / self.discount_factors(dt, start_dts))) / accrual
+
+    def numeraire_discount_factors(self, dts=None):
+        """Returns the discount factor from the base date to each grid date in `dts` (defaults to every grid date) on
+        each path, rolling over one step zero coupon bonds between grid dates."""
+        if self._log_numeraire is None:
+            steps = np.empty((len(self), len(self.dates)))
+            steps[:, 0] = 0.0
+            for i in range(len(self.dates) - 1):
+                step = self.model.log_bond_prices(self.times[i], self.states[:, i], self.times[i + 1:i + 2])
+                steps[:, i + 1] = step[:, 0]
+            self._log_numeraire = np.cumsum(steps, axis=1)
+        if dts is None:
+            return np.exp(self._log_numeraire)
+        return np.exp(self._log_numeraire[:, [self._column(dt) for dt in as_datetime64(dts)]])
+
+
+class MonteCarlo:
+    """
+    Monte Carlo engine that simulates rate paths from a `ShortRateModel` and values borrowings and prepayment costs
+    across all paths with batched array operations.
+
+    Paths are simulated in shards of `shard_size` paths seeded from `seed` and the shard number, on a grid of the
+    dates a calculation needs plus dates at most `step_days` apart. Results for a calculation are reproducible for a
+    given seed and do not depend on the number of workers.
+
+    Parameters
+    ----------
+    model: ShortRateModel
+        Rate model
+    n_paths: int, optional(default=10000)
+        Number of paths
+    seed: int, optional(default=0)
+        Random seed
+    shard_size: int, optional(default=10000)
+        Number of paths simulated (and evaluated by a worker) at a time
+    step_days: int, optional(default=30)
+        Maximum number of days between grid dates
+    """
+
+    def __init__(self, model, n_paths=10000, seed=0, shard_size=10000, step_days=30):
+        if n_paths < 1 or shard_size < 1 or step_days < 1:
+            raise ValueError('n_paths, shard_size and step_days must be at least 1.')
+        self.model = model
+        self.n_paths = n_paths
+        self.seed = seed
+        self.shard_size = shard_size
+        self.step_days = step_days
+
+    def __repr__(self):
+        return (f'MonteCarlo({self.model!r}, n_paths={self.n_paths}, seed={self.seed}, shard_size={self.shard_size}, '
+                f'step_days={self.step_days})')
+
+    def grid(self, dts):
+        """Returns the simulation grid for `dts`: the base date, every date in `dts` on or after it and dates at most
+        `step_days` apart, as an ascending `datetime64[D]` array."""
+        base = np.datetime64(self.model.base_date, 'D')
+        dts = as_datetime64(list(dts))
+        dts = dts[dts >= base]
+        last = dts.max() if len(dts) else base
+        steps = np.arange(base, last + 1, self.step_days, dtype='datetime64[D]')
+        return np.union1d(np.concatenate([steps, dts, [last]]), [base])
+
+    def shards(self):
+        """Returns the number of paths in each shard."""
+        n = math.ceil(self.n_paths / self.shard_size)
+        return [min(self.shard_size, self.n_paths - i * self.shard_size) for i in range(n)]
+
+    def simulate(self, dts, shard=None):
+        """
+        Simulates paths on the grid for `dts`.
+
+        Parameters
+        ----------
+        dts: list(datetime-like)
+            Dates paths are needed on
+        shard: int, optional(default=None)
+            Simulates only the paths of this shard. Simulates every path if None.
+
+        Returns
+        -------
+        RatePaths
+        """
+        dates = self.grid(dts)
+        times = self.model.times(dates)
+        shards = range(len(self.shards())) if shard is None else [shard]
+        sizes = self.shards()
+        states = [self.model.simulate(times, sizes[s], np.random.default_rng([self.seed, s])) for s in shards]
+        return RatePaths(self.model, dates, np.concatenate(states))
+
+    def _map_shards(self, func, args, workers, executor):
+        shards = list(range(len(self.shards())))
+        if executor is None and (workers == 1 or len(shards) == 1):
+            results = [func(self, s, *args) for s in shards]
+        else:
+            n = len(shards)
+            results = parallel.map_chunks(func, [[self] * n, shards] + [[a] * n for a in args], workers, executor)
+        return np.concatenate(results)
+
+    def prepayment_costs(self, borrowing, dts, prepayment=None, workers=1, executor=None):
+        """
+        Required repayment amount of `borrowing` on each settlement date in `dts` on each path. `Defeasance` costs
+        discount the defeased payments with each path's discount factors, and `SimpleYieldMaintenance` costs use each
+        path's zero rate as the index rate (compounded and measured like the model's curve). Other prepayment types
+        do not depend on rates and have the same cost on every path. Dates without a required repayment are `nan`.
+
+        Parameters
+        ----------
+        borrowing: PeriodicBorrowing
+            Borrowing to prepay
+        dts: list(datetime-like)
+            Settlement dates on or after the model's base date
+        prepayment: BasePrepayment, optional(default=None)
+            Prepayment terms. Defaults to the borrowing's `prepayment`.
+        workers: int, optional(default=1)
+            Number of worker processes shards are evaluated in. Evaluates in the current process if 1.
+        executor: concurrent.futures.Executor, optional(default=None)
+            Existing executor to evaluate shards on
+
+        Returns
+        -------
+        numpy.ndarray
+            Costs with one row per path and one column per settlement date
+        """
+        prepayment = borrowing.prepayment if prepayment is None else prepayment
+        if prepayment is None:
+            raise ValueError('Borrowing has no prepayment terms.')
+        dts = list(dts)
+        if any(as_datetime64(dts) < np.datetime64(self.model.base_date, 'D')):
+            raise ValueError('Settlement dates must not be before the model base date.')
+        return self._map_shards(_shard_prepayment_costs, [borrowing, prepayment, dts], workers, executor)
+
+    def cash_flows(self, borrowing, workers=1, executor=None):
+        """
+        Payment of each period of `borrowing` on each path. Index rates of a `FloatingRateBorrowing` projected from a
+        curve and reset on or after the model's base date are the path's forward rate on the reset date; earlier
+        resets and fixings use the borrowing's own index rates. Payments of other borrowings are the same on every path.
+
+        Returns
+        -------
+        numpy.ndarray
+            Payments with one row per path and one column per period
+        """
+        return self._map_shards(_shard_cash_flows, [borrowing], workers, executor)
+
+    def present_values(self, borrowing, workers=1, executor=None):
+        """
+        Present value at the model's base date of the payments of `borrowing` due after the base date on each path,
+        discounted with each path's numeraire.
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        return self._map_shards(_shard_present_values, [borrowing], workers, executor)
+
+
+def _shard_prepayment_costs(engine, shard, borrowing, prepayment, dts):
+    paths = engine.simulate(dts, shard)
+    costs = np.full((len(paths), len(dts)), np.nan)
+    for j, dt in enumerate(dts):
+        costs[:, j] = _prepayment_cost(paths, borrowing, prepayment, dt)
+    return costs
+
+
+def _prepayment_cost(paths, borrowing, prepayment, dt):
+    open_dt = prepayment.open_date(borrowing) if hasattr(prepayment, 'open_date') else None
+    if not isinstance(prepayment, (Defeasance, SimpleYieldMaintenance)) or (open_dt and dt >= open_dt):
+        cost = prepayment.required_repayment(borrowing, dt)
+        return np.nan if cost is None else cost
+
+    if isinstance(prepayment, Defeasance):
+        settle_dt = np.datetime64(dt, 'D')
+        if settle_dt < as_datetime64(borrowing.start_date) or settle_dt > borrowing.cash_flows().pmt_date[-1]:
+            return np.nan
+        pmt_dts, amounts = prepayment.collateral_payments(borrowing, dt)
+        if len(amounts) == 0:
+            return np.nan
+        return paths.discount_factors(dt, pmt_dts) @ amounts
+
+    # yield maintenance, with the index rate from the path
+    open_pmt = super(SimpleYieldMaintenance, prepayment).required_repayment(borrowing, dt)
+    if open_pmt is None:
+        return np.nan
+    pmts = prepayment.remaining_pmts(borrowing, dt)
+    rates = paths.zero_rates(dt, prepayment.discount_rate_date(borrowing, dt)) + prepayment.margin
+    yfs = np.array([borrowing.year_frac(dt, pmt_dt) for pmt_dt in pmts.keys()], dtype=float)
+    dfs = (1 + rates[:, np.newaxis] / periods_in_year(borrowing.freq)) ** -yfs[np.newaxis, :]
+    repay_amt = dfs @ np.array(list(pmts.values()), dtype=float)
+    if prepayment.min_penalty:
+        repay_amt = np.maximum(repay_amt, prepayment.min_repayment_amount(borrowing, dt))
+    return repay_amt + borrowing.unpaid_amount(dt, interest=True, princ=True, include_dt=True)
+
+
+def _floating_resets(engine, borrowing):
+    # reset dates, index rate end dates and whether each period's index rate is simulated
+    resets = borrowing.reset_dates()
+    tenor = borrowing.freq if borrowing.index_tenor is None else borrowing.index_tenor
+    ends = as_datetime64([dt + tenor for dt in as_datetimes(resets)])
+    simulated = resets >= np.datetime64(engine.model.base_date, 'D')
+    for dt in (borrowing.fixings or {}):
+        simulated &= resets != np.datetime64(dt, 'D')
+    return resets, ends, simulated
+
+
+def _path_payments(engine, paths, borrowing):
+    cfs = borrowing.cash_flows()
+    if not isinstance(borrowing, FloatingRateBorrowing):
+        return np.tile(cfs.payment, (len(paths), 1))
+    if hasattr(borrowing.index_curve, 'period_rates'):
+        raise ValueError('Index rates compounded in arrears are not simulated.')
+
+    rates = np.tile(borrowing.index_rates(), (len(paths), 1))
+    resets, ends, simulated = _floating_resets(engine, borrowing)
+    for k in np.flatnonzero(simulated):
+        rates[:, k] = paths.forward_rates(resets[k], resets[k:k + 1], ends[k:k + 1], borrowing.index_days_in_year)[:, 0]
+    if borrowing.rounding is not None:
+        rates = np.round(rates, borrowing.rounding)
+    if borrowing.floor is not None or borrowing.cap is not None:
+        rates = np.clip(rates, borrowing.floor, borrowing.cap)
+    rates = rates + borrowing.spread
+
+    yfs = np.array([borrowing.year_frac(s, e) for s, e in zip(as_datetimes(cfs.start_date),
+                                                              as_datetimes(cfs.end_date))], dtype=float)
+    return rates * (yfs * cfs.bop_principal)[np.newaxis, :] + cfs.principal_pmt[np.newaxis, :]
+
+
+def _cash_flow_dates(engine, borrowing):
+    dts = list(borrowing.cash_flows().pmt_date)
+    if isinstance(borrowing, FloatingRateBorrowing) and not hasattr(borrowing.index_curve, 'period_rates'):
+        resets, _, simulated = _floating_resets(engine, borrowing)
+        dts += list(resets[simulated])
+    return dts
+
+
+def _shard_cash_flows(engine, shard, borrowing):
+    paths = engine.simulate(_cash_flow_dates(engine, borrowing), shard)
+    return _path_payments(engine, paths, borrowing)
+
+
+def _shard_present_values(engine, shard, borrowing):
+    paths = engine.simulate(_cash_flow_dates(engine, borrowing), shard)
+    payments = _path_payments(engine, paths, borrowing)
+    pmt_dts = borrowing.cash_flows().pmt_date
+    due = pmt_dts > np.datetime64(engine.model.base_date, 'D')
+    return (payments[:, due] * paths.numeraire_discount_factors(pmt_dts[due])).sum(axis=1)
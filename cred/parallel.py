@@ -0,0 +1,118 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def map_borrowings(func, borrowings, *args, workers=None, chunksize=None, executor=None):
+    """
+    Applies `func(borrowing, *args)` to each borrowing and returns the results in the same order as `borrowings`.
+
+    Borrowings are split into chunks of `chunksize` consecutive borrowings and each chunk is evaluated in a worker of a
+    `concurrent.futures.ProcessPoolExecutor`. `func`, the borrowings and `args` must be picklable, so `func` should be
+    defined at module level. Results do not depend on the number of workers or the chunk size.
+
+    Parameters
+    ----------
+    func: function
+        Function that takes a borrowing as its first argument
+    borrowings: list(PeriodicBorrowing)
+        Borrowings to evaluate
+    *args
+        Additional arguments passed to `func`
+    workers: int, optional(default=None)
+        Number of worker processes. Defaults to `os.cpu_count()`. If 1 and `executor` is None, evaluates in the current
+        process without a pool.
+    chunksize: int, optional(default=None)
+        Number of borrowings sent to a worker at a time. Defaults to splitting borrowings into about four chunks per
+        worker.
+    executor: concurrent.futures.Executor, optional(default=None)
+        Existing executor to reuse across calls. If None, a pool is created and shut down for the call.
+
+    Returns
+    -------
+    list
+    """
+    borrowings = list(borrowings)
+    if executor is None and (workers == 1 or len(borrowings) <= 1):
+        return [func(b, *args) for b in borrowings]
+
+    workers, chunks = split_chunks(borrowings, workers, chunksize)
+    results = map_chunks(_apply, [[func] * len(chunks), chunks, [args] * len(chunks)], workers, executor)
+    return [r for chunk_results in results for r in chunk_results]
+
+
+def split_chunks(borrowings, workers=None, chunksize=None):
+    """Returns the number of workers and the list of chunks of consecutive borrowings used by `map_borrowings`."""
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, math.ceil(len(borrowings) / (workers * 4)))
+    if chunksize < 1:
+        raise ValueError('chunksize must be at least 1.')
+    return workers, [borrowings[i:i + chunksize] for i in range(0, len(borrowings), chunksize)]
+
+
+def map_chunks(func, iterables, workers=None, executor=None):
+    """Returns the list of `func` applied to each set of arguments zipped from `iterables` in order, evaluated on
+    `executor` or on a process pool with `workers` processes created and shut down for the call."""
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    try:
+        return list(pool.map(func, *iterables))
+    finally:
+        if executor is None:
+            pool.shutdown()
+
+
+def _apply(func, chunk, args):
+    return [func(b, *args) for b in chunk]
+
+
+def schedules(borrowings, workers=None, chunksize=None, executor=None):
+    """Returns each borrowing's `schedule()` in input order, evaluated across worker processes. See `map_borrowings`
+    for parameters."""
+    return map_borrowings(_schedule, borrowings, workers=workers, chunksize=chunksize, executor=executor)
+
+
+def cash_flows(borrowings, workers=None, chunksize=None, executor=None):
+    """Returns each borrowing's `cash_flows()` in input order, evaluated across worker processes. See
+    `map_borrowings` for parameters."""
+    return map_borrowings(_cash_flows, borrowings, workers=workers, chunksize=chunksize, executor=executor)
+
+
+def period_counts(borrowings, workers=None, chunksize=None, executor=None):
+    """Returns each borrowing's `period_count()` in input order, evaluated across worker processes. See
+    `map_borrowings` for parameters."""
+    return map_borrowings(_period_count, borrowings, workers=workers, chunksize=chunksize, executor=executor)
+
+
+def payments(borrowings, first_dt=None, last_dt=None, pmt_dt=False, workers=None, chunksize=None, executor=None):
+    """Returns each borrowing's `payments(first_dt, last_dt, pmt_dt)` in input order, evaluated across worker
+    processes. See `map_borrowings` for parameters."""
+    return map_borrowings(_payments, borrowings, first_dt, last_dt, pmt_dt, workers=workers, chunksize=chunksize,
+                          executor=executor)
+
+
+def repayment_amounts(borrowings, dts, workers=None, chunksize=None, executor=None):
+    """Returns a list of `repayment_amount(dt)` for each date in `dts` for each borrowing in input order, evaluated
+    across worker processes. See `map_borrowings` for parameters."""
+    return map_borrowings(_repayment_amounts, borrowings, list(dts), workers=workers, chunksize=chunksize,
+                          executor=executor)
+
+
+def _schedule(borrowing):
+    return borrowing.schedule()
+
+
+def _cash_flows(borrowing):
+    return borrowing.cash_flows()
+
+
+def _period_count(borrowing):
+    return borrowing.period_count()
+
+
+def _payments(borrowing, first_dt, last_dt, pmt_dt):
+    return borrowing.payments(first_dt, last_dt, pmt_dt=pmt_dt)
+
+
+def _repayment_amounts(borrowing, dts):
+    return [borrowing.repayment_amount(dt) for dt in dts]
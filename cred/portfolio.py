@@ -0,0 +1,247 @@
+from collections import namedtuple
+
+import numpy as np
+
+from cred import parallel
+from cred.borrowing import CashFlows
+from cred.businessdays import as_datetime64
+from cred.ledger import BalanceLedger
+
+
+PortfolioCashFlows = namedtuple('PortfolioCashFlows', ('loan', 'period') + CashFlows._fields)
+PortfolioCashFlows.__doc__ = """Period values of every borrowing in a portfolio as flat `numpy` arrays with one element per
+loan period. `loan` is the position of the borrowing in the portfolio and `period` is the period index."""
+
+_FLOW_FIELDS = ('interest_pmt', 'principal_pmt', 'payment')
+
+_BUCKETS = {
+    None: 'D',
+    'D': 'D',
+    'M': 'M',
+    'Q': 'M',
+    'Y': 'Y'
+}
+
+
+class Portfolio:
+    """
+    Collection of borrowings with columnar cash flows. Each borrowing's cached `cash_flows` are concatenated into one
+    set of arrays (loan x period) that are aggregated with `numpy` rather than by concatenating per-loan schedules.
+
+    Methods that build schedules or quotes accept `workers`, `chunksize` and `executor` arguments to shard borrowings
+    across worker processes (see `cred.parallel.map_borrowings`). Results are always returned in portfolio order.
+
+    Parameters
+    ----------
+    borrowings: list(PeriodicBorrowing), optional(default=None)
+        Borrowings in the portfolio
+    loan_ids: list, optional(default=None)
+        Identifiers for each borrowing used to label output. Defaults to the position of each borrowing.
+    """
+
+    def __init__(self, borrowings=None, loan_ids=None):
+        self.borrowings = []
+        self.loan_ids = []
+        self._cash_flows = None
+        self._sources = None
+        borrowings = borrowings or []
+        if loan_ids is not None and len(loan_ids) != len(borrowings):
+            raise ValueError('Lists of borrowings and loan ids must be the same lengths.')
+        for i, borrowing in enumerate(borrowings):
+            self.add(borrowing, None if loan_ids is None else loan_ids[i])
+
+    def add(self, borrowing, loan_id=None):
+        """Adds a borrowing to the portfolio. `loan_id` defaults to the borrowing's position in the portfolio."""
+        self.loan_ids.append(len(self.borrowings) if loan_id is None else loan_id)
+        self.borrowings.append(borrowing)
+
+    def __len__(self):
+        return len(self.borrowings)
+
+    def __iter__(self):
+        return iter(self.borrowings)
+
+    def __getitem__(self, i):
+        return self.borrowings[i]
+
+    def __repr__(self):
+        return f'Portfolio({len(self)} borrowings)'
+
+    # Columnar cash flows
+    def cash_flows(self, workers=1, chunksize=None, executor=None):
+        """
+        Returns the period values of every borrowing as a `PortfolioCashFlows` named tuple of flat `numpy` arrays,
+        ordered by loan then period. The concatenated arrays are reused until a borrowing is added or any borrowing's
+        cash flows change.
+
+        Cash flows that are not already cached by their borrowing are built in worker processes if `workers` is not 1
+        or an `executor` is provided, and then cached on the borrowings in this process.
+
+        Returns
+        -------
+        PortfolioCashFlows
+        """
+        if workers != 1 or executor is not None:
+            self._build_cash_flows(workers, chunksize, executor)
+
+        sources = [b.cash_flows() for b in self.borrowings]
+        if (self._cash_flows is not None and len(sources) == len(self._sources) and
+                all(s is c for s, c in zip(sources, self._sources))):
+            return self._cash_flows
+
+        lengths = np.array([len(cfs.payment) for cfs in sources], dtype=np.int64)
+        loan = np.repeat(np.arange(len(sources)), lengths)
+        period = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        columns = {f: _concatenate([getattr(cfs, f) for cfs in sources], f) for f in CashFlows._fields}
+        self._cash_flows = PortfolioCashFlows(loan=loan, period=period, **columns)
+        self._sources = sources
+        return self._cash_flows
+
+    def _build_cash_flows(self, workers, chunksize, executor):
+        missing = [b for b in self.borrowings if b._cash_flows is None]
+        built = parallel.cash_flows(missing, workers=workers, chunksize=chunksize, executor=executor)
+        for borrowing, cfs in zip(missing, built):
+            for arr in cfs:
+                arr.flags.writeable = False
+            borrowing._cash_flows = cfs
+
+    def shared_cash_flows(self, workers=1, chunksize=None, executor=None):
+        """
+        Returns the period values of every borrowing in a `cred.shared.SharedCashFlows` result whose arrays are backed
+        by shared memory that worker processes write into directly. Use for large portfolios where returning per-loan
+        results from workers costs more than building them. Cash flows are not cached on the borrowings in this process.
+        Call `close` on the result (or use it as a context manager) to free the memory.
+
+        Returns
+        -------
+        SharedCashFlows
+        """
+        # shared memory is only available from Python 3.8
+        from cred import shared
+        return shared.shared_cash_flows(self.borrowings, workers=workers, chunksize=chunksize, executor=executor)
+
+    def schedules(self, workers=1, chunksize=None, executor=None):
+        """Returns a list of each borrowing's `schedule()` in portfolio order."""
+        return parallel.schedules(self.borrowings, workers=workers, chunksize=chunksize, executor=executor)
+
+    def payments(self, first_dt=None, last_dt=None, pmt_dt=False, workers=1, chunksize=None, executor=None):
+        """Returns a list of each borrowing's `payments(first_dt, last_dt, pmt_dt)` in portfolio order."""
+        return parallel.payments(self.borrowings, first_dt, last_dt, pmt_dt, workers=workers, chunksize=chunksize,
+                                 executor=executor)
+
+    def repayment_amounts(self, dts, workers=1, chunksize=None, executor=None):
+        """
+        Returns the required repayment amount of each borrowing on each date in `dts` as a `pandas.DataFrame` with
+        one row per loan id and one column per date. Borrowings without prepayment terms raise an `AttributeError`.
+        """
+        import pandas as pd
+        dts = list(dts)
+        amts = parallel.repayment_amounts(self.borrowings, dts, workers=workers, chunksize=chunksize,
+                                          executor=executor)
+        return pd.DataFrame(amts, index=pd.Index(self.loan_ids, name='loan_id'), columns=dts)
+
+    def offsets(self):
+        """Returns an array of length `len(portfolio) + 1` with the first row of each borrowing in `cash_flows`. Rows
+        for borrowing `i` are `offsets[i]` to `offsets[i + 1]`."""
+        loan = self.cash_flows().loan
+        return np.searchsorted(loan, np.arange(len(self) + 1), side='left')
+
+    def to_frame(self):
+        """Returns the portfolio cash flows as a `pandas.DataFrame` indexed by loan id and period index."""
+        import pandas as pd
+        cfs = self.cash_flows()
+        index = pd.MultiIndex.from_arrays([np.asarray(self.loan_ids, dtype=object)[cfs.loan], cfs.period],
+                                          names=['loan_id', 'index'])
+        data = {f: getattr(cfs, f) for f in CashFlows._fields}
+        for f in ('start_date', 'end_date', 'pmt_date'):
+            data[f] = data[f].astype('datetime64[ns]')
+        return pd.DataFrame(data, index=index)
+
+    # Aggregation
+    def outstanding_principal(self, dts, include_dt=False):
+        """
+        Total outstanding principal of all borrowings at each date in `dts`. Consistent with
+        `PeriodicBorrowing.outstanding_principal`: balances are reduced on payment dates and borrowings that have not
+        started are excluded.
+
+        Parameters
+        ----------
+        dts: list(datetime-like)
+            As-of dates
+        include_dt: bool, optional(default=False)
+            Indicates whether to include principal payments due on each date
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        cfs = self.cash_flows()
+        dts = as_datetime64(dts)
+
+        # initial principal at each start date and any later draws
+        fundings = [b._fundings() for b in self.borrowings]
+        funded = BalanceLedger(np.concatenate([np.empty(0, 'datetime64[D]')] + [d for d, _ in fundings]),
+                               np.concatenate([np.empty(0)] + [a for _, a in fundings])).balance(dts)
+
+        order = np.argsort(cfs.pmt_date, kind='stable')
+        paid = np.concatenate([[0.0], np.cumsum(cfs.principal_pmt[order])])
+        paid = paid[np.searchsorted(cfs.pmt_date[order], dts, side='left' if include_dt else 'right')]
+        return funded - paid
+
+    def aggregate(self, by='pmt_date', freq=None):
+        """
+        Total interest, principal and payments of all borrowings grouped by date, plus the outstanding principal after
+        payments at the end of each group.
+
+        Parameters
+        ----------
+        by: str, optional(default='pmt_date')
+            Date used to group cash flows, either 'pmt_date', 'end_date' or 'start_date'
+        freq: str, optional(default=None)
+            Bucket dates by day (None or 'D'), month ('M'), quarter ('Q') or year ('Y'). Buckets are labeled by their
+            first day.
+
+        Returns
+        -------
+        pandas.DataFrame
+        """
+        if by not in ('pmt_date', 'end_date', 'start_date'):
+            raise ValueError("by must be one of 'pmt_date', 'end_date' or 'start_date'.")
+        if freq not in _BUCKETS:
+            raise ValueError(f'freq must be one of {list(_BUCKETS.keys())}.')
+
+        import pandas as pd
+        cfs = self.cash_flows()
+        buckets = _bucket_start(getattr(cfs, by), freq)
+        bucket_dts, inverse = np.unique(buckets, return_inverse=True)
+
+        data = {f: np.bincount(inverse, weights=getattr(cfs, f), minlength=len(bucket_dts)) for f in _FLOW_FIELDS}
+        data['outstanding_principal'] = self.outstanding_principal(_bucket_end(bucket_dts, freq))
+        return pd.DataFrame(data, index=pd.DatetimeIndex(bucket_dts.astype('datetime64[ns]'), name=by))
+
+
+def _concatenate(arrays, field):
+    if not arrays:
+        return np.array([], dtype='datetime64[D]' if field.endswith('date') else float)
+    return np.concatenate(arrays)
+
+
+def _bucket_start(dts, freq):
+    """First day of the bucket containing each date."""
+    unit = _BUCKETS[freq]
+    if unit == 'D':
+        return dts
+    bucket = dts.astype(f'datetime64[{unit}]')
+    if freq == 'Q':
+        months = bucket.astype(np.int64)
+        bucket = (months - months % 3).astype('datetime64[M]')
+    return bucket.astype('datetime64[D]')
+
+
+def _bucket_end(bucket_dts, freq):
+    """Last day of each bucket labeled by its first day."""
+    unit = _BUCKETS[freq]
+    if unit == 'D':
+        return bucket_dts
+    step = 3 if freq == 'Q' else 1
+    return (bucket_dts.astype(f'datetime64[{unit}]') + step).astype('datetime64[D]') - 1
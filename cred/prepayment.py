@@ -1,7 +1,39 @@
+import bisect
+import weakref
+from contextlib import contextmanager
+
+import numpy as np
 from dateutil.relativedelta import relativedelta
 
+from cred import instrumentation
+from cred.businessdays import as_datetime64, as_datetimes
 from cred.interest_rate import periods_in_year
 from cred.borrowing import PeriodicBorrowing
+from cred.fingerprint import fingerprint
+
+
+@contextmanager
+def _cached_periods(borrowing):
+    """Caches the periods of `borrowing` while quoting and builds any periods that are not cached yet in index order,
+    so looking up a period by date does not recurse through every earlier period. Periods stay cached if the borrowing
+    is already used as a context manager."""
+    entered = not borrowing._in_context
+    if entered:
+        borrowing.__enter__()
+    try:
+        cached = borrowing._cached_periods
+        n = len(cached)
+        # skip the build if periods 0 to n - 1 are cached and there is no period n
+        if not n or max(cached) != n - 1 or borrowing.period_end_date(n) is not None:
+            i = 0
+            while borrowing.period_end_date(i) is not None:
+                if i not in cached:
+                    borrowing.period(i)
+                i += 1
+        yield borrowing
+    finally:
+        if entered:
+            borrowing.__exit__(None, None, None)
 
 
 class BasePrepayment:
@@ -12,6 +44,7 @@ class BasePrepayment:
         """
         self.ppmt_type = self.__class__.__name__
 
+    @instrumentation.timed()
     def required_repayment(self, borrowing, dt):
         """
         Calculate the prepayment amount. Called by PeriodicBorrowings to calculate prepayment. Must be implemented by subclasses.
@@ -30,6 +63,12 @@ class BasePrepayment:
         """
         raise NotImplementedError
 
+    def fingerprint(self):
+        """Returns a SHA-256 hex digest of the prepayment type and its public parameters that is deterministic across
+        processes. Functions are identified by their qualified names, and lambdas and local functions also by their
+        code and closure values (see `cred.fingerprint.stable_token`)."""
+        return fingerprint((type(self), {k: v for k, v in vars(self).items() if not k.startswith('_')}))
+
     def __repr__(self):
         desc = 'Type: ' + self.ppmt_type + '\n'
         return desc
@@ -71,21 +110,23 @@ class OpenPrepayment(BasePrepayment):
             raise ValueError(f'period_breakage must be on of {self._period_breakage_types}.')
         self.period_breakage = period_breakage
 
+    @instrumentation.timed()
     def required_repayment(self, borrowing, dt):
         """Return required repayment amount based on open prepayment."""
-        # check that date is in bounds
-        pmts = borrowing.payments(pmt_dt=True)
-        if dt < borrowing.start_date or dt > pmts[-1][0]:
-            return None
-        # calc repayment amount
-        amt = borrowing.outstanding_principal(dt, include_dt=True)
-
-        if self.period_breakage is None or self.period_breakage == 'accrued_and_unpaid':
-            amt += self.unpaid_interest(borrowing, dt)
-        if self.period_breakage == 'accrued_and_unpaid':
-            amt += self.net_accrued_interest(borrowing, dt)
-        if self.period_breakage == 'full_period':
-            amt += self.unpaid_and_current_period_interest(borrowing, dt)
+        with _cached_periods(borrowing):
+            # check that date is in bounds
+            pmts = borrowing.payments(pmt_dt=True)
+            if dt < borrowing.start_date or dt > pmts[-1][0]:
+                return None
+            # calc repayment amount
+            amt = borrowing.outstanding_principal(dt, include_dt=True)
+
+            if self.period_breakage is None or self.period_breakage == 'accrued_and_unpaid':
+                amt += self.unpaid_interest(borrowing, dt)
+            if self.period_breakage == 'accrued_and_unpaid':
+                amt += self.net_accrued_interest(borrowing, dt)
+            if self.period_breakage == 'full_period':
+                amt += self.unpaid_and_current_period_interest(borrowing, dt)
 
         return amt
 
@@ -133,7 +174,10 @@ class StepDown(OpenPrepayment):
         Date offsets are applied to the borrowing's first regular period start date and then adjusted based on the
         borrowing's `adjust_pmt_date` method. Offsets are interpreted as expiration dates, so any date on or after a
         given expiration date would use the following premium level. Repayment dates on or after the final expiration
-        date are assumed to be open.
+        date are assumed to be open. Offsets should be in ascending order.
+
+        Adjusted expiration dates are cached per borrowing and recalculated if the borrowing's first regular start
+        date, payment date adjustment or holidays change.
 
         Premiums are applied to the to the-current outstanding principal amount outstanding. Note that the outstanding
         principal balance is adjusted based on amortization payments made on payment dates rather than interest period
@@ -158,7 +202,9 @@ class StepDown(OpenPrepayment):
         super(StepDown, self).__init__(period_breakage)
         self.expiration_offsets = expiration_offsets
         self.premiums = premiums
+        self._expiration_cache = weakref.WeakKeyDictionary()
 
+    @instrumentation.timed()
     def required_repayment(self, borrowing, dt):
         """Required amount to prepay the borrowing at the given date."""
         open_amt = super(StepDown, self).required_repayment(borrowing, dt)
@@ -178,17 +224,52 @@ class StepDown(OpenPrepayment):
         """The premium at `dt` expressed as a percent in decimal form of the then outstanding balance."""
         expir_dts = self.expiration_dates(borrowing)
 
-        if dt >= expir_dts[-1]:
+        expir_i = bisect.bisect_right(expir_dts, dt)
+        if expir_i >= len(expir_dts):
             return 0.0
-
-        expir_i = min([i for i, d in enumerate(expir_dts) if d > dt])
         return self.premiums[expir_i]
 
+    def premium_pcts(self, borrowing, dts):
+        """
+        The premiums at each date in `dts` expressed as a percent in decimal form of the then outstanding balance.
+
+        Parameters
+        ----------
+        borrowing: PeriodicBorrowing
+            Borrowing used to determine premium expiration dates
+        dts: list(datetime-like)
+            Dates to look up
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        expir_dts = as_datetime64(self.expiration_dates(borrowing))
+        premiums = np.append(np.asarray(self.premiums, dtype=float), 0.0)
+        return premiums[np.searchsorted(expir_dts, as_datetime64(dts), side='right')]
+
     def expiration_dates(self, borrowing):
         """Premium expiration dates adjusted for payment date business days by applying the expiration offsets to
         the borrowing's first regular period start date."""
+        key = (borrowing.first_reg_start, borrowing.adjust_pmt_date, list(self.expiration_offsets))
+        cached = self._expiration_cache.get(borrowing)
+        if cached is not None and cached[0] == key and cached[1] is borrowing.holidays:
+            return list(cached[2])
+
         dts = [borrowing.first_reg_start + offset for offset in self.expiration_offsets]
-        return [borrowing.adjust_pmt_date(dt, borrowing.holidays) for dt in dts]
+        dts = [borrowing.adjust_pmt_date(dt, borrowing.holidays) for dt in dts]
+        self._expiration_cache[borrowing] = (key, borrowing.holidays, dts)
+        return list(dts)
+
+    def __getstate__(self):
+        # cached expiration dates are weakly keyed by borrowing and are rebuilt on demand
+        state = self.__dict__.copy()
+        del state['_expiration_cache']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._expiration_cache = weakref.WeakKeyDictionary()
 
     def __repr__(self):
         repr = super(StepDown, self).__repr__()
@@ -210,6 +291,11 @@ class Defeasance(OpenPrepayment):
         calculated by applying the open date offset to the borrowing end date. Interest period breakage during the open
         window is calculated using the same method described in `OpenPrepayment` based on `period_breakage`.
 
+        Payments are read from the borrowing's cached `cash_flows`. If `df_func` also has a
+        `discount_factors(start_dates, end_dates)` method that takes equal length `numpy.datetime64` arrays and returns
+        an array of discount factors, all discount factors are evaluated with a single call. Otherwise `df_func` is
+        called once per discount factor.
+
         Parameters
         ----------
         df_func: function
@@ -227,21 +313,129 @@ class Defeasance(OpenPrepayment):
         self.open_dt_offset = open_dt_offset
         self.dfz_to_open = dfz_to_open
 
+    @instrumentation.timed()
     def required_repayment(self, borrowing, dt):
         """Return the total estimated cost of replacement collateral"""
+        repayment = self.required_repayments(borrowing, [dt])[0]
+        if np.isnan(repayment):
+            return None
+        return float(repayment)
+
+    def required_repayments(self, borrowing, dts):
+        """
+        Total estimated cost of replacement collateral for each settlement date in `dts`. Discount factors for all
+        settlement dates outside of the open window are evaluated in one batch. Dates before the borrowing start date or
+        after the final payment date are returned as `nan`.
+
+        Parameters
+        ----------
+        borrowing: PeriodicBorrowing
+            Borrowing to defease
+        dts: list(datetime-like)
+            Settlement dates
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        dts = list(dts)
+        cfs = borrowing.cash_flows()
+        settle_dts = as_datetime64(dts)
+        repayments = np.full(len(dts), np.nan)
+
+        in_term, is_open = self._settlement_windows(borrowing, cfs, settle_dts)
+        for i in np.flatnonzero(is_open):
+            repayments[i] = super(Defeasance, self).required_repayment(borrowing, dts[i])
+
+        dfz_i = np.flatnonzero(in_term & ~is_open)
+        if len(dfz_i) > 0:
+            repayments[dfz_i] = self._collateral_cost(borrowing, cfs, [dts[i] for i in dfz_i], settle_dts[dfz_i])
+        return repayments
+
+    def _settlement_windows(self, borrowing, cfs, settle_dts):
+        # settlement dates within the borrowing term, and within the open window
+        in_term = (settle_dts >= as_datetime64(borrowing.start_date)) & (settle_dts <= cfs.pmt_date[-1])
         open_dt = self.open_date(borrowing)
+        if open_dt:
+            is_open = in_term & (settle_dts >= as_datetime64(open_dt))
+        else:
+            is_open = np.zeros(len(settle_dts), dtype=bool)
+        return in_term, is_open
 
-        open_pmt = super(Defeasance, self).required_repayment(borrowing, dt)
-        if open_pmt is None or (open_dt and (dt >= open_dt)):
-            return open_pmt
+    def cost_curve(self, borrowing, first_dt=None, last_dt=None):
+        """
+        Defeasance cost for every calendar day from `first_dt` to `last_dt` inclusive. Defaults to the borrowing start
+        date through the final payment date.
 
-        dfz_to = (self.dfz_to_open or None) and open_dt
-        pmt_dts, pmts = zip(*borrowing.payments(first_dt=dt, last_dt=dfz_to, pmt_dt=True))
-        dfs = [self.df(dt, pmt_dt) for pmt_dt in pmt_dts]
+        Returns
+        -------
+        pandas.Series
+        """
+        cfs = borrowing.cash_flows()
+        first_dt = as_datetime64(first_dt if first_dt is not None else borrowing.start_date)
+        last_dt = as_datetime64(last_dt) if last_dt is not None else cfs.pmt_date[-1]
+        dts = as_datetimes(np.arange(first_dt, last_dt + 1))
+        import pandas as pd
+        return pd.Series(self.required_repayments(borrowing, dts), index=pd.DatetimeIndex(dts))
+
+    def _collateral_cost(self, borrowing, cfs, dts, settle_dts):
+        mask, balloon, last_i = self._defeased_payments(borrowing, cfs, settle_dts)
+        rows, cols = np.nonzero(mask)
+        dfs = np.zeros(mask.shape)
+        dfs[rows, cols] = self.discount_factors([dts[r] for r in rows], settle_dts[rows], cfs.pmt_date[cols])
+
+        pv_periodic = (dfs * cfs.payment[np.newaxis, :]).sum(axis=1)
+        pv_balloon = dfs[np.arange(len(dts)), last_i] * balloon
+        return np.where(mask.any(axis=1), pv_periodic + pv_balloon, np.nan)
+
+    def _defeased_payments(self, borrowing, cfs, settle_dts):
+        # payments due on or after each settlement date (rows) through the defeasance date (columns)
+        dfz_to = (self.dfz_to_open or None) and self.open_date(borrowing)
+        mask = cfs.pmt_date[np.newaxis, :] >= settle_dts[:, np.newaxis]
+        if dfz_to is not None:
+            mask &= cfs.pmt_date[np.newaxis, :] <= as_datetime64(dfz_to)
+
+        # balloon is the balance outstanding after the last defeased payment
+        last_i = mask.shape[1] - 1 - np.argmax(mask[:, ::-1], axis=1)
+        return mask, cfs.eop_principal[last_i], last_i
+
+    def collateral_payments(self, borrowing, dt):
+        """
+        Payments the replacement collateral must fund for settlement on `dt`, including the balloon, as arrays of
+        payment dates and amounts. Returns empty arrays if no payments are defeased on `dt`.
 
-        pv_periodic = sum([df * pmt for df, pmt in zip(dfs, pmts)])
-        pv_balloon = self.df(dt, pmt_dts[-1]) * borrowing.outstanding_principal(pmt_dts[-1], include_dt=False)
-        return pv_periodic + pv_balloon
+        Returns
+        -------
+        tuple(numpy.ndarray, numpy.ndarray)
+        """
+        cfs = borrowing.cash_flows()
+        mask, balloon, last_i = self._defeased_payments(borrowing, cfs, as_datetime64([dt]))
+        amounts = cfs.payment.copy()
+        if mask[0].any():
+            amounts[last_i[0]] += balloon[0]
+        return cfs.pmt_date[mask[0]], amounts[mask[0]]
+
+    def discount_factors(self, dts, start_dts, end_dts):
+        """
+        Discount factors from each start date to the matching end date. Uses `df_func.discount_factors` if available,
+        otherwise calls `df_func` with `dts` and each end date as a `datetime`.
+
+        Parameters
+        ----------
+        dts: list(datetime-like)
+            Start dates as passed by the caller
+        start_dts: numpy.ndarray
+            Start dates as `datetime64[D]`
+        end_dts: numpy.ndarray
+            End dates as `datetime64[D]`
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        if hasattr(self.df, 'discount_factors'):
+            return np.asarray(self.df.discount_factors(start_dts, end_dts), dtype=float)
+        return np.array([self.df(dt, end_dt) for dt, end_dt in zip(dts, as_datetimes(end_dts))], dtype=float)
 
     def open_date(self, borrowing):
         """Open date for borrowing"""
@@ -251,7 +445,7 @@ class Defeasance(OpenPrepayment):
 
     def __repr__(self):
         repr = super(Defeasance, self).__repr__()
-        repr = repr + 'Discount factors: ' + self.df.__name__ + '\n'
+        repr = repr + 'Discount factors: ' + getattr(self.df, '__name__', str(self.df)) + '\n'
         repr = repr + 'Open date offset: ' + str(self.open_dt_offset) + '\n'
         repr = repr + 'Defease to open: ' + str(self.dfz_to_open) + '\n'
         return repr
@@ -305,6 +499,7 @@ class SimpleYieldMaintenance(OpenPrepayment):
         self.ym_to_open = ym_to_open
         self.min_penalty = min_penalty
 
+    @instrumentation.timed()
     def required_repayment(self, borrowing, dt):
         open_pmt = super(SimpleYieldMaintenance, self).required_repayment(borrowing, dt)
 
@@ -349,11 +544,13 @@ class SimpleYieldMaintenance(OpenPrepayment):
         if dt < borrowing.start_date:
             raise ValueError('Date is before the borrowing start date')
 
+        return self.index_rate(dt, self.discount_rate_date(borrowing, dt)) + self.margin
+
+    def discount_rate_date(self, borrowing, dt):
+        """End date of the term of the index rate used to calculate the discount rate at `dt`."""
         if self.wal_rate:
-            term_date = dt + relativedelta(days=self.discount_rate_term(borrowing, dt))
-        else:
-            term_date = (self.ym_to_open and open_dt) or borrowing.end_date
-        return self.index_rate(dt, term_date) + self.margin
+            return dt + relativedelta(days=self.discount_rate_term(borrowing, dt))
+        return (self.ym_to_open and self.open_date(borrowing)) or borrowing.end_date
 
     def discount_rate_term(self, borrowing, dt):
         """Return the number of days used to calculate the term of the discount rate. If `wal_rate` is True, returns the
@@ -410,7 +607,7 @@ class SimpleYieldMaintenance(OpenPrepayment):
 
     def __repr__(self):
         repr = super(SimpleYieldMaintenance, self).__repr__()
-        repr = repr + 'Index rate: ' + str(self.index_rate.__name__) + '\n'
+        repr = repr + 'Index rate: ' + getattr(self.index_rate, '__name__', str(self.index_rate)) + '\n'
         repr = repr + 'Margin: ' + f'{self.margin:.2%}' + '\n'
         repr = repr + 'Index rate term: ' + ((self.wal_rate and 'weighted average life') and 'open/maturity') + '\n'
         repr = repr + 'Open date offset: ' + str(self.open_dt_offset) + '\n'
@@ -0,0 +1,232 @@
+import hashlib
+
+import numpy as np
+
+from cred.businessdays import as_datetime64
+from cred.fingerprint import stable_token
+
+
+class OvernightIndex:
+    """
+    Daily overnight index (e.g. SOFR) built from local fixings for compounding in arrears.
+
+    Each fixing applies from its business day to the next business day, so the business days of the index are the
+    fixing dates. The index keeps the cumulative log growth of one unit invested at the daily rates, so the compounded
+    rate over any period is the ratio of two cumulative values and takes constant time however long the period is.
+    Cumulative arrays for rates looked back by a number of business days are built the first time they are needed and
+    cached. Days from a period date that is not a business day to the next business day accrue the previous business
+    day's rate.
+
+    If a `curve` is provided, the index is extended past the last fixing through `projection_end` with daily forward
+    rates projected from the curve over the business days defined by `holidays`.
+
+    Parameters
+    ----------
+    fixings: dict, pandas.Series
+        Daily rates by fixing date
+    days_in_year: float, optional(default=360.0)
+        Number of days per year in the index's actual day count
+    curve: cred.curves.Curve, optional(default=None)
+        Curve used to project daily rates after the last fixing
+    projection_end: datetime-like, optional(default=None)
+        Last date of projected rates. Required with `curve`.
+    holidays: list(datetime-like), optional(default=None)
+        Holidays excluded from projected business days, e.g.
+        `cred.businessdays.calendar_holidays(FederalReserveHolidays())`
+    """
+
+    def __init__(self, fixings, days_in_year=360.0, curve=None, projection_end=None, holidays=None):
+        fixings = dict(fixings)
+        if not fixings:
+            raise ValueError('fixings must not be empty.')
+        dates = as_datetime64(list(fixings.keys()))
+        rates = np.array(list(fixings.values()), dtype=float)
+        order = np.argsort(dates, kind='stable')
+        dates, rates = dates[order], rates[order]
+        if np.any(np.diff(dates) <= np.timedelta64(0, 'D')):
+            raise ValueError('Fixing dates must be unique.')
+        if not np.isfinite(rates).all():
+            raise ValueError('Fixings must be finite.')
+        if curve is not None:
+            if projection_end is None:
+                raise ValueError('projection_end is required to project rates from a curve.')
+            holidays = as_datetime64([] if holidays is None else list(holidays))
+            future = np.arange(dates[-1] + 1, np.datetime64(projection_end, 'D') + 1, dtype='datetime64[D]')
+            future = future[np.is_busday(future, holidays=holidays)]
+            if len(future) > 1:
+                dates = np.concatenate([dates, future])
+                rates = np.concatenate([rates, curve.forward_rates(future[:-1], future[1:], days_in_year), [np.nan]])
+        self.days_in_year = days_in_year
+        self.curve = curve
+        self.projection_end = projection_end
+        self.dates = dates
+        self.rates = rates
+        self.dates.flags.writeable = False
+        self.rates.flags.writeable = False
+        self._days = np.diff(dates).astype(float)
+        self._log_index = {}
+        self._fingerprint = None
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __repr__(self):
+        return f'OvernightIndex({len(self)} days from {self.dates[0]} to {self.dates[-1]})'
+
+    def __getstate__(self):
+        # cumulative arrays are rebuilt on demand in the receiving process
+        state = self.__dict__.copy()
+        state['_log_index'] = {}
+        return state
+
+    def fingerprint(self):
+        """Returns a SHA-256 hex digest of the index dates, rates and day count."""
+        if self._fingerprint is None:
+            digest = hashlib.sha256(self.dates.astype('int64').tobytes())
+            digest.update(self.rates.tobytes())
+            digest.update(stable_token(self.days_in_year).encode('utf-8'))
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def shifted_rates(self, lookback=0):
+        """Returns the rate applied on each business day when rates are looked back `lookback` business days, with
+        `nan` for days without a rate."""
+        if lookback == 0:
+            return self.rates
+        shifted = np.full(len(self.rates), np.nan)
+        shifted[lookback:] = self.rates[:-lookback]
+        return shifted
+
+    def log_index(self, lookback=0):
+        """Returns the cumulative log growth of the index at each business day, applying the rate of `lookback` business
+        days earlier on each day. Cached per `lookback`."""
+        log_index = self._log_index.get(lookback)
+        if log_index is None:
+            rates = self.shifted_rates(lookback)[:-1]
+            growth = np.log1p(np.nan_to_num(rates) * self._days / self.days_in_year)
+            log_index = np.concatenate([[0.0], np.cumsum(growth)])
+            log_index.flags.writeable = False
+            self._log_index[lookback] = log_index
+        return log_index
+
+    def _log_growth(self, starts, ends, lookback):
+        # log growth from each start to end date: partial business day steps at either end accrue the rate of the
+        # business day before them, and whole steps in between come from the cumulative index
+        rates = np.nan_to_num(self.shifted_rates(lookback))
+        log_index = self.log_index(lookback)
+        k0 = np.searchsorted(self.dates, starts, side='right') - 1
+        k1 = np.searchsorted(self.dates, starts, side='left')
+        k_end = np.searchsorted(self.dates, ends, side='right') - 1
+        head = np.log1p(rates[k0] * (self.dates[np.minimum(k1, k_end)] - starts).astype(float) / self.days_in_year)
+        tail = np.log1p(rates[k_end] * (ends - self.dates[k_end]).astype(float) / self.days_in_year)
+        whole = head + log_index[k_end] - log_index[np.minimum(k1, k_end)] + tail
+        within = np.log1p(rates[k0] * (ends - starts).astype(float) / self.days_in_year)
+        return np.where(k_end < k1, within, whole)
+
+    def compounded_rates(self, start_dts, end_dts, lookback=0, lockout=0, observation_shift=False):
+        """
+        Returns the annualized rate compounded in arrears over each period from a start date to the matching end date,
+        as a `numpy` array.
+
+        Parameters
+        ----------
+        start_dts: list(datetime-like)
+            Period start dates
+        end_dts: list(datetime-like)
+            Period end dates, after the matching start dates
+        lookback: int, optional(default=0)
+            Number of business days each day's rate is looked back. Without `observation_shift`, rates are weighted by
+            the days in the interest period.
+        lockout: int, optional(default=0)
+            Number of business days at the end of each period that use the rate of the business day before them
+        observation_shift: bool, optional(default=False)
+            If True, compound over the observation period `lookback` business days before the interest period, weighted
+            by observation period days
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        starts, ends = as_datetime64(start_dts), as_datetime64(end_dts)
+        if lookback < 0 or lockout < 0:
+            raise ValueError('lookback and lockout must not be negative.')
+        if observation_shift and lockout:
+            raise ValueError('Lockout is not supported with an observation shift.')
+        if np.any(ends <= starts):
+            raise ValueError('Period end dates must be after start dates.')
+        if len(starts) == 0:
+            return np.array([], dtype=float)
+
+        if observation_shift:
+            k_start = np.searchsorted(self.dates, starts, side='left') - lookback
+            k_end = np.searchsorted(self.dates, ends, side='left') - lookback
+            self._check_range(k_start.min() >= 0 and k_end.max() < len(self.dates), starts, ends)
+            starts, ends = self.dates[k_start], self.dates[k_end]
+            log_growth = self.log_index()[k_end] - self.log_index()[k_start]
+            return np.expm1(log_growth) * self.days_in_year / (ends - starts).astype(float)
+
+        first = np.searchsorted(self.dates, starts, side='right') - 1
+        self._check_range(first.min() >= lookback and ends.max() <= self.dates[-1], starts, ends)
+        if lockout == 0:
+            log_growth = self._log_growth(starts, ends, lookback)
+        else:
+            log_growth = self._locked_log_growth(starts, ends, lookback, lockout)
+        return np.expm1(log_growth) * self.days_in_year / (ends - starts).astype(float)
+
+    def _locked_log_growth(self, starts, ends, lookback, lockout):
+        # rates of the last `lockout` business days before each period end are replaced by the rate of the business day
+        # before them
+        k_end = np.searchsorted(self.dates, ends, side='left')
+        k_lock = k_end - lockout
+        self._check_range(k_lock.min() >= 1 + lookback, starts, ends)
+        lock_start = np.maximum(self.dates[k_lock], starts)
+        log_growth = np.where(lock_start > starts, self._log_growth(starts, lock_start, lookback), 0.0)
+
+        locked_rates = self.shifted_rates(lookback)[k_lock - 1]
+        # days each locked business day accrues within the period
+        k = k_lock[:, None] + np.arange(lockout)
+        day_start = np.maximum(self.dates[k], lock_start[:, None])
+        day_end = np.minimum(self.dates[k + 1], ends[:, None])
+        days = np.maximum((day_end - day_start).astype(float), 0.0)
+        return log_growth + np.log1p(locked_rates[:, None] * days / self.days_in_year).sum(axis=1)
+
+    def _check_range(self, covered, starts, ends):
+        if not covered:
+            raise ValueError(f'Index from {self.dates[0]} to {self.dates[-1]} does not cover periods from '
+                             f'{starts.min()} to {ends.max()} with the lookback.')
+
+
+class CompoundedInArrears:
+    """
+    Compounding in arrears conventions applied to an `OvernightIndex`. Pass as the `index_curve` of a
+    `cred.borrowing.FloatingRateBorrowing` to accrue each interest period at the index compounded over the period. One
+    index (and its cached cumulative arrays) can be shared by many borrowings with different conventions.
+
+    Parameters
+    ----------
+    index: OvernightIndex
+        Daily index fixings
+    lookback: int, optional(default=0)
+        Number of business days each day's rate is looked back
+    lockout: int, optional(default=0)
+        Number of business days at the end of each period that use the rate of the business day before them
+    observation_shift: bool, optional(default=False)
+        If True, weight rates by the days of the observation period shifted back `lookback` business days rather than
+        the interest period
+    """
+
+    def __init__(self, index, lookback=0, lockout=0, observation_shift=False):
+        if observation_shift and lockout:
+            raise ValueError('Lockout is not supported with an observation shift.')
+        self.index = index
+        self.lookback = lookback
+        self.lockout = lockout
+        self.observation_shift = observation_shift
+
+    def __repr__(self):
+        return (f'CompoundedInArrears({self.index!r}, lookback={self.lookback}, lockout={self.lockout}, '
+                f'observation_shift={self.observation_shift})')
+
+    def period_rates(self, start_dts, end_dts):
+        """Returns the compounded rate of each interest period from a start date to the matching end date."""
+        return self.index.compounded_rates(start_dts, end_dts, self.lookback, self.lockout, self.observation_shift)
@@ -0,0 +1,174 @@
+"""
+Bump and reprice sensitivities of borrowing values and defeasance costs to parallel and key rate shifts of a discount
+curve.
+
+Sensitivities reuse each borrowing's cached `cash_flows` and only re-evaluate discounting: the curve is evaluated once
+for the dates that are needed and every bump is applied to those discount factors in one matrix, so the schedule is
+not rebuilt for each bump::
+
+    sensitivity = Sensitivity(curve, valuation_date)
+    dict(zip(sensitivity.labels, sensitivity.dv01(borrowing)))
+"""
+import numpy as np
+
+from cred.businessdays import as_datetime64, as_datetimes
+from cred.prepayment import Defeasance
+
+
+DEFAULT_TENORS = (0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 7.0, 10.0, 20.0, 30.0)
+
+
+class Sensitivity:
+    """
+    Parallel and key rate bumps of a discount curve from a valuation date.
+
+    Bumps are continuously compounded zero rate shifts measured from `base_date`, applied to the curve's discount
+    factors. A key rate bump shifts rates by `size` at its tenor, tapering linearly to zero at the neighbouring tenors,
+    and the first and last key rates also shift all shorter and longer rates, so the key rate bumps add up to the
+    parallel bump.
+
+    Results are arrays with a row for the unbumped curve followed by a row for each bump in `labels`.
+
+    Parameters
+    ----------
+    curve: cred.curves.Curve, function
+        Discount curve, or a function that takes two dates and returns the discount factor between them
+    base_date: datetime-like
+        Valuation date
+    tenors: list(float), optional(default=DEFAULT_TENORS)
+        Key rate tenors in years, in ascending order. No key rate bumps if empty.
+    size: float, optional(default=0.0001)
+        Size of each bump
+    parallel: bool, optional(default=True)
+        If True, the first bump is a parallel shift
+    days_in_year: float, optional(default=None)
+        Number of days per year used to measure tenors. Defaults to the curve's `days_in_year`, or 365.
+    """
+
+    def __init__(self, curve, base_date, tenors=DEFAULT_TENORS, size=0.0001, parallel=True, days_in_year=None):
+        tenors = [float(t) for t in tenors]
+        if np.any(np.diff(tenors) <= 0):
+            raise ValueError('tenors must be in ascending order.')
+        if not tenors and not parallel:
+            raise ValueError('At least one bump is required.')
+        self.curve = curve
+        self.base_date = base_date
+        self.tenors = tenors
+        self.size = size
+        self.parallel = parallel
+        self.days_in_year = days_in_year if days_in_year is not None else getattr(curve, 'days_in_year', 365.0)
+
+    def __repr__(self):
+        return (f'Sensitivity({self.curve!r}, base_date={self.base_date!r}, tenors={self.tenors}, size={self.size}, '
+                f'parallel={self.parallel})')
+
+    @property
+    def labels(self):
+        """Names of the bumps, e.g. ['parallel', '0.25y', ..., '30y']."""
+        return (['parallel'] if self.parallel else []) + [f'{t:g}y' for t in self.tenors]
+
+    def shifts(self, dts):
+        """Returns the zero rate shift of each bump (rows) at each date in `dts` (columns)."""
+        times = self._times(as_datetime64(dts))
+        rows = [np.ones(len(times))] if self.parallel else []
+        for i in range(len(self.tenors)):
+            rows.append(np.interp(times, self.tenors, np.eye(len(self.tenors))[i]))
+        return self.size * np.array(rows).reshape(len(rows), len(times))
+
+    def _times(self, dts):
+        return (dts - np.datetime64(self.base_date, 'D')).astype(float) / self.days_in_year
+
+    def discount_factors(self, dts):
+        """
+        Returns discount factors from `base_date` to each date in `dts` for the unbumped curve (first row) and each
+        bump. The curve is evaluated once for each distinct date.
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        dts, inverse = np.unique(as_datetime64(dts), return_inverse=True)
+        starts = np.full(len(dts), np.datetime64(self.base_date, 'D'))
+        if hasattr(self.curve, 'discount_factors'):
+            dfs = np.asarray(self.curve.discount_factors(starts, dts), dtype=float)
+        else:
+            dfs = np.array([self.curve(self.base_date, dt) for dt in as_datetimes(dts)], dtype=float)
+        bumped = dfs * np.exp(-self.shifts(dts) * self._times(dts))
+        return np.vstack([dfs, bumped])[:, inverse]
+
+    def values(self, borrowing):
+        """Returns the present value at `base_date` of the borrowing's payments due after `base_date`, for the
+        unbumped curve and each bump."""
+        cfs = borrowing.cash_flows()
+        due = cfs.pmt_date > np.datetime64(self.base_date, 'D')
+        return self.discount_factors(cfs.pmt_date[due]) @ cfs.payment[due]
+
+    def portfolio_values(self, portfolio):
+        """Returns the present value of each borrowing in `portfolio` (columns) for the unbumped curve and each bump
+        (rows), from the portfolio's columnar cash flows."""
+        cfs = portfolio.cash_flows()
+        due = cfs.pmt_date > np.datetime64(self.base_date, 'D')
+        pvs = self.discount_factors(cfs.pmt_date[due]) * cfs.payment[due]
+        return np.array([np.bincount(cfs.loan[due], weights=row, minlength=len(portfolio)) for row in pvs])
+
+    def defeasance_costs(self, borrowing, dts, prepayment=None):
+        """
+        Defeasance cost of `borrowing` on each settlement date in `dts` (columns) for the unbumped curve and each bump
+        (rows), discounting with this curve in place of the prepayment's `df_func`. Costs in the open window do not
+        depend on rates. Dates before the borrowing start date or after the final payment date are `nan`.
+
+        Parameters
+        ----------
+        borrowing: PeriodicBorrowing
+            Borrowing to defease
+        dts: list(datetime-like)
+            Settlement dates on or after `base_date`
+        prepayment: Defeasance, optional(default=None)
+            Defeasance terms. Defaults to the borrowing's `prepayment`.
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        prepayment = borrowing.prepayment if prepayment is None else prepayment
+        if not isinstance(prepayment, Defeasance):
+            raise ValueError('Defeasance prepayment terms are required.')
+        dts = list(dts)
+        settle_dts = as_datetime64(dts)
+        if np.any(settle_dts < np.datetime64(self.base_date, 'D')):
+            raise ValueError('Settlement dates must not be before the base date.')
+
+        cfs = borrowing.cash_flows()
+        costs = np.full((len(self.labels) + 1, len(dts)), np.nan)
+        in_term, is_open = prepayment._settlement_windows(borrowing, cfs, settle_dts)
+        for i in np.flatnonzero(is_open):
+            costs[:, i] = super(Defeasance, prepayment).required_repayment(borrowing, dts[i])
+
+        dfz_i = np.flatnonzero(in_term & ~is_open)
+        if len(dfz_i) > 0:
+            mask, balloon, last_i = prepayment._defeased_payments(borrowing, cfs, settle_dts[dfz_i])
+            amounts = np.where(mask, cfs.payment[np.newaxis, :], 0.0)
+            amounts[np.arange(len(dfz_i)), last_i] += balloon
+            dfs = self.discount_factors(np.concatenate([cfs.pmt_date, settle_dts[dfz_i]]))
+            n = len(cfs.pmt_date)
+            # forward discount factors from each settlement date are ratios of discount factors from the base date
+            dfz_costs = (dfs[:, :n] @ amounts.T) / dfs[:, n:]
+            costs[:, dfz_i] = np.where(mask.any(axis=1), dfz_costs, np.nan)
+        return costs
+
+    def dv01(self, borrowing):
+        """Returns the change in the borrowing's value for a one basis point increase in rates under each bump."""
+        return self._dv01(self.values(borrowing))
+
+    def portfolio_dv01(self, portfolio):
+        """Returns the change in the value of each borrowing in `portfolio` (columns) for a one basis point increase in
+        rates under each bump (rows)."""
+        return self._dv01(self.portfolio_values(portfolio))
+
+    def defeasance_dv01(self, borrowing, dts, prepayment=None):
+        """Returns the change in the defeasance cost on each settlement date in `dts` (columns) for a one basis point
+        increase in rates under each bump (rows). See `defeasance_costs`."""
+        return self._dv01(self.defeasance_costs(borrowing, dts, prepayment))
+
+    def _dv01(self, values):
+        return (values[1:] - values[0]) * (0.0001 / self.size)
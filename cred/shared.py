@@ -0,0 +1,183 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from cred import parallel
+from cred.borrowing import CashFlows
+
+
+_DTYPES = {f: np.dtype('datetime64[D]' if f.endswith('date') else float) for f in CashFlows._fields}
+
+
+class SharedCashFlows:
+    """
+    Period values of a list of borrowings held in `multiprocessing.shared_memory` blocks, one block per `CashFlows`
+    field. Worker processes write each borrowing's rows directly into the blocks, so results are not pickled back to
+    the parent process or concatenated.
+
+    Attributes have the same names as `PortfolioCashFlows`: `loan` and `period` plus one flat `numpy` array per
+    `CashFlows` field, ordered by loan then period. Field arrays are read-only views of the shared memory. `close`
+    removes the blocks so workers can no longer attach to them, and each block is unmapped once no array viewing it is
+    referenced, so arrays taken from the result stay readable after it is closed. Use as a context manager to close the
+    result on exit.
+
+    Created by `shared_cash_flows` or `Portfolio.shared_cash_flows`.
+    """
+
+    fields = ('loan', 'period') + CashFlows._fields
+
+    def __init__(self, counts):
+        counts = np.asarray(counts, dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        size = int(self.offsets[-1])
+        self.loan = np.repeat(np.arange(len(counts)), counts)
+        self.period = np.arange(size) - np.repeat(self.offsets[:-1], counts)
+        self._blocks = {}
+        try:
+            for f, dtype in _DTYPES.items():
+                self._blocks[f] = shared_memory.SharedMemory(create=True, size=max(size * dtype.itemsize, 1))
+        except Exception:
+            self.close()
+            raise
+        for f, block in self._blocks.items():
+            arr = np.asarray(_Mapping(block, _DTYPES[f], size))
+            arr.flags.writeable = False
+            setattr(self, f, arr)
+
+    def __len__(self):
+        return len(self.loan)
+
+    def layout(self):
+        """Returns `(field, block name, dtype, rows)` for each field, used by workers to attach to the blocks."""
+        return tuple((f, block.name, _DTYPES[f].str, len(self)) for f, block in self._blocks.items())
+
+    @property
+    def closed(self):
+        return not self._blocks
+
+    def close(self):
+        """Releases the field arrays and removes the shared memory blocks. Memory is freed when the last array viewing
+        a block is released."""
+        for f in _DTYPES:
+            self.__dict__.pop(f, None)
+        blocks, self._blocks = self._blocks, {}
+        for block in blocks.values():
+            block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except AttributeError:
+            pass
+
+    def __repr__(self):
+        state = 'closed' if self.closed else f'{len(self)} rows'
+        return f'SharedCashFlows({len(self.offsets) - 1} borrowings, {state})'
+
+
+class _Mapping:
+    """Owner of a shared memory block's mapping, referenced as the base of the arrays viewing the block so the block
+    is only unmapped once no array is left."""
+
+    def __init__(self, block, dtype, rows):
+        self.block = block
+        self._view = np.ndarray((rows,), dtype=dtype, buffer=block.buf)
+        self.__array_interface__ = self._view.__array_interface__
+
+    def __del__(self):
+        self._view = None
+        self.block.close()
+
+
+def shared_cash_flows(borrowings, workers=None, chunksize=None, executor=None):
+    """
+    Returns the period values of each borrowing in a `SharedCashFlows` columnar result backed by shared memory.
+
+    The number of periods of each borrowing is counted first (in worker processes unless evaluating serially), the
+    parent allocates one shared memory block per field sized for all periods, and each chunk of borrowings is written
+    into its rows by a worker. Only the borrowings and the block names are pickled. See
+    `cred.parallel.map_borrowings` for parameters.
+
+    Returns
+    -------
+    SharedCashFlows
+    """
+    borrowings = list(borrowings)
+    if executor is None and (workers == 1 or len(borrowings) <= 1):
+        result = SharedCashFlows([b.period_count() for b in borrowings])
+        return _fill(result, [borrowings], [0])
+
+    workers, chunks = parallel.split_chunks(borrowings, workers, chunksize)
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    try:
+        counts = parallel.period_counts(borrowings, chunksize=len(chunks[0]), executor=pool)
+        result = SharedCashFlows(counts)
+        starts = [int(result.offsets[i]) for i in np.cumsum([0] + [len(chunk) for chunk in chunks[:-1]])]
+        return _fill(result, chunks, starts, pool)
+    finally:
+        if executor is None:
+            pool.shutdown()
+
+
+def _fill(result, chunks, starts, executor=None):
+    try:
+        if executor is None:
+            rows = [_write_chunk(chunk, start, result.layout()) for chunk, start in zip(chunks, starts)]
+        else:
+            rows = parallel.map_chunks(_write_chunk, [chunks, starts, [result.layout()] * len(chunks)],
+                                       executor=executor)
+        if sum(rows) != len(result):
+            raise RuntimeError('Borrowings produced a different number of periods than counted.')
+        return result
+    except Exception:
+        result.close()
+        raise
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # before Python 3.13 attaching registers the block with the worker's resource tracker, which would unlink it
+        # when the worker exits
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _write_chunk(chunk, start, layout):
+    blocks = [_attach(name) for _, name, _, _ in layout]
+    try:
+        return _write_rows(chunk, start, layout, blocks)
+    finally:
+        for block in blocks:
+            try:
+                block.close()
+            except BufferError:
+                # views are still referenced by a traceback and the mapping is released with them
+                pass
+
+
+def _write_rows(chunk, start, layout, blocks):
+    columns = {f: np.ndarray((rows,), dtype=dtype, buffer=block.buf)
+               for (f, _, dtype, rows), block in zip(layout, blocks)}
+    row = start
+    for borrowing in chunk:
+        cfs = borrowing.cash_flows()
+        n = len(cfs.payment)
+        if row + n > len(columns['payment']):
+            raise RuntimeError('Borrowings produced a different number of periods than counted.')
+        for f, col in columns.items():
+            col[row:row + n] = getattr(cfs, f)
+        row += n
+    return row - start
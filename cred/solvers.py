@@ -0,0 +1,132 @@
+"""
+Vectorized solvers for level payment loan terms.
+
+Solvers invert the level payment (annuity) formula of `FixedRateBorrowing` amortization, which uses a periodic rate
+of `coupon / 12` and a constant principal and interest payment over `amort_periods` periods, so regular payments of
+a borrowing built from solved terms match the target. Every argument may be a scalar or an array, and arrays are
+broadcast together, so targets for thousands of loans are solved in one call without building schedules::
+
+    # coupon that gives each loan a monthly payment that covers its net operating income 1.25 times
+    coupons = coupon_for_payment(dscr_payment(noi, 1.25), principal, 360)
+"""
+import numpy as np
+
+
+def _annuity_factor(rate, n):
+    # payment per unit of principal at periodic rate `rate` over `n` periods, and its derivative with respect to rate
+    rate, n = np.broadcast_arrays(np.asarray(rate, dtype=float), np.asarray(n, dtype=float))
+    small = np.abs(rate) < 1e-12
+    r = np.where(small, 1.0, rate)
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        log_q = -n * np.log1p(r)
+        q, paid = np.exp(log_q), -np.expm1(log_q)
+        factor = np.where(small, 1 / n + rate * (n + 1) / (2 * n), r / paid)
+        d_factor = np.where(small, (n + 1) / (2 * n), (paid - r * n * q / (1 + r)) / paid ** 2)
+    return factor, d_factor
+
+
+def level_payment(principal, coupon, amort_periods):
+    """
+    Returns the constant principal and interest payment that fully amortizes `principal` over `amort_periods`
+    periods at a periodic rate of `coupon / 12`.
+
+    Parameters
+    ----------
+    principal: float, numpy.ndarray
+        Initial principal
+    coupon: float, numpy.ndarray
+        Annual coupon rate
+    amort_periods: int, numpy.ndarray
+        Number of amortization periods
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    return _annuity_factor(np.asarray(coupon, dtype=float) / 12, amort_periods)[0] * np.asarray(principal, dtype=float)
+
+
+def principal_for_payment(payment, coupon, amort_periods):
+    """Returns the principal that a level `payment` fully amortizes over `amort_periods` periods at a periodic rate of
+    `coupon / 12`."""
+    return np.asarray(payment, dtype=float) / _annuity_factor(np.asarray(coupon, dtype=float) / 12, amort_periods)[0]
+
+
+def amort_periods_for_payment(payment, principal, coupon):
+    """
+    Returns the (fractional) number of amortization periods over which a level `payment` fully amortizes `principal`
+    at a periodic rate of `coupon / 12`. Returns `inf` where the payment does not exceed the periodic interest. Round
+    up to get an amortization whose payment does not exceed the target.
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    payment, principal = np.asarray(payment, dtype=float), np.asarray(principal, dtype=float)
+    rate = np.asarray(coupon, dtype=float) / 12
+    small = np.abs(rate) < 1e-12
+    r = np.where(small, 1.0, rate)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        interest_share = r * principal / payment
+        n = np.where(interest_share < 1, -np.log1p(-interest_share) / np.log1p(r), np.inf)
+        return np.where(small, principal / payment, n)
+
+
+def coupon_for_payment(payment, principal, amort_periods, tol=1e-12, max_iter=100):
+    """
+    Returns the annual coupon at which a level `payment` fully amortizes `principal` over `amort_periods` periods.
+    Coupons are solved for every element at once by Newton iteration safeguarded by bisection. Returns `nan` where no
+    coupon exists (payments that are not positive).
+
+    Parameters
+    ----------
+    payment: float, numpy.ndarray
+        Target level payment
+    principal: float, numpy.ndarray
+        Initial principal
+    amort_periods: int, numpy.ndarray
+        Number of amortization periods
+    tol: float, optional(default=1e-12)
+        Tolerance on the periodic rate
+    max_iter: int, optional(default=100)
+        Maximum number of iterations
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    payment, principal, n = np.broadcast_arrays(np.asarray(payment, dtype=float), np.asarray(principal, dtype=float),
+                                                np.asarray(amort_periods, dtype=float))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        target = payment / principal
+    valid = target > 0
+    target = np.where(valid, target, 1.0)
+
+    # the annuity factor increases with the rate, from 0 at a rate of -1 to more than the rate itself
+    lo = np.full(target.shape, -1 + 1e-9)
+    hi = np.maximum(target, 0.0) + 1e-9
+    rate = np.clip(target - 1 / n, lo, hi)
+    for _ in range(max_iter):
+        factor, d_factor = _annuity_factor(rate, n)
+        f = factor - target
+        lo = np.where(f < 0, rate, lo)
+        hi = np.where(f > 0, rate, hi)
+        newton = rate - f / d_factor
+        # bisect where the Newton step leaves the bracket
+        step = np.where((newton > lo) & (newton < hi), newton, (lo + hi) / 2) - rate
+        rate = rate + step
+        if np.all(np.abs(step) <= tol):
+            break
+    return np.where(valid, rate * 12, np.nan)
+
+
+def dscr_payment(noi, dscr, pmts_per_year=12):
+    """Returns the largest periodic payment for which annual net operating income `noi` covers annual debt service
+    `dscr` times."""
+    return np.asarray(noi, dtype=float) / (np.asarray(dscr, dtype=float) * pmts_per_year)
+
+
+def debt_service_coverage(noi, principal, coupon, amort_periods, pmts_per_year=12):
+    """Returns the debt service coverage ratio of annual net operating income `noi` over the annual level payments of
+    loans with the given terms."""
+    return np.asarray(noi, dtype=float) / (level_payment(principal, coupon, amort_periods) * pmts_per_year)
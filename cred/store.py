@@ -0,0 +1,195 @@
+import os
+import shutil
+
+import numpy as np
+
+from cred.borrowing import CashFlows
+
+
+_DTYPES = {f: np.dtype('datetime64[D]' if f.endswith('date') else float) for f in CashFlows._fields}
+_KEY_DTYPE = np.dtype('S64')
+
+
+class ScheduleStore:
+    """
+    Columnar on-disk store of borrowing cash flows, written by `ScheduleStoreWriter`.
+
+    A store is a directory with one `.npy` file per `CashFlows` field holding the periods of every stored schedule, an
+    `offsets.npy` index with the first row of each schedule, and the schedule fingerprints of the stored borrowings in
+    sorted order (`keys.npy`) with the position of each schedule (`positions.npy`). Files are memory-mapped, so opening
+    a store and reading one schedule only reads the pages that are accessed.
+
+    Schedules are keyed by `PeriodicBorrowing.schedule_fingerprint`, so any borrowing with the same schedule terms uses
+    the stored schedule and a borrowing whose terms change no longer matches. Assign a store to a borrowing's
+    `schedule_store` attribute (or to `PeriodicBorrowing.schedule_store` for every borrowing) and `cash_flows`,
+    `schedule` and `payments` are served from the store when it contains the borrowing.
+
+    Parameters
+    ----------
+    path: str, path-like
+        Store directory
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._offsets = self._load('offsets')
+        self._keys = self._load('keys')
+        self._positions = self._load('positions')
+        self._columns = {f: self._load(f) for f in CashFlows._fields}
+
+    def _load(self, name):
+        file = os.path.join(self.path, f'{name}.npy')
+        try:
+            return np.load(file, mmap_mode='r')
+        except ValueError:
+            # empty arrays cannot be memory-mapped
+            return np.load(file)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, borrowing):
+        return self.position(borrowing) is not None
+
+    def __repr__(self):
+        return f'ScheduleStore({self.path!r}, {len(self)} schedules, {self.rows} rows)'
+
+    @property
+    def rows(self):
+        """Total number of periods in the store."""
+        return int(self._offsets[-1])
+
+    def position(self, borrowing):
+        """Returns the position of the schedule for `borrowing` (a borrowing or schedule fingerprint) in the store, or
+        `None` if it is not stored."""
+        key = _key(borrowing)
+        i = int(np.searchsorted(self._keys, key))
+        if i < len(self._keys) and self._keys[i] == key:
+            return int(self._positions[i])
+        return None
+
+    def get(self, borrowing, first_dt=None, last_dt=None, by='pmt_date'):
+        """
+        Returns the stored `CashFlows` for `borrowing`, or `None` if it is not stored. Arrays are read-only views of the
+        memory-mapped files.
+
+        Parameters
+        ----------
+        borrowing: PeriodicBorrowing, str
+            Borrowing or schedule fingerprint
+        first_dt: datetime-like, optional(default=None)
+            If provided, only periods with `by` date on or after `first_dt` are returned
+        last_dt: datetime-like, optional(default=None)
+            If provided, only periods with `by` date on or before `last_dt` are returned
+        by: str, optional(default='pmt_date')
+            Date field used to select periods, either 'pmt_date', 'end_date' or 'start_date'
+
+        Returns
+        -------
+        CashFlows
+        """
+        i = self.position(borrowing)
+        if i is None:
+            return None
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        if first_dt is not None or last_dt is not None:
+            if by not in ('pmt_date', 'end_date', 'start_date'):
+                raise ValueError("by must be one of 'pmt_date', 'end_date' or 'start_date'.")
+            dts = self._columns[by][start:end]
+            if first_dt is not None:
+                start += int(np.searchsorted(dts, np.datetime64(first_dt, 'D'), side='left'))
+            if last_dt is not None:
+                end = start + int(np.searchsorted(self._columns[by][start:end], np.datetime64(last_dt, 'D'),
+                                                  side='right'))
+        return CashFlows(**{f: col[start:end].view(np.ndarray) for f, col in self._columns.items()})
+
+    def keys(self):
+        """Returns the schedule fingerprints in the order schedules were written."""
+        keys = np.empty(len(self), dtype=_KEY_DTYPE)
+        keys[self._positions] = self._keys
+        return [k.decode() for k in keys]
+
+
+class ScheduleStoreWriter:
+    """
+    Writes borrowing cash flows to a new `ScheduleStore` one schedule at a time. Columns are appended to temporary
+    files as schedules are added, so memory use does not depend on the number of schedules. Borrowings with the same
+    schedule terms are stored once. Call `close` (or use as a context manager) to finish the store.
+
+    Parameters
+    ----------
+    path: str, path-like
+        Store directory. Created if it does not exist and any existing store files are replaced on `close`.
+    """
+
+    def __init__(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self._files = {f: open(self._tmp(f), 'wb') for f in CashFlows._fields}
+        self._keys = []
+        self._seen = set()
+        self._offsets = [0]
+
+    def _tmp(self, name):
+        return os.path.join(self.path, f'{name}.npy.tmp')
+
+    def add(self, borrowing):
+        """Adds the cash flows of `borrowing` under its schedule fingerprint. Returns `False` if a schedule with the
+        same fingerprint was already added."""
+        key = borrowing.schedule_fingerprint()
+        if key in self._seen:
+            return False
+        return self.add_cash_flows(key, borrowing.cash_flows())
+
+    def add_cash_flows(self, key, cfs):
+        """Adds `CashFlows` `cfs` under schedule fingerprint `key`. Returns `False` if `key` was already added."""
+        if key in self._seen:
+            return False
+        for f, file in self._files.items():
+            file.write(np.ascontiguousarray(getattr(cfs, f), dtype=_DTYPES[f]).tobytes())
+        self._keys.append(key)
+        self._seen.add(key)
+        self._offsets.append(self._offsets[-1] + len(cfs.payment))
+        return True
+
+    def close(self):
+        """Writes the index and column files and returns the finished `ScheduleStore`."""
+        rows = self._offsets[-1]
+        for f, file in self._files.items():
+            file.close()
+            with open(os.path.join(self.path, f'{f}.npy'), 'wb') as out, open(self._tmp(f), 'rb') as tmp:
+                header = {'descr': np.lib.format.dtype_to_descr(_DTYPES[f]), 'fortran_order': False, 'shape': (rows,)}
+                np.lib.format.write_array_header_1_0(out, header)
+                shutil.copyfileobj(tmp, out)
+            os.remove(self._tmp(f))
+
+        keys = np.array(self._keys, dtype=_KEY_DTYPE)
+        order = np.argsort(keys, kind='stable')
+        np.save(os.path.join(self.path, 'keys.npy'), keys[order])
+        np.save(os.path.join(self.path, 'positions.npy'), order.astype(np.int64))
+        np.save(os.path.join(self.path, 'offsets.npy'), np.array(self._offsets, dtype=np.int64))
+        return ScheduleStore(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            for f, file in self._files.items():
+                file.close()
+                os.remove(self._tmp(f))
+
+
+def write_store(path, borrowings):
+    """Writes the cash flows of each of `borrowings` to a new `ScheduleStore` at `path` and returns the store."""
+    with ScheduleStoreWriter(path) as writer:
+        for borrowing in borrowings:
+            writer.add(borrowing)
+    return ScheduleStore(path)
+
+
+def _key(borrowing):
+    key = borrowing if isinstance(borrowing, str) else borrowing.schedule_fingerprint()
+    return key.encode('ascii')
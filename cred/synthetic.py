@@ -0,0 +1,289 @@
+import csv
+import os
+
+import numpy as np
+
+from cred.curves import FlatCurve
+from cred.tape import CALENDARS, CONVENTIONS, DAY_COUNTS, FREQUENCIES, LoanTape
+
+
+# distribution of each generated term. Dicts are choices with relative weights (`None` leaves the cell blank) and
+# tuples are (low, high) ranges sampled uniformly unless noted otherwise.
+DEFAULT_PARAMS = {
+    'first_reg_start': ('2015-01', '2025-12'),  # month range of the first regular period start
+    'term_years': {3: 0.1, 5: 0.3, 7: 0.15, 10: 0.4, 30: 0.05},
+    'freq': {'M': 0.8, 'Q': 0.15, 'S': 0.04, 'A': 0.01},
+    'stub': 0.2,  # probability of a leading stub period
+    'stub_days': (1, 27),
+    'principal': (13.8, 1.2),  # mean and standard deviation of log principal
+    'principal_range': (100_000.0, 500_000_000.0),
+    'coupon': (0.02, 0.09),
+    'amortization': {'interest_only': 0.3, 'amortizing': 0.4, 'partial_io': 0.25, 'custom': 0.05},
+    'amort_years': {25: 0.4, 30: 0.6},
+    'io_share': (0.1, 0.5),  # share of regular periods that are interest only for 'partial_io'
+    'custom_amort_rate': (0.01, 0.05),  # annual share of principal repaid by custom straight line schedules
+    'year_frac': {'actual360': 0.7, 'thirty360': 0.3},
+    # adjusted calculation dates can move the last period end off the end date, which skips the balloon payment
+    'calc_convention': {'unadjusted': 1.0},
+    'pmt_convention': {'unadjusted': 0.3, 'following': 0.5, 'modified_following': 0.15, 'preceding': 0.05},
+    'holiday_calendar': {None: 0.3, 'federal_reserve': 0.6, 'london': 0.1},
+    'prepayment': {None: 0.1, 'open': 0.1, 'step_down': 0.3, 'defeasance': 0.3, 'yield_maintenance': 0.2},
+    'step_down': {('12;24;36', '0.03;0.02;0.01'): 0.4, ('12;24;36;48;60', '0.05;0.04;0.03;0.02;0.01'): 0.4,
+                  ('6;12', '0.02;0.01'): 0.2},
+    'open_months': {3: 0.5, 6: 0.4, 12: 0.1},  # months before maturity that defeasance and YM terms open
+    'ym_margin': (0.0, 0.01)
+}
+
+TAPE_COLUMNS = ('loan_id', 'start_date', 'end_date', 'first_reg_start', 'freq', 'initial_principal', 'coupon',
+                'amort_periods', 'io_periods', 'amort_schedule', 'year_frac', 'calc_convention', 'pmt_convention',
+                'holiday_calendar', 'prepayment', 'step_down_months', 'step_down_premiums', 'open_months', 'ym_margin')
+
+
+class LoanGenerator:
+    """
+    Deterministic generator of synthetic fixed rate loans, as `FixedRateBorrowing` objects or as CSV loan tapes read by
+    `cred.tape.LoanTape` and the `cred` command line runner.
+
+    Loans mix leading stub periods, interest only, amortizing, partial interest only and custom amortization
+    schedules, monthly to annual frequencies, day counts, business day conventions, holiday calendars and every
+    prepayment type in `cred.tape.PREPAYMENTS`. Term distributions are set by `params`, which updates
+    `DEFAULT_PARAMS`.
+
+    Loans are generated in fixed blocks of `block_size` loans, each drawn from its own random stream seeded by `seed`
+    and the block number, so the terms of loan `i` only depend on `seed`, `params` and `block_size`. Any range of loans
+    can be generated independently (e.g. in worker processes) and books of millions of loans are generated one block
+    at a time.
+
+    Parameters
+    ----------
+    seed: int, optional(default=0)
+        Random seed
+    params: dict, optional(default=None)
+        Term distributions that differ from `DEFAULT_PARAMS`
+    curve: cred.curves.Curve, optional(default=None)
+        Discount curve for defeasance and yield maintenance terms of generated borrowings. Defaults to a 3% flat curve.
+    block_size: int, optional(default=10000)
+        Number of loans per random stream
+    """
+
+    def __init__(self, seed=0, params=None, curve=None, block_size=10000):
+        if block_size < 1:
+            raise ValueError('block_size must be at least 1.')
+        self.seed = seed
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        self.curve = FlatCurve(0.03) if curve is None else curve
+        self.block_size = block_size
+        self._cached_block = None
+        self._validate()
+
+    def _validate(self):
+        for name, value in self.params.items():
+            if isinstance(value, dict) and (not value or sum(value.values()) <= 0):
+                raise ValueError(f'{name} choices must have positive total weight.')
+        for name, names in (('year_frac', DAY_COUNTS), ('calc_convention', CONVENTIONS),
+                            ('pmt_convention', CONVENTIONS), ('holiday_calendar', CALENDARS), ('freq', FREQUENCIES)):
+            unknown = [v for v in self.params[name] if v is not None and v not in names]
+            if unknown:
+                raise ValueError(f'Unknown {name} values {unknown}.')
+
+    def columns(self, start, stop):
+        """
+        Returns the terms of loans `start` to `stop` (excluding `stop`) as a dict from each of `TAPE_COLUMNS` to a
+        `numpy` array of cell strings, with empty strings for blank cells.
+        """
+        if start < 0 or stop < start:
+            raise ValueError('Loan range must satisfy 0 <= start <= stop.')
+        parts = []
+        for block in range(start // self.block_size, -(-stop // self.block_size)):
+            offset = block * self.block_size
+            columns = self._block(block)
+            lo, hi = max(start - offset, 0), min(stop - offset, self.block_size)
+            parts.append({c: v[lo:hi] for c, v in columns.items()})
+        if not parts:
+            return {c: np.array([], dtype=object) for c in TAPE_COLUMNS}
+        return {c: np.concatenate([p[c] for p in parts]) for c in TAPE_COLUMNS}
+
+    def rows(self, n, start=0):
+        """Yields dicts of the non-blank terms of loans `start` to `start + n`, in the format read by
+        `LoanTape.borrowing`."""
+        for block_start in range(start, start + n, self.block_size):
+            columns = self.columns(block_start, min(block_start + self.block_size, start + n))
+            for values in zip(*columns.values()):
+                yield {c: v for c, v in zip(columns, values) if v != ''}
+
+    def borrowings(self, n, start=0):
+        """Yields `(loan_id, borrowing)` tuples for loans `start` to `start + n`. One holiday calendar instance of each
+        type is shared by every borrowing."""
+        tape = self._tape()
+        for terms in self.rows(n, start):
+            yield terms.pop('loan_id'), tape.borrowing(terms)
+
+    def portfolio(self, n, start=0):
+        """Returns a `cred.portfolio.Portfolio` of loans `start` to `start + n`, labeled by loan id."""
+        from cred.portfolio import Portfolio
+        loan_ids, borrowings = [], []
+        for loan_id, borrowing in self.borrowings(n, start):
+            loan_ids.append(loan_id)
+            borrowings.append(borrowing)
+        return Portfolio(borrowings, loan_ids=loan_ids)
+
+    def amortization(self, ref):
+        """Returns the custom amortization schedule (principal payments including the balloon) for the `amort_schedule`
+        reference of a generated loan, its loan id. Pass as `LoanTape.amortizations` to read generated tapes without an
+        amortization file."""
+        i = _loan_index(ref)
+        columns = self.columns(i, i + 1)
+        if columns['amort_schedule'][0] != ref:
+            raise ValueError(f'Loan {ref!r} does not have a custom amortization schedule.')
+        block = self._block(i // self.block_size)
+        j = i % self.block_size
+        periods = int(block['_periods'][j])
+        payments = np.full(periods, float(block['_custom_pmt'][j]))
+        payments[0] = 0.0 if block['_stub'][j] else payments[0]
+        payments[-1] = float(columns['initial_principal'][0]) - payments[:-1].sum()
+        return payments.tolist()
+
+    def write_tape(self, path, n, start=0, amortizations_path=None):
+        """
+        Writes loans `start` to `start + n` to a CSV loan tape at `path`, one block at a time. Custom amortization
+        schedules are written to `amortizations_path` (by default `path` with an `_amortizations.csv` suffix) in the
+        format read by `cred.tape.read_amortizations`, if any loan has one.
+
+        Returns
+        -------
+        tuple
+            Tape path and amortizations path, or `None` if no loan has a custom amortization schedule
+        """
+        if amortizations_path is None:
+            amortizations_path = os.path.splitext(path)[0] + '_amortizations.csv'
+        amort_file = amort_writer = None
+        try:
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(TAPE_COLUMNS)
+                for block_start in range(start, start + n, self.block_size):
+                    columns = self.columns(block_start, min(block_start + self.block_size, start + n))
+                    writer.writerows(zip(*columns.values()))
+                    for ref in columns['amort_schedule'][columns['amort_schedule'] != '']:
+                        if amort_writer is None:
+                            amort_file = open(amortizations_path, 'w', newline='')
+                            amort_writer = csv.writer(amort_file)
+                            amort_writer.writerow(('amort_schedule', 'principal_payment'))
+                        amort_writer.writerows((ref, repr(amt)) for amt in self.amortization(ref))
+        finally:
+            if amort_file is not None:
+                amort_file.close()
+        return path, amortizations_path if amort_writer is not None else None
+
+    def _tape(self):
+        # only used to convert terms to borrowings, never read
+        return LoanTape(None, amortizations=self.amortization, curve=self.curve)
+
+    def _block(self, block):
+        if self._cached_block is None or self._cached_block[0] != block:
+            self._cached_block = (block, self._generate(block))
+        return self._cached_block[1]
+
+    def _generate(self, block):
+        p = self.params
+        rng = np.random.default_rng([self.seed, block])
+        n = self.block_size
+        offset = block * n
+
+        first_month, last_month = (np.datetime64(m, 'M') for m in p['first_reg_start'])
+        months = first_month + rng.integers(0, (last_month - first_month).astype(int) + 1, n)
+        # days after the 27th can fall on month end, which Monthly rolls to the end of later months
+        day = rng.integers(1, 28, n)
+        first_reg_start = months.astype('datetime64[D]') + (day - 1)
+        freq = _choice(rng, p['freq'], n)
+        freq_months = np.array([FREQUENCIES[f] for f in freq])
+        term_months = _choice(rng, p['term_years'], n).astype(int) * 12
+        term_months = np.maximum(term_months // freq_months, 1) * freq_months
+        end_date = (months + term_months).astype('datetime64[D]') + (day - 1)
+        stub = rng.random(n) < p['stub']
+        stub_days = rng.integers(p['stub_days'][0], p['stub_days'][1] + 1, n)
+        start_date = np.where(stub, first_reg_start - stub_days, first_reg_start)
+
+        log_mean, log_sd = p['principal']
+        principal = np.clip(np.exp(rng.normal(log_mean, log_sd, n)), *p['principal_range'])
+        principal = np.maximum(np.round(principal, -3), 1000.0)
+        coupon = np.round(rng.uniform(*p['coupon'], n), 4)
+
+        periods = term_months // freq_months
+        amortization = _choice(rng, p['amortization'], n)
+        amortizing = np.isin(amortization, ['amortizing', 'partial_io'])
+        amort_periods = _choice(rng, p['amort_years'], n).astype(int) * 12 // freq_months
+        io_periods = np.where(amortization == 'partial_io',
+                              np.maximum((rng.uniform(*p['io_share'], n) * periods).astype(int), 1), 0)
+        custom = amortization == 'custom'
+        custom_rate = rng.uniform(*p['custom_amort_rate'], n) * freq_months / 12
+        custom_pmt = np.round(principal * np.minimum(custom_rate, 1.0 / (periods + 1)), 2)
+
+        ppmt = _choice(rng, p['prepayment'], n)
+        step_down = _choice(rng, {i: w for i, w in enumerate(p['step_down'].values())}, n).astype(int)
+        step_downs = list(p['step_down'])
+        # tapes count open months from the start month, which is earlier than the first regular month for stubs
+        start_term_months = (months + term_months - start_date.astype('datetime64[M]')).astype(int)
+        open_months = np.maximum(start_term_months - _choice(rng, p['open_months'], n).astype(int), 0)
+        ym_margin = np.round(rng.uniform(*p['ym_margin'], n), 4)
+        is_step_down = ppmt == 'step_down'
+        discounted = np.isin(ppmt, ['defeasance', 'yield_maintenance'])
+
+        loan_id = np.array([_loan_id(offset + i) for i in range(n)], dtype=object)
+        return {
+            'loan_id': loan_id,
+            'start_date': _dates(start_date),
+            'end_date': _dates(end_date),
+            'first_reg_start': np.where(stub, _dates(first_reg_start), ''),
+            'freq': freq,
+            'initial_principal': principal.astype(str).astype(object),
+            'coupon': coupon.astype(str).astype(object),
+            'amort_periods': np.where(amortizing, amort_periods.astype(str), '').astype(object),
+            'io_periods': np.where(io_periods > 0, io_periods.astype(str), '').astype(object),
+            'amort_schedule': np.where(custom, loan_id, ''),
+            'year_frac': _choice(rng, p['year_frac'], n),
+            'calc_convention': _choice(rng, p['calc_convention'], n),
+            'pmt_convention': _choice(rng, p['pmt_convention'], n),
+            'holiday_calendar': _choice(rng, p['holiday_calendar'], n),
+            'prepayment': ppmt,
+            'step_down_months': np.where(is_step_down, [step_downs[i][0] for i in step_down], '').astype(object),
+            'step_down_premiums': np.where(is_step_down, [step_downs[i][1] for i in step_down], '').astype(object),
+            'open_months': np.where(discounted, open_months.astype(str), '').astype(object),
+            'ym_margin': np.where(ppmt == 'yield_maintenance', ym_margin.astype(str), '').astype(object),
+            # values used to rebuild custom amortization schedules
+            '_periods': periods + stub,
+            '_stub': stub,
+            '_custom_pmt': custom_pmt
+        }
+
+
+def _choice(rng, weights, n):
+    values = list(weights)
+    p = np.array([weights[v] for v in values], dtype=float)
+    picks = rng.choice(len(values), size=n, p=p / p.sum())
+    return np.array(['' if v is None else v for v in values], dtype=object)[picks]
+
+
+def _dates(dts):
+    return np.datetime_as_string(dts, unit='D').astype(object)
+
+
+def _loan_id(i):
+    return f'L{i:08d}'
+
+
+def _loan_index(loan_id):
+    try:
+        return int(loan_id[1:])
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid synthetic loan id {loan_id!r}.') from None
+
+
+def write_tape(path, n, seed=0, params=None, amortizations_path=None):
+    """Writes a synthetic CSV loan tape of `n` loans to `path`. See `LoanGenerator` and `LoanGenerator.write_tape`."""
+    return LoanGenerator(seed, params).write_tape(path, n, amortizations_path=amortizations_path)
+
+
+def synthetic_borrowings(n, seed=0, params=None, curve=None):
+    """Returns a list of `n` synthetic `FixedRateBorrowing` objects. See `LoanGenerator`."""
+    return [borrowing for _, borrowing in LoanGenerator(seed, params, curve).borrowings(n)]
@@ -0,0 +1,291 @@
+import csv
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+import numpy as np
+
+from cred import parallel
+from cred.borrowing import CashFlows, FixedRateBorrowing
+from cred.businessdays import Monthly, following, modified_following, preceding, unadjusted
+from cred.interest_rate import actual360, thirty360
+from cred.prepayment import Defeasance, OpenPrepayment, SimpleYieldMaintenance, StepDown
+
+
+CONVENTIONS = {
+    'unadjusted': unadjusted,
+    'following': following,
+    'preceding': preceding,
+    'modified_following': modified_following
+}
+
+DAY_COUNTS = {
+    'actual360': actual360,
+    'thirty360': thirty360
+}
+
+# holiday calendar classes in cred.calendars, imported when a tape uses them
+CALENDARS = {
+    'federal_reserve': 'FederalReserveHolidays',
+    'london': 'LondonBankHolidays'
+}
+
+FREQUENCIES = {
+    'M': 1,
+    'Q': 3,
+    'S': 6,
+    'A': 12
+}
+
+# tape column for each FixedRateBorrowing term
+DEFAULT_COLUMNS = {
+    'loan_id': 'loan_id',
+    'start_date': 'start_date',
+    'end_date': 'end_date',
+    'first_reg_start': 'first_reg_start',
+    'freq': 'freq',
+    'initial_principal': 'initial_principal',
+    'coupon': 'coupon',
+    'amort_periods': 'amort_periods',
+    'io_periods': 'io_periods',
+    'amort_schedule': 'amort_schedule',
+    'year_frac': 'year_frac',
+    'calc_convention': 'calc_convention',
+    'pmt_convention': 'pmt_convention',
+    'holiday_calendar': 'holiday_calendar',
+    'desc': 'desc',
+    'prepayment': 'prepayment',
+    'step_down_months': 'step_down_months',
+    'step_down_premiums': 'step_down_premiums',
+    'open_months': 'open_months',
+    'ym_margin': 'ym_margin'
+}
+
+PREPAYMENTS = ('open', 'step_down', 'defeasance', 'yield_maintenance')
+
+SCHEDULE_COLUMNS = ('loan_id', 'index') + CashFlows._fields
+
+_DTYPES = {f: np.dtype('datetime64[D]' if f.endswith('date') else float) for f in CashFlows._fields}
+
+
+class LoanTape:
+    """
+    CSV loan tape read in chunks of rows, with one `FixedRateBorrowing` per row. Only one chunk of rows and borrowings
+    is held in memory at a time, so memory use does not depend on the size of the tape.
+
+    Cells are mapped to borrowing terms by `columns`, a dict from term to column name that updates `DEFAULT_COLUMNS`.
+    Columns that are missing from the tape, and blank cells, use the borrowing's default value. Cells are converted as
+    follows:
+
+    * `start_date`, `end_date`, `first_reg_start`: parsed with `date_format`
+    * `freq`: number of months or one of 'M', 'Q', 'S', 'A' (see `FREQUENCIES`), converted to a `Monthly` offset
+    * `initial_principal`, `coupon`: float
+    * `amort_periods`, `io_periods`: int
+    * `amort_schedule`: reference to a custom amortization in `amortizations`. Overrides `amort_periods`.
+    * `year_frac`: name in `DAY_COUNTS`
+    * `calc_convention`, `pmt_convention`: name in `CONVENTIONS`
+    * `holiday_calendar`: name in `CALENDARS`. One calendar instance is shared by every borrowing in the tape.
+    * `prepayment`: one of `PREPAYMENTS`. 'step_down' uses `step_down_months` and `step_down_premiums`, lists of
+      expiration months and premiums separated by semicolons. Like `StepDown` offsets, expiration months count from
+      `first_reg_start`, which is the start date unless the loan has a start stub. 'defeasance' and
+      'yield_maintenance' discount with `curve` and open `open_months` calendar months after the start month, on the
+      end date's day of the month. 'yield_maintenance' adds `ym_margin` to the curve's zero rate.
+
+    Parameters
+    ----------
+    path: str, path-like
+        Path to the CSV tape. The first row must contain column names.
+    columns: dict, optional(default=None)
+        Column names for borrowing terms that differ from `DEFAULT_COLUMNS`
+    amortizations: dict, function, optional(default=None)
+        Custom amortization schedules by reference, either a mapping or a function that takes a reference and returns
+        a list of principal payments (see `read_amortizations`)
+    date_format: str, optional(default='%Y-%m-%d')
+        `datetime.strptime` format of dates in the tape
+    chunksize: int, optional(default=10000)
+        Number of rows per chunk
+    curve: cred.curves.Curve, optional(default=None)
+        Discount curve for defeasance and yield maintenance prepayment terms
+    """
+
+    def __init__(self, path, columns=None, amortizations=None, date_format='%Y-%m-%d', chunksize=10000, curve=None):
+        if chunksize < 1:
+            raise ValueError('chunksize must be at least 1.')
+        self.path = path
+        self.columns = {**DEFAULT_COLUMNS, **(columns or {})}
+        self.amortizations = amortizations
+        self.date_format = date_format
+        self.chunksize = chunksize
+        self.curve = curve
+        self._calendars = {}
+
+    def chunks(self):
+        """Yields lists of `(loan_id, borrowing)` tuples of up to `chunksize` rows in tape order. Loan ids default to
+        the row number (starting from 0) if the tape does not have a loan id column."""
+        with open(self.path, newline='') as f:
+            rows = enumerate(csv.DictReader(f))
+            while True:
+                chunk = [self._parse(i, row) for i, row in islice(rows, self.chunksize)]
+                if not chunk:
+                    return
+                yield chunk
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            yield from chunk
+
+    def _parse(self, i, row):
+        terms = {}
+        for term, column in self.columns.items():
+            value = row.get(column)
+            if value is not None and value.strip() != '':
+                terms[term] = value.strip()
+        try:
+            return terms.pop('loan_id', i), self.borrowing(terms)
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f'Invalid loan tape row {i + 1}: {e!r}') from e
+
+    def borrowing(self, terms):
+        """Returns a `FixedRateBorrowing` from a dict of borrowing terms to cell values."""
+        kwargs = {}
+        for term in ('start_date', 'end_date', 'first_reg_start'):
+            if term in terms:
+                kwargs[term] = datetime.strptime(terms[term], self.date_format)
+        freq = terms.get('freq', 'M')
+        kwargs['freq'] = Monthly(FREQUENCIES[freq] if freq in FREQUENCIES else int(freq))
+        for term in ('initial_principal', 'coupon'):
+            kwargs[term] = float(terms[term])
+        for term in ('amort_periods', 'io_periods'):
+            if term in terms:
+                kwargs[term] = int(float(terms[term]))
+        if 'amort_schedule' in terms:
+            kwargs['amort_periods'] = self.amortization(terms['amort_schedule'])
+        if 'year_frac' in terms:
+            kwargs['year_frac'] = DAY_COUNTS[terms['year_frac']]
+        for term in ('calc_convention', 'pmt_convention'):
+            if term in terms:
+                kwargs[term] = CONVENTIONS[terms[term]]
+        if 'holiday_calendar' in terms:
+            kwargs['holiday_calendar'] = self.calendar(terms['holiday_calendar'])
+        if 'desc' in terms:
+            kwargs['desc'] = terms['desc']
+        if 'prepayment' in terms:
+            kwargs['prepayment'] = self.prepayment(terms)
+        return FixedRateBorrowing(**kwargs)
+
+    def prepayment(self, terms):
+        """Returns the prepayment object for a dict of borrowing terms to cell values."""
+        ppmt_type = terms['prepayment']
+        open_offset = None
+        if 'open_months' in terms:
+            # prepayment terms offset the open date from the end date, so convert months after the start date
+            start, end = (datetime.strptime(terms[term], self.date_format) for term in ('start_date', 'end_date'))
+            term_months = (end.year - start.year) * 12 + end.month - start.month
+            open_offset = Monthly(int(terms['open_months']) - term_months)
+        if ppmt_type == 'open':
+            return OpenPrepayment()
+        if ppmt_type == 'step_down':
+            offsets = [Monthly(int(m)) for m in terms['step_down_months'].split(';')]
+            return StepDown(offsets, [float(p) for p in terms['step_down_premiums'].split(';')])
+        if ppmt_type not in PREPAYMENTS:
+            raise ValueError(f'Unknown prepayment type {ppmt_type!r}.')
+        if self.curve is None:
+            raise ValueError(f'Prepayment type {ppmt_type!r} requires a curve.')
+        if ppmt_type == 'defeasance':
+            return Defeasance(self.curve, open_dt_offset=open_offset)
+        return SimpleYieldMaintenance(self.curve.zero_rate, margin=float(terms.get('ym_margin', 0.0)),
+                                      open_dt_offset=open_offset)
+
+    def amortization(self, ref):
+        """Returns the custom amortization schedule for reference `ref`."""
+        if self.amortizations is None:
+            raise ValueError(f'Amortization reference {ref!r} without amortizations.')
+        if callable(self.amortizations):
+            return self.amortizations(ref)
+        return self.amortizations[ref]
+
+    def calendar(self, name):
+        """Returns the holiday calendar instance shared by every borrowing in the tape for calendar `name`."""
+        if name not in self._calendars:
+            from cred import calendars
+            self._calendars[name] = getattr(calendars, CALENDARS[name])()
+        return self._calendars[name]
+
+
+def read_amortizations(path, ref_column='amort_schedule', amount_column='principal_payment'):
+    """
+    Reads custom amortization schedules from a CSV file with one row per period, in period order, and columns for the
+    amortization reference and the principal payment. Returns a dict from reference to list of principal payments for
+    use as `LoanTape.amortizations`.
+    """
+    amortizations = {}
+    with open(path, newline='') as f:
+        for i, row in enumerate(csv.DictReader(f)):
+            try:
+                amortizations.setdefault(row[ref_column], []).append(float(row[amount_column]))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f'Invalid amortization file row {i + 1}: {e!r}') from e
+    return amortizations
+
+
+def stream_cash_flows(tape, workers=1, chunksize=None, executor=None):
+    """
+    Yields `(loan_ids, borrowings, cash_flows)` for each chunk of `tape`, where `cash_flows` is a list of each
+    borrowing's `CashFlows`. Chunks are processed in order and cash flows are built in worker processes if `workers`
+    is not 1 or an `executor` is provided. `chunksize` sets the number of borrowings sent to a worker at a time (see
+    `cred.parallel.map_borrowings`). One pool is used for the whole tape.
+    """
+    pool = executor
+    if pool is None and workers != 1:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for chunk in tape.chunks():
+            loan_ids = [loan_id for loan_id, _ in chunk]
+            borrowings = [borrowing for _, borrowing in chunk]
+            yield loan_ids, borrowings, parallel.cash_flows(borrowings, workers=workers, chunksize=chunksize,
+                                                            executor=pool)
+    finally:
+        if executor is None and pool is not None:
+            pool.shutdown()
+
+
+def schedule_columns(loan_ids, cash_flows):
+    """Returns a dict from each of `SCHEDULE_COLUMNS` to a flat `numpy` array of the period values of each borrowing's
+    `CashFlows` in `cash_flows`, labeled by the matching loan id in `loan_ids`."""
+    lengths = np.array([len(cfs.payment) for cfs in cash_flows], dtype=np.int64)
+    columns = {
+        'loan_id': np.repeat(np.array(loan_ids, dtype=object), lengths),
+        'index': np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    }
+    for f in CashFlows._fields:
+        arrays = [getattr(cfs, f) for cfs in cash_flows]
+        columns[f] = np.concatenate(arrays) if arrays else np.array([], dtype=_DTYPES[f])
+    return columns
+
+
+def write_csv_rows(writer, columns):
+    """Writes a dict of equal length columns with `csv.writer` `writer`. Dates are written in ISO format."""
+    values = [col.astype(str) if col.dtype.kind == 'M' else col.tolist() for col in columns.values()]
+    writer.writerows(zip(*values))
+
+
+def write_schedules(tape, path, workers=1, chunksize=None, executor=None):
+    """
+    Writes the schedule of every borrowing in `tape` to a CSV file at `path` with columns `SCHEDULE_COLUMNS`, one chunk
+    of the tape at a time. See `stream_cash_flows` for parameters.
+
+    Returns
+    -------
+    tuple
+        Number of borrowings and number of schedule rows written
+    """
+    loans = rows = 0
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(SCHEDULE_COLUMNS)
+        for loan_ids, _, cash_flows in stream_cash_flows(tape, workers, chunksize, executor):
+            columns = schedule_columns(loan_ids, cash_flows)
+            write_csv_rows(writer, columns)
+            loans += len(loan_ids)
+            rows += len(columns['index'])
+    return loans, rows
@@ -17,10 +17,11 @@ setup(
     url='https://github.com/jordanhitchcock/cred',
     author='Jordan Hitchcock',
     license='MIT',
-    python_requires='>=3.6',
-    install_requires=['pandas>=0.25.2', 'python-dateutil>=2.8.0'],
+    python_requires='>=3.7',
+    install_requires=['numpy>=1.17', 'pandas>=0.25.2', 'python-dateutil>=2.8.0'],
     tests_require=['pytest'],
     include_package_data=True,
+    entry_points={'console_scripts': ['cred=cred.cli:main']},
     classifiers=[
         'License :: OSI Approved :: MIT License',
         'Programming Language :: Python :: 3',
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from datetime import datetime
+
+from cred import FixedRateBorrowing, Monthly, Portfolio
+from cred.analytics import analytics, portfolio_analytics
+
+
+@pytest.fixture
+def amortizing():
+    return FixedRateBorrowing(datetime(2020, 1, 1), datetime(2030, 1, 1), Monthly(1), 1_000_000.0, 0.05,
+                              amort_periods=360)
+
+
+@pytest.fixture
+def interest_only():
+    return FixedRateBorrowing(datetime(2020, 1, 15), datetime(2025, 1, 15), Monthly(3), 250_000.0, 0.04)
+
+
+def present_value(borrowing, dt, y, m):
+    cfs = borrowing.cash_flows()
+    times = (cfs.pmt_date - np.datetime64(dt, 'D')).astype(float) / 365
+    due = times > 0
+    if m == 'continuous':
+        return (cfs.payment[due] * np.exp(-y * times[due])).sum()
+    return (cfs.payment[due] * (1 + y / m) ** (-m * times[due])).sum()
+
+
+@pytest.mark.parametrize('compounding', [None, 'continuous', 2])
+def test_analytics(amortizing, compounding):
+    dt = datetime(2022, 3, 10)
+    result = analytics(amortizing, dt, price=800_000.0, compounding=compounding)
+    m = 12 if compounding is None else compounding
+    assert present_value(amortizing, dt, result.ytm, m) == pytest.approx(800_000.0, rel=1e-12)
+
+    h = 1e-5
+    up, down = present_value(amortizing, dt, result.ytm + h, m), present_value(amortizing, dt, result.ytm - h, m)
+    assert result.modified_duration == pytest.approx((down - up) / (2 * h) / 800_000.0, rel=1e-6)
+    assert result.convexity == pytest.approx((up + down - 2 * 800_000.0) / h ** 2 / 800_000.0, rel=1e-4)
+    if compounding == 'continuous':
+        assert result.macaulay_duration == result.modified_duration
+    assert result.price == 800_000.0
+
+
+def test_interest_only_at_par(interest_only):
+    result = analytics(interest_only)
+    assert result.wal == pytest.approx((datetime(2025, 1, 15) - datetime(2020, 1, 15)).days / 365)
+    assert result.price == 250_000.0
+    assert result.ytm == pytest.approx(0.04 * 365 / 360, rel=1e-2)
+    assert result.macaulay_duration < result.wal
+    assert np.isnan(analytics(interest_only, datetime(2025, 2, 1)).ytm)
+
+
+def test_portfolio_analytics(amortizing, interest_only):
+    portfolio = Portfolio([amortizing, interest_only, amortizing])
+    dt = datetime(2021, 6, 30)
+    result = portfolio_analytics(portfolio, dt, prices=[900_000.0, 260_000.0, 700_000.0])
+    for i, price in enumerate([900_000.0, 260_000.0, 700_000.0]):
+        expected = analytics(portfolio[i], dt, price=price)
+        for field, value in zip(result._fields, expected):
+            assert getattr(result, field)[i] == pytest.approx(value, rel=1e-10)
+
+    at_start = portfolio_analytics(portfolio)
+    assert at_start.wal[1] == pytest.approx(analytics(interest_only).wal)
+    assert at_start.price == pytest.approx([1_000_000.0, 250_000.0, 1_000_000.0])
+
+    with pytest.raises(ValueError):
+        portfolio_analytics(portfolio, prices=[1.0])
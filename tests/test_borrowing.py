@@ -1,10 +1,14 @@
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
+import numpy as np
 import pandas as pd
+import pickle
 import pytest
-from cred.borrowing import _Borrowing, FixedRateBorrowing
+from cred.borrowing import _Borrowing, DelayedDrawBorrowing, FixedRateBorrowing, FloatingRateBorrowing
 from cred.interest_rate import actual360, thirty360
-from cred.businessdays import modified_following, FederalReserveHolidays
+from cred.businessdays import modified_following, FederalReserveHolidays, Monthly
+from cred.curves import FlatCurve, ZeroCurve
+from cred.prepayment import Defeasance, OpenPrepayment, SimpleYieldMaintenance, StepDown
 
 
 # Test _Borrowing and PeriodicBorrowing
@@ -419,6 +423,19 @@ def test_outstanding_principal(fixed_constant_amort_start_and_end_stubs):
     assert fixed_constant_amort_start_and_end_stubs.outstanding_principal(datetime(2021, 12, 6), include_dt=True) == pytest.approx(981090.953493)  # final pmt date
 
 
+
+def test_outstanding_principals(fixed_constant_amort_start_and_end_stubs):
+    borrowing = fixed_constant_amort_start_and_end_stubs
+    borrowing.holiday_calendar = FederalReserveHolidays()
+    borrowing.adjust_pmt_date = modified_following
+    borrowing.end_date = datetime(2021, 12, 5)
+    dts = [datetime(2020, 1, 2), datetime(2020, 3, 1), datetime(2020, 3, 2), datetime(2021, 10, 1),
+           datetime(2021, 12, 6), datetime(2021, 12, 7)]
+    for include_dt in (False, True):
+        expected = [borrowing.outstanding_principal(dt, include_dt=include_dt) for dt in dts]
+        assert borrowing.outstanding_principals(dts, include_dt=include_dt) == pytest.approx(expected, abs=1e-6)
+    assert np.isnan(borrowing.outstanding_principals([datetime(2020, 1, 1)])[0])
+
 def test_payments_scheduled_dt(fixed_constant_amort_start_and_end_stubs):
     expected_schedule = pd.read_csv('tests/data/test_fixed_constant_amort_start_and_end_stubs.csv',
                                     index_col='index',
@@ -455,3 +472,167 @@ def test_payments_pmt_dt(fixed_io_start_and_end_stubs):
         pd.Series(fixed_io_start_and_end_stubs.payments(datetime(2020, 1, 16), datetime(2020, 1, 16), pmt_dt=True)[0]),
         pd.Series(full_expected_output[0]))
 
+
+
+def test_cash_flows(fixed_constant_amort_start_and_end_stubs):
+    schedule = fixed_constant_amort_start_and_end_stubs.schedule()
+    cfs = fixed_constant_amort_start_and_end_stubs.cash_flows()
+    np.testing.assert_array_equal(cfs.end_date, schedule['end_date'].values.astype('datetime64[D]'))
+    np.testing.assert_allclose(cfs.payment, schedule['payment'].values)
+    np.testing.assert_allclose(cfs.eop_principal, schedule['eop_principal'].values)
+    assert fixed_constant_amort_start_and_end_stubs.cash_flows() is cfs
+    with pytest.raises(ValueError):
+        cfs.payment[0] = 0.0
+
+
+def test_cash_flows_reset_on_change(fixed_constant_amort_start_and_end_stubs):
+    cfs = fixed_constant_amort_start_and_end_stubs.cash_flows()
+    fixed_constant_amort_start_and_end_stubs.coupon = 0.06
+    new_cfs = fixed_constant_amort_start_and_end_stubs.cash_flows()
+    assert new_cfs is not cfs
+    assert new_cfs.interest_pmt[1] == pytest.approx(cfs.interest_pmt[1] / 2)
+
+
+# Test FloatingRateBorrowing
+@pytest.fixture
+def index_curve():
+    return ZeroCurve(datetime(2020, 1, 1), [datetime(2021, 1, 1), datetime(2025, 1, 1)], [0.01, 0.03])
+
+
+@pytest.fixture
+def floating(index_curve):
+    return FloatingRateBorrowing(
+        start_date=datetime(2020, 1, 15),
+        end_date=datetime(2022, 1, 15),
+        freq=relativedelta(months=1),
+        initial_principal=1_000_000.0,
+        index_curve=index_curve,
+        spread=0.02,
+        holiday_calendar=FederalReserveHolidays()
+    )
+
+
+def test_floating_projected_rates(floating, index_curve):
+    starts = [floating.period_start_date(i) for i in range(floating.period_count())]
+    ends = [dt + relativedelta(months=1) for dt in starts]
+    expected = index_curve.forward_rates(starts, ends) + 0.02
+    np.testing.assert_allclose(floating.period_rates(), expected)
+    cfs = floating.cash_flows()
+    np.testing.assert_allclose(cfs.interest_rate, expected)
+    assert cfs.interest_pmt[0] == pytest.approx(1_000_000.0 * expected[0] * 31 / 360)
+    assert cfs.principal_pmt[-1] == 1_000_000.0
+    assert cfs.principal_pmt[:-1].sum() == 0.0
+
+
+def test_floating_floor_cap_rounding(floating):
+    index = floating.index_rates()
+    floating.floor, floating.cap = 0.012, 0.025
+    np.testing.assert_allclose(floating.period_rates(), np.clip(index, 0.012, 0.025) + 0.02)
+    floating.rounding = 3
+    np.testing.assert_allclose(floating.period_rates(), np.clip(np.round(index, 3), 0.012, 0.025) + 0.02)
+    with pytest.raises(ValueError):
+        floating.period_rates()[0] = 0.0
+    with pytest.raises(ValueError):
+        FloatingRateBorrowing(datetime(2020, 1, 1), datetime(2021, 1, 1), relativedelta(months=1), 1.0,
+                              floating.index_curve, floor=0.03, cap=0.02)
+
+
+def test_floating_reset_lag_and_fixings(floating):
+    floating.reset_lag = 2
+    resets = floating.reset_dates()
+    # 2020-02-15 is a Saturday and 2020-02-17 is Presidents Day, so the period starts on the 18th for fixing
+    assert resets[0] == np.datetime64('2020-01-13')
+    assert resets[1] == np.datetime64('2020-02-13')
+    assert resets[2] == np.datetime64('2020-03-12')
+    floating.fixings = {datetime(2020, 1, 13): 0.015}
+    assert floating.period_rates()[0] == pytest.approx(0.035)
+    assert floating.cash_flows().interest_rate[0] == pytest.approx(0.035)
+
+
+def test_floating_custom_amortization(index_curve):
+    floating = FloatingRateBorrowing(datetime(2020, 1, 1), datetime(2021, 1, 1), relativedelta(months=3), 1000.0,
+                                     index_curve, amort_periods=[100.0, 100.0, 100.0, 700.0])
+    np.testing.assert_allclose(floating.cash_flows().eop_principal, [900.0, 800.0, 700.0, 0.0])
+
+
+def test_floating_cache_and_pickle(floating):
+    rates = floating.period_rates()
+    assert floating.period_rates() is rates
+    fingerprint = floating.fingerprint()
+    floating.spread = 0.03
+    assert floating.period_rates()[0] == pytest.approx(rates[0] + 0.01)
+    assert floating.fingerprint() != fingerprint
+    copy = pickle.loads(pickle.dumps(floating))
+    assert copy._rates is None
+    np.testing.assert_allclose(copy.cash_flows().payment, floating.cash_flows().payment)
+
+
+@pytest.mark.parametrize('prepayment', [
+    OpenPrepayment(),
+    StepDown([Monthly(6)], [0.02]),
+    Defeasance(FlatCurve(0.02)),
+    SimpleYieldMaintenance(FlatCurve(0.02).zero_rate)
+])
+def test_floating_prepayment(floating, prepayment):
+    floating.prepayment = prepayment
+    amt = floating.repayment_amount(datetime(2020, 3, 10))
+    assert amt >= floating.outstanding_principal(datetime(2020, 3, 10))
+    if hasattr(prepayment, 'required_repayments'):
+        assert prepayment.required_repayments(floating, [datetime(2020, 3, 10)])[0] == pytest.approx(amt)
+
+
+@pytest.fixture
+def delayed_draw():
+    return DelayedDrawBorrowing(
+        start_date=datetime(2021, 1, 1),
+        end_date=datetime(2022, 1, 1),
+        freq=relativedelta(months=3),
+        commitment=10_000_000.0,
+        coupon=0.06,
+        draws={datetime(2021, 2, 15): 2_000_000.0, datetime(2021, 6, 1): 3_000_000.0},
+        initial_principal=4_000_000.0,
+        unused_fee_rate=0.005
+    )
+
+
+def test_delayed_draw_schedule(delayed_draw):
+    cfs = delayed_draw.cash_flows()
+    np.testing.assert_allclose(cfs.bop_principal, [4_000_000.0, 6_000_000.0, 9_000_000.0, 9_000_000.0])
+    np.testing.assert_allclose(cfs.eop_principal, [6_000_000.0, 9_000_000.0, 9_000_000.0, 0.0])
+    np.testing.assert_allclose(cfs.principal_pmt, [0.0, 0.0, 0.0, 9_000_000.0])
+    # daily accrual on 4mm for 45 days and 6mm for 45 days, and the fee on the undrawn balance
+    interest = 0.06 / 360 * (45 * 4_000_000.0 + 45 * 6_000_000.0)
+    fee = 0.005 / 360 * (45 * 6_000_000.0 + 45 * 4_000_000.0)
+    assert cfs.interest_pmt[0] == pytest.approx(interest)
+    assert cfs.payment[0] == pytest.approx(interest + fee)
+    schedule = delayed_draw.schedule()
+    np.testing.assert_allclose(schedule['draws'], [2_000_000.0, 3_000_000.0, 0.0, 0.0])
+    assert schedule['unused_fee'].iloc[2] == pytest.approx(0.005 * 92 / 360 * 1_000_000.0)
+
+
+def test_delayed_draw_balances(delayed_draw):
+    dts = [datetime(2020, 12, 31), datetime(2021, 2, 15), datetime(2021, 5, 31), datetime(2021, 6, 1)]
+    np.testing.assert_allclose(delayed_draw.outstanding_principals(dts),
+                               [np.nan, 6_000_000.0, 6_000_000.0, 9_000_000.0])
+    assert delayed_draw.outstanding_principal(datetime(2021, 6, 1)) == 9_000_000.0
+    assert delayed_draw.outstanding_principal(datetime(2022, 1, 1)) == 0.0
+    assert delayed_draw.accrued_interest(datetime(2021, 3, 1)) == pytest.approx(
+        0.06 / 360 * (45 * 4_000_000.0 + 14 * 6_000_000.0))
+
+
+def test_delayed_draw_validation_and_cache(delayed_draw):
+    fingerprint = delayed_draw.fingerprint()
+    ledger = delayed_draw.ledger()
+    delayed_draw.draws = [(datetime(2021, 2, 15), 6_000_000.0)]
+    assert delayed_draw.ledger() is not ledger
+    assert delayed_draw.cash_flows().principal_pmt[-1] == 10_000_000.0
+    assert delayed_draw.fingerprint() != fingerprint
+    copy = pickle.loads(pickle.dumps(delayed_draw))
+    np.testing.assert_allclose(copy.cash_flows().payment, delayed_draw.cash_flows().payment)
+
+    with pytest.raises(ValueError):
+        delayed_draw.draws = [(datetime(2021, 2, 15), 6_000_001.0)]
+        delayed_draw.ledger()
+    with pytest.raises(ValueError):
+        DelayedDrawBorrowing(datetime(2021, 1, 1), datetime(2022, 1, 1), relativedelta(months=3), 1.0, 0.05,
+                             draws={datetime(2022, 1, 1): 1.0})
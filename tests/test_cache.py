@@ -0,0 +1,212 @@
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+import pandas as pd
+import pytest
+
+from cred import FixedRateBorrowing, QuoteCache, SQLiteQuoteCache, ScheduleTemplateCache, StepDown, Monthly, \
+    FederalReserveHolidays, Defeasance, FlatCurve, following, modified_following
+
+
+def make_borrowing(principal=1_000_000.0):
+    return FixedRateBorrowing(
+        start_date=datetime(2020, 1, 1),
+        end_date=datetime(2021, 12, 18),
+        freq=relativedelta(months=1),
+        initial_principal=principal,
+        coupon=0.12,
+        amort_periods=250,
+        holiday_calendar=FederalReserveHolidays(),
+        pmt_convention=following,
+        prepayment=StepDown([Monthly(6), Monthly(10)], [0.03, 0.02], period_breakage=None)
+    )
+
+
+def test_quote_cache_key():
+    cache = QuoteCache()
+    borrowing = make_borrowing()
+    dt = datetime(2020, 3, 1)
+    assert cache.key(borrowing, dt) == cache.key(make_borrowing(), dt)
+    assert cache.key(borrowing, dt)[1] == borrowing.prepayment.fingerprint()
+    assert cache.key(borrowing, dt, StepDown([Monthly(6)], [0.03])) != \
+        cache.key(borrowing, dt, StepDown([Monthly(6)], [0.02]))
+
+
+def test_quote_cache_hits():
+    cache = QuoteCache(maxsize=10)
+    borrowing = make_borrowing()
+    borrowing.quote_cache = cache
+    expected = borrowing.prepayment.required_repayment(borrowing, datetime(2020, 3, 15))
+
+    assert borrowing.repayment_amount(datetime(2020, 3, 15)) == pytest.approx(expected)
+    assert borrowing.repayment_amount(datetime(2020, 3, 15)) == pytest.approx(expected)
+    assert cache.repayment_amount(make_borrowing(), datetime(2020, 3, 15)) == pytest.approx(expected)
+    assert cache.repayment_amount(borrowing, datetime(2019, 1, 1)) is None
+    assert cache.repayment_amount(borrowing, datetime(2019, 1, 1)) is None
+    assert cache.info() == (3, 2, 0, 10, 2)
+
+
+def test_quote_cache_eviction():
+    cache = QuoteCache(maxsize=2)
+    borrowing = make_borrowing()
+    cache.repayment_amount(borrowing, datetime(2020, 3, 1))
+    cache.repayment_amount(borrowing, datetime(2020, 4, 1))
+    cache.repayment_amount(borrowing, datetime(2020, 3, 1))
+    cache.repayment_amount(borrowing, datetime(2020, 5, 1))  # evicts 4/1
+    assert cache.info().evictions == 1
+    assert cache.get(cache.key(borrowing, datetime(2020, 4, 1)), None) is None
+    assert cache.get(cache.key(borrowing, datetime(2020, 3, 1)), None) is not None
+
+
+def test_quote_cache_invalidation():
+    cache = QuoteCache()
+    borrowing = make_borrowing()
+    other = make_borrowing(principal=2_000_000.0)
+    cache.repayment_amount(borrowing, datetime(2020, 3, 1))
+    cache.repayment_amount(other, datetime(2020, 3, 1))
+
+    cache.invalidate(borrowing)
+    assert len(cache) == 1
+    cache.refresh_curves()
+    assert len(cache) == 0
+    assert cache.curve_version == 1
+    assert cache.key(borrowing, datetime(2020, 3, 1))[2] == 1
+
+    cache.refresh_curves('2020-03-01')
+    cache.repayment_amount(borrowing, datetime(2020, 3, 1))
+    cache.refresh_curves()
+    assert len(cache) == 0
+    assert cache.curve_version not in ('2020-03-01', 2)
+
+
+def test_sqlite_quote_cache_persists(tmp_path):
+    path = tmp_path / 'quotes.db'
+    borrowing = make_borrowing()
+    dts = [datetime(2020, 3, 15), datetime(2020, 9, 1), datetime(2019, 1, 1)]
+    expected = [borrowing.prepayment.required_repayment(borrowing, dt) for dt in dts]
+
+    cache = SQLiteQuoteCache(path, curve_version='2020-03-01')
+    amts = cache.repayment_amounts(borrowing, dts)
+    assert amts[:2] == pytest.approx(expected[:2])
+    assert amts[2] is None
+    assert cache.info() == (0, 3, 0, 1_000_000, 3)
+    cache.close()
+
+    cache = SQLiteQuoteCache(path, curve_version='2020-03-01')
+    other = make_borrowing()
+    other.quote_cache = cache
+    assert other.repayment_amount(datetime(2020, 9, 1)) == pytest.approx(expected[1])
+    assert other.repayment_amount(datetime(2019, 1, 1)) is None
+    assert cache.info().hits == 2
+    assert cache.info().misses == 0
+    cache.close()
+
+    # quotes priced off other curves are not read back
+    cache = SQLiteQuoteCache(path, curve_version='2020-03-02')
+    assert cache.get(cache.key(borrowing, dts[1]), None) is None
+    with pytest.raises(ValueError):
+        SQLiteQuoteCache(path)
+
+
+def test_sqlite_quote_cache_keys(tmp_path):
+    cache = SQLiteQuoteCache(tmp_path / 'quotes.db', curve_version=0)
+    borrowing = make_borrowing()
+    dt = datetime(2020, 3, 15)
+    cache.repayment_amount(borrowing, dt)
+    cache.repayment_amount(make_borrowing(principal=2_000_000.0), dt)
+    cache.repayment_amount(borrowing, dt, prepayment=StepDown([Monthly(6), Monthly(10)], [0.05, 0.02]))
+    cache.refresh_curves(1)
+    cache.repayment_amount(borrowing, dt)
+    assert len(cache) == 4
+    assert cache.info().hits == 0
+
+    cache.invalidate(borrowing)
+    assert len(cache) == 1
+
+    cache.refresh_curves('2020-03-15')
+    with pytest.raises(ValueError):
+        cache.refresh_curves()
+    assert cache.curve_version == '2020-03-15'
+    cache.repayment_amount(borrowing, dt)
+    assert cache.info().hits == 0
+
+    memory = SQLiteQuoteCache(':memory:')
+    memory.refresh_curves()
+    assert memory.curve_version == 1
+
+
+def test_sqlite_quote_cache_eviction(tmp_path):
+    cache = SQLiteQuoteCache(tmp_path / 'quotes.db', maxsize=2, curve_version=0)
+    borrowing = make_borrowing()
+    cache.repayment_amount(borrowing, datetime(2020, 3, 1))
+    cache.repayment_amount(borrowing, datetime(2020, 4, 1))
+    cache.repayment_amount(borrowing, datetime(2020, 3, 1))
+    cache.repayment_amount(borrowing, datetime(2020, 5, 1))  # evicts 4/1
+    assert cache.info().evictions == 1
+    assert len(cache) == 2
+    assert cache.get(cache.key(borrowing, datetime(2020, 4, 1)), None) is None
+    assert cache.get(cache.key(borrowing, datetime(2020, 3, 1)), None) is not None
+
+
+def test_sqlite_quote_cache_batched_defeasance(tmp_path):
+    borrowing = make_borrowing()
+    borrowing.prepayment = Defeasance(FlatCurve(0.02))
+    dts = [datetime(2020, 1, 1) + relativedelta(days=d) for d in range(0, 800, 7)]
+    expected = borrowing.prepayment.required_repayments(borrowing, dts)
+
+    cache = SQLiteQuoteCache(tmp_path / 'quotes.db', curve_version=0)
+    amts = cache.repayment_amounts(borrowing, dts)
+    assert [a is None for a in amts] == [bool(x) for x in pd.isna(expected)]
+    assert cache.repayment_amounts(borrowing, dts) == amts
+    assert cache.info().hits == len(dts)
+
+    bumped = make_borrowing()
+    bumped.prepayment = Defeasance(FlatCurve(0.03))
+    assert cache.repayment_amount(bumped, dts[10]) != amts[10]
+
+
+@pytest.mark.parametrize(
+    'amort_periods,io_periods',
+    [
+        (None, 0),
+        (300, 0),
+        (300, 6)
+    ]
+)
+def test_schedule_templates(amort_periods, io_periods):
+    def borrowing(principal):
+        return FixedRateBorrowing(
+            start_date=datetime(2020, 1, 16),
+            end_date=datetime(2023, 1, 16),
+            first_reg_start=datetime(2020, 2, 1),
+            freq=relativedelta(months=1),
+            initial_principal=principal,
+            coupon=0.045,
+            amort_periods=amort_periods,
+            io_periods=io_periods,
+            holiday_calendar=FederalReserveHolidays(),
+            pmt_convention=modified_following
+        )
+
+    templates = ScheduleTemplateCache()
+    for principal in [1_000_000.0, 2_345_678.9, 50.0]:
+        expected = borrowing(principal)
+        templated = borrowing(principal)
+        templated.schedule_templates = templates
+        pd.testing.assert_frame_equal(templated.schedule(), expected.schedule(), rtol=1e-12)
+        templated_dts, templated_pmts = zip(*templated.payments(pmt_dt=True))
+        expected_dts, expected_pmts = zip(*expected.payments(pmt_dt=True))
+        assert templated_dts == expected_dts
+        assert templated_pmts == pytest.approx(expected_pmts, rel=1e-12)
+        assert templated.outstanding_principal(datetime(2021, 6, 1)) == \
+            pytest.approx(expected.outstanding_principal(datetime(2021, 6, 1)), rel=1e-12)
+
+    assert templates.info() == (2, 1, 1024, 1)
+
+
+def test_schedule_templates_custom_amort():
+    templates = ScheduleTemplateCache()
+    borrowing = make_borrowing()
+    borrowing.amort_periods = [1000.0] * 23 + [977000.0]
+    borrowing.schedule_templates = templates
+    assert borrowing.schedule()['principal_payment'].iloc[0] == 1000.0
+    assert len(templates) == 0
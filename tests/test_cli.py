@@ -0,0 +1,143 @@
+from datetime import datetime
+import csv
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cred import FixedRateBorrowing, Monthly, SQLiteQuoteCache, StepDown
+from cred import cli
+from cred.cli import main, parse_args
+
+
+ROWS = [
+    {'loan_id': 'A', 'start_date': '2020-01-01', 'end_date': '2022-01-01', 'initial_principal': '1000000',
+     'coupon': '0.05', 'amort_periods': '360', 'prepayment': 'step_down', 'step_down_months': '6;12',
+     'step_down_premiums': '0.02;0.01'},
+    {'loan_id': 'B', 'start_date': '2020-06-01', 'end_date': '2023-06-01', 'initial_principal': '500000',
+     'coupon': '0.04', 'prepayment': 'defeasance', 'open_months': '33'},
+    {'loan_id': 'C', 'start_date': '2020-01-01', 'end_date': '2021-01-01', 'initial_principal': '250000',
+     'coupon': '0.03'},
+]
+
+
+@pytest.fixture
+def tape(tmp_path):
+    path = tmp_path / 'tape.csv'
+    columns = sorted({c for row in ROWS for c in row})
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, columns)
+        writer.writeheader()
+        writer.writerows(ROWS)
+    return str(path)
+
+
+def test_schedules(tape, tmp_path, capsys):
+    out = tmp_path / 'out'
+    assert main([tape, str(out), '--chunk-size', '2', '--flat-rate', '0.02']) == 0
+    schedules = pd.read_csv(out / 'schedules.csv')
+    assert list(schedules.loan_id.unique()) == ['A', 'B', 'C']
+    assert len(schedules) == 24 + 36 + 12
+    printed = capsys.readouterr().out
+    assert 'loans: 3 in 2 chunks' in printed
+    assert 'schedules: 72 rows' in printed
+
+
+@pytest.mark.parametrize('workers', ['1', '2'])
+def test_metrics(tape, tmp_path, workers):
+    out = tmp_path / 'out'
+    main([tape, str(out), '-w', workers, '-m', 'balances,prepayment', '-d', '2019-01-01,2020-09-15',
+          '--flat-rate', '0.02'])
+    assert not (out / 'schedules.csv').exists()
+
+    balances = pd.read_csv(out / 'balances.csv')
+    assert len(balances) == 6
+    assert balances.outstanding_principal.isna().tolist() == [True, False, True, False, True, False]
+    loan = FixedRateBorrowing(start_date=datetime(2020, 1, 1), end_date=datetime(2022, 1, 1), freq=Monthly(1),
+                              initial_principal=1_000_000.0, coupon=0.05, amort_periods=360,
+                              prepayment=StepDown([Monthly(6), Monthly(12)], [0.02, 0.01]))
+    assert balances.outstanding_principal[1] == pytest.approx(loan.outstanding_principal(datetime(2020, 9, 15)))
+
+    prepayment = pd.read_csv(out / 'prepayment.csv')
+    assert prepayment.repayment_amount[1] == pytest.approx(loan.repayment_amount(datetime(2020, 9, 15)))
+    assert prepayment.repayment_amount[3] > 500_000.0
+    assert prepayment.repayment_amount.isna().tolist() == [True, False, True, False, True, True]
+
+
+def test_quote_cache(tape, tmp_path):
+    args = [tape, str(tmp_path / 'out'), '-m', 'prepayment', '-d', '2020-09-15', '--flat-rate', '0.02',
+            '--quote-cache', str(tmp_path / 'quotes.db')]
+    main(args)
+    first = pd.read_csv(tmp_path / 'out' / 'prepayment.csv')
+    main(args)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'out' / 'prepayment.csv'), first)
+    assert len(SQLiteQuoteCache(tmp_path / 'quotes.db', curve_version=0)) == 2
+
+
+def test_npz(tape, tmp_path):
+    out = tmp_path / 'out'
+    main([tape, str(out), '-f', 'npz', '-c', '2', '--flat-rate', '0.02'])
+    chunks = [np.load(out / f'schedules-0000{i}.npz') for i in range(2)]
+    assert chunks[0]['loan_id'].tolist() == ['A'] * 24 + ['B'] * 36
+    assert chunks[1]['pmt_date'].dtype == np.dtype('datetime64[D]')
+
+
+def test_invalid_args(tape, tmp_path):
+    with pytest.raises(SystemExit):
+        parse_args([tape, str(tmp_path), '-m', 'duration'])
+    with pytest.raises(SystemExit):
+        parse_args([tape, str(tmp_path), '-m', 'balances'])
+
+
+def test_module_entry_point(tape, tmp_path):
+    result = subprocess.run([sys.executable, '-m', 'cred', tape, str(tmp_path / 'out'), '--flat-rate', '0.02'],
+                            capture_output=True, text=True)
+    assert result.returncode == 0
+    assert 'loans: 3' in result.stdout
+
+
+def test_tape_error(tape, tmp_path, capsys):
+    assert main([tape, str(tmp_path / 'out')]) == 1
+    assert 'requires a curve' in capsys.readouterr().err
+
+
+def test_input_errors(tape, tmp_path, capsys):
+    amortizations = tmp_path / 'amortizations.csv'
+    amortizations.write_text('amort_schedule,principal_payment\nA,100\nA,not a number\n')
+    assert main([tape, str(tmp_path / 'out'), '--amortizations', str(amortizations), '--flat-rate', '0.02']) == 1
+    assert 'amortization file row 2' in capsys.readouterr().err
+
+    amortizations.write_text('schedule,amount\nA,100\n')
+    assert main([tape, str(tmp_path / 'out'), '--amortizations', str(amortizations), '--flat-rate', '0.02']) == 1
+    assert 'amortization file row 1' in capsys.readouterr().err
+
+    output = tmp_path / 'file'
+    output.write_text('')
+    assert main([tape, str(output), '--flat-rate', '0.02']) == 1
+    assert capsys.readouterr().err.startswith('cred: error:')
+
+    quote_cache = tmp_path / 'quotes.db'
+    quote_cache.write_text('not a database')
+    assert main([tape, str(tmp_path / 'out'), '-m', 'prepayment', '-d', '2020-09-15', '--flat-rate', '0.02',
+                 '--quote-cache', str(quote_cache)]) == 1
+    assert capsys.readouterr().err.startswith('cred: error:')
+
+    with pytest.raises(SystemExit):
+        main([tape, str(tmp_path / 'out'), '-m', 'balances', '-d', '2020-13-45'])
+    assert 'invalid --dates' in capsys.readouterr().err
+
+
+def test_writers_closed_on_error(tape, tmp_path, monkeypatch):
+    opened = []
+    writer = cli._writer
+
+    def failing_writer(fmt, output, table, columns):
+        if opened:
+            raise OSError('cannot open')
+        opened.append(writer(fmt, output, table, columns))
+        return opened[-1]
+    monkeypatch.setattr(cli, '_writer', failing_writer)
+    assert main([tape, str(tmp_path / 'out'), '-m', 'schedule,balances', '-d', '2020-09-15']) == 1
+    assert opened[0].file.closed
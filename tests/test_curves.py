@@ -0,0 +1,108 @@
+from datetime import datetime
+import pickle
+
+import numpy as np
+import pytest
+
+from cred import Defeasance, FixedRateBorrowing, SimpleYieldMaintenance
+from cred import FlatCurve, ZeroCurve
+from dateutil.relativedelta import relativedelta
+
+
+@pytest.fixture
+def zero_curve():
+    return ZeroCurve(
+        base_date=datetime(2020, 1, 1),
+        dates=[datetime(2021, 1, 1), datetime(2025, 1, 1), datetime(2030, 1, 1)],
+        rates=[0.01, 0.02, 0.025]
+    )
+
+
+@pytest.fixture
+def borrowing():
+    return FixedRateBorrowing(
+        start_date=datetime(2020, 1, 1),
+        end_date=datetime(2025, 1, 1),
+        freq=relativedelta(months=1),
+        initial_principal=1_000_000.0,
+        coupon=0.04,
+        amort_periods=360
+    )
+
+
+def test_flat_curve():
+    curve = FlatCurve(0.03)
+    assert curve(datetime(2020, 1, 1), datetime(2021, 1, 1)) == pytest.approx(np.exp(-0.03 * 366 / 365))
+    assert curve.zero_rate(datetime(2020, 1, 1), datetime(2022, 1, 1)) == pytest.approx(0.03)
+
+
+def test_flat_curve_compounding():
+    curve = FlatCurve(0.03, compounding=2)
+    assert curve(datetime(2020, 1, 1), datetime(2021, 1, 1)) == pytest.approx(1.015 ** (-2 * 366 / 365))
+    assert curve.zero_rate(datetime(2020, 1, 1), datetime(2022, 1, 1)) == pytest.approx(0.03)
+
+
+def test_forward_rates(zero_curve):
+    starts = [datetime(2020, 1, 1), datetime(2022, 3, 1)]
+    ends = [datetime(2020, 4, 1), datetime(2022, 6, 1)]
+    rates = zero_curve.forward_rates(starts, ends)
+    for start, end, rate in zip(starts, ends, rates):
+        assert (1 + rate * (end - start).days / 360) * zero_curve(start, end) == pytest.approx(1.0)
+    flat = FlatCurve(0.03).forward_rates([datetime(2020, 1, 1)], [datetime(2021, 1, 1)], days_in_year=365.0)
+    assert flat[0] == pytest.approx(np.expm1(0.03 * 366 / 365) * 365 / 366)
+
+
+def test_zero_curve_interpolation(zero_curve):
+    times = zero_curve.times([datetime(2019, 1, 1), datetime(2021, 1, 1), datetime(2023, 1, 1), datetime(2035, 1, 1)])
+    t1, t2 = zero_curve.times([datetime(2021, 1, 1), datetime(2025, 1, 1)])
+    expected = 0.01 + (times[2] - t1) / (t2 - t1) * 0.01
+    assert zero_curve.zero_rates(times) == pytest.approx([0.01, 0.01, expected, 0.025])
+
+
+def test_zero_curve_forward(zero_curve):
+    dt1, dt2 = datetime(2021, 1, 1), datetime(2025, 1, 1)
+    base = zero_curve.base_date
+    assert zero_curve(dt1, dt2) == pytest.approx(zero_curve(base, dt2) / zero_curve(base, dt1))
+
+
+def test_discount_factors_vectorized(zero_curve):
+    start_dts = [datetime(2020, 6, 1)] * 3
+    end_dts = [datetime(2021, 6, 1), datetime(2024, 3, 15), datetime(2032, 1, 1)]
+    expected = [zero_curve(dt1, dt2) for dt1, dt2 in zip(start_dts, end_dts)]
+    assert zero_curve.discount_factors(start_dts, end_dts) == pytest.approx(expected)
+
+
+def test_zero_curve_validation():
+    with pytest.raises(ValueError):
+        ZeroCurve(datetime(2020, 1, 1), [datetime(2021, 1, 1)], [0.01, 0.02])
+    with pytest.raises(ValueError):
+        ZeroCurve(datetime(2020, 1, 1), [datetime(2022, 1, 1), datetime(2021, 1, 1)], [0.01, 0.02])
+    with pytest.raises(ValueError):
+        FlatCurve(0.01, compounding='annual')
+
+
+def test_pickle_curve(zero_curve):
+    restored = pickle.loads(pickle.dumps(zero_curve))
+    assert restored.fingerprint() == zero_curve.fingerprint()
+    assert restored(datetime(2020, 1, 1), datetime(2027, 1, 1)) == zero_curve(datetime(2020, 1, 1), datetime(2027, 1, 1))
+
+
+def test_fingerprint_depends_on_rates(zero_curve):
+    bumped = ZeroCurve(zero_curve.base_date, zero_curve.dates, [r + 0.0001 for r in zero_curve.rates])
+    assert bumped.fingerprint() != zero_curve.fingerprint()
+
+
+def test_defeasance_with_curve(borrowing, zero_curve):
+    borrowing.prepayment = Defeasance(df_func=zero_curve)
+    dts = [datetime(2020, 3, 15), datetime(2022, 7, 1)]
+    expected = [borrowing.repayment_amount(dt) for dt in dts]
+    restored = pickle.loads(pickle.dumps(borrowing))
+    assert restored.prepayment.required_repayments(restored, dts) == pytest.approx(expected)
+    assert 'ZeroCurve' in repr(borrowing.prepayment)
+
+
+def test_yield_maintenance_with_curve(borrowing, zero_curve):
+    borrowing.prepayment = SimpleYieldMaintenance(rate_func=zero_curve.zero_rate)
+    dt = datetime(2021, 3, 15)
+    restored = pickle.loads(pickle.dumps(borrowing))
+    assert restored.repayment_amount(dt) == pytest.approx(borrowing.repayment_amount(dt))
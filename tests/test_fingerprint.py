@@ -0,0 +1,100 @@
+import subprocess
+import sys
+from datetime import datetime, date
+
+from dateutil.relativedelta import relativedelta
+import numpy as np
+import pandas as pd
+from cred import FixedRateBorrowing, FederalReserveHolidays, FlatCurve, LondonBankHolidays, Monthly, StepDown, \
+    following, thirty360
+from cred.fingerprint import fingerprint, stable_token
+
+
+BORROWING_SCRIPT = """
+from datetime import datetime
+from cred import FixedRateBorrowing, FederalReserveHolidays, Monthly, StepDown, following
+b = FixedRateBorrowing(datetime(2020, 1, 1), datetime(2030, 1, 1), Monthly(1), 1_000_000.0, 0.05, amort_periods=360,
+                       holiday_calendar=FederalReserveHolidays(), pmt_convention=following,
+                       prepayment=StepDown([Monthly(12), Monthly(24)], [0.02, 0.01]))
+print(b.fingerprint())
+"""
+
+
+def make_borrowing(**kwargs):
+    terms = dict(start_date=datetime(2020, 1, 1), end_date=datetime(2030, 1, 1), freq=Monthly(1),
+                 initial_principal=1_000_000.0, coupon=0.05, amort_periods=360,
+                 holiday_calendar=FederalReserveHolidays(), pmt_convention=following,
+                 prepayment=StepDown([Monthly(12), Monthly(24)], [0.02, 0.01]))
+    terms.update(kwargs)
+    return FixedRateBorrowing(**terms)
+
+
+def test_stable_token():
+    assert stable_token(1) == stable_token(1.0) == stable_token(np.float64(1.0))
+    assert stable_token(1) != stable_token(1.5)
+    assert stable_token(0.0) == stable_token(-0.0) == stable_token(0)
+    assert stable_token(np.float64(0.05)) == stable_token(0.05)
+    assert stable_token(np.int64(3)) == stable_token(3)
+    assert stable_token(pd.Timestamp('2020-01-01')) == stable_token(datetime(2020, 1, 1))
+    assert stable_token(date(2020, 1, 1)) != stable_token(datetime(2020, 1, 1))
+    assert stable_token(pd.Series([1.0, 2.0])) == stable_token([1.0, 2.0])
+    assert stable_token({'b': 1, 'a': 2}) == stable_token({'a': 2, 'b': 1})
+    assert stable_token(thirty360) == 'cred.interest_rate.thirty360'
+    assert stable_token(relativedelta(months=1)) == stable_token(relativedelta(months=+1))
+    assert stable_token(Monthly(3)) == stable_token(Monthly(3))
+    assert stable_token(FederalReserveHolidays()) == stable_token(FederalReserveHolidays())
+    assert stable_token(FederalReserveHolidays()) != stable_token(LondonBankHolidays())
+    assert stable_token(FlatCurve(0.02).zero_rate) == stable_token(FlatCurve(0.02).zero_rate)
+    assert stable_token(FlatCurve(0.02).zero_rate) != stable_token(FlatCurve(0.03).zero_rate)
+
+
+def discount_function(rate):
+    def df(dt1, dt2):
+        return (1 + rate) ** -thirty360(dt1, dt2)
+    return df
+
+
+def test_local_function_tokens():
+    assert stable_token(discount_function(0.05)) == stable_token(discount_function(0.05))
+    assert stable_token(discount_function(0.05)) != stable_token(discount_function(0.06))
+    assert stable_token(lambda dt, h: dt) != stable_token(lambda dt, h: h)
+    assert stable_token(lambda dt, h: dt) == stable_token(lambda dt, h: dt)
+    assert make_borrowing(year_frac=lambda d1, d2: 0.5).fingerprint() != \
+        make_borrowing(year_frac=lambda d1, d2: 0.25).fingerprint()
+
+    def recursive(n):
+        return n if n < 1 else recursive(n - 1)
+    assert stable_token(recursive) == stable_token(recursive)
+
+
+def test_borrowing_fingerprint():
+    borrowing = make_borrowing()
+    assert borrowing.fingerprint() == make_borrowing().fingerprint()
+    assert borrowing.schedule_fingerprint() == make_borrowing(prepayment=None).fingerprint()
+    assert borrowing.fingerprint() != make_borrowing(initial_principal=2_000_000.0).fingerprint()
+    assert borrowing.fingerprint() != make_borrowing(holiday_calendar=LondonBankHolidays()).fingerprint()
+    assert borrowing.fingerprint() != make_borrowing(amort_periods=[0] * 119 + [1_000_000.0]).fingerprint()
+    assert borrowing.fingerprint() != make_borrowing(prepayment=StepDown([Monthly(12)], [0.02])).fingerprint()
+    assert make_borrowing(amort_periods=pd.Series([0] * 120)).fingerprint() == \
+        make_borrowing(amort_periods=[0] * 120).fingerprint()
+    # principal and amortization read as floats from a tape match integers given in code
+    assert make_borrowing(initial_principal=1_000_000, amort_periods=360.0).fingerprint() == borrowing.fingerprint()
+
+
+def test_fingerprint_updates_with_terms():
+    borrowing = make_borrowing()
+    fp = borrowing.fingerprint()
+    borrowing.desc = 'Loan 1'
+    assert borrowing.fingerprint() == fp
+    borrowing.coupon = 0.06
+    assert borrowing.fingerprint() != fp
+    borrowing.coupon = 0.05
+    assert borrowing.fingerprint() == fp
+    borrowing.prepayment = None
+    assert borrowing.fingerprint() == borrowing.schedule_fingerprint() != fp
+
+
+def test_fingerprint_consistent_across_processes():
+    out = subprocess.run([sys.executable, '-c', BORROWING_SCRIPT], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == make_borrowing().fingerprint()
+    assert len(fingerprint('abc')) == 64
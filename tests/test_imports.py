@@ -0,0 +1,56 @@
+import subprocess
+import sys
+
+import pytest
+
+import cred
+
+
+CORE_SCRIPT = """
+import sys
+from datetime import datetime
+import cred
+assert 'pandas' not in sys.modules, 'import cred'
+b = cred.FixedRateBorrowing(datetime(2020, 1, 1), datetime(2025, 1, 1), cred.Monthly(1), 1_000_000.0, 0.05,
+                            amort_periods=360, pmt_convention=cred.following,
+                            prepayment=cred.StepDown([cred.Monthly(12)], [0.01]))
+b.cash_flows()
+b.payments()
+b.outstanding_principal(datetime(2021, 1, 1))
+b.repayment_amount(datetime(2021, 3, 1))
+assert 'pandas' not in sys.modules, 'core schedule path'
+b.schedule()
+assert 'pandas' in sys.modules
+"""
+
+
+def test_core_path_without_pandas():
+    result = subprocess.run([sys.executable, '-c', CORE_SCRIPT], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_lazy_exports():
+    assert set(cred.__all__) <= set(dir(cred))
+    for name in cred.__all__:
+        assert getattr(cred, name) is not None
+    assert cred.FederalReserveHolidays.__module__ == 'cred.calendars'
+    with pytest.raises(AttributeError):
+        cred.NotAName
+
+
+def test_businessdays_calendars():
+    from cred.businessdays import FederalReserveHolidays, LondonBankHolidays
+    from cred.calendars import FederalReserveHolidays as calendar
+    assert FederalReserveHolidays is calendar
+    assert LondonBankHolidays is cred.LondonBankHolidays
+
+
+def test_businessdays_pandas_holiday_names():
+    from pandas.tseries import holiday
+    from cred.businessdays import AbstractHolidayCalendar, Holiday, USMemorialDay, sunday_to_monday
+    assert Holiday is holiday.Holiday
+    assert AbstractHolidayCalendar is holiday.AbstractHolidayCalendar
+    assert USMemorialDay is holiday.USMemorialDay
+    assert sunday_to_monday is holiday.sunday_to_monday
+    with pytest.raises(ImportError):
+        from cred.businessdays import NotAHoliday  # noqa: F401
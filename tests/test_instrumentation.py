@@ -0,0 +1,116 @@
+import pickle
+from datetime import datetime
+
+import pytest
+
+from cred import FixedRateBorrowing, Monthly, QuoteCache, StepDown, following, instrumentation
+from cred.instrumentation import Stats, instrument
+
+
+def make_borrowing():
+    return FixedRateBorrowing(
+        start_date=datetime(2020, 1, 1),
+        end_date=datetime(2021, 1, 1),
+        freq=Monthly(1),
+        initial_principal=1_000_000.0,
+        coupon=0.05,
+        amort_periods=120,
+        pmt_convention=following,
+        prepayment=StepDown([Monthly(6)], [0.02])
+    )
+
+
+def test_disabled_by_default():
+    borrowing = make_borrowing()
+    borrowing.cash_flows()
+    assert instrumentation.active() is None
+
+
+def test_wrappers_installed_while_enabled():
+    create_period = FixedRateBorrowing._create_period
+    assert create_period.__qualname__ == '_Borrowing._create_period'
+    assert not hasattr(create_period, '__wrapped__')
+    with instrument():
+        assert FixedRateBorrowing._create_period.__wrapped__ is create_period
+        assert StepDown.required_repayment.__wrapped__.__qualname__ == 'StepDown.required_repayment'
+    assert FixedRateBorrowing._create_period is create_period
+
+
+def test_schedule_counts():
+    borrowing = make_borrowing()
+    with instrument() as stats:
+        borrowing.cash_flows()
+        borrowing.cash_flows()
+    assert instrumentation.active() is None
+    assert stats.calls['schedule_build'] == 1
+    assert stats.calls['create_period'] == 12
+    assert stats.counts['period_cache_misses'] == 12
+    assert stats.counts['cash_flows_cache_misses'] == 1
+    assert stats.counts['cash_flows_cache_hits'] == 1
+    assert stats.samples == 1
+    assert stats.times['schedule_build'] >= stats.times['create_period'] > 0
+
+
+def test_recursive_steps_timed_once():
+    borrowing = make_borrowing()
+    with instrument() as stats:
+        borrowing.period(5)
+    # building period 5 builds periods 0 through 4 without a cache
+    assert stats.calls['create_period'] == 6
+    assert stats.samples == 1
+    assert not stats._running
+
+
+def test_required_repayment_steps():
+    borrowing = make_borrowing()
+    with instrument() as stats:
+        borrowing.repayment_amount(datetime(2020, 3, 15))
+    assert stats.calls['StepDown.required_repayment'] == 1
+    assert stats.calls['OpenPrepayment.required_repayment'] == 1
+    assert stats.samples == 1
+    assert 'StepDown.required_repayment' in stats.report()
+
+
+def test_quote_cache_counts():
+    borrowing = make_borrowing()
+    borrowing.quote_cache = QuoteCache()
+    with instrument() as stats:
+        borrowing.repayment_amount(datetime(2020, 3, 15))
+        borrowing.repayment_amount(datetime(2020, 3, 15))
+    assert stats.counts['quote_cache_misses'] == 1
+    assert stats.counts['quote_cache_hits'] == 1
+
+
+def test_sampling():
+    borrowing = make_borrowing()
+    with instrument(sample_rate=0.5, seed=0) as stats:
+        for _ in range(200):
+            borrowing.period(2)
+    assert 50 < stats.samples < 150
+    assert stats.calls['create_period'] == 3 * stats.samples
+    assert stats.estimate('create_period') == pytest.approx(6 * stats.samples)
+    with pytest.raises(ValueError):
+        instrumentation.enable(sample_rate=0.0)
+
+
+def test_nested_and_merge():
+    outer = Stats()
+    with instrument(outer):
+        make_borrowing().period(0)
+        with instrument() as inner:
+            make_borrowing().period(1)
+        make_borrowing().period(0)
+    assert outer.calls['create_period'] == 2
+    assert inner.calls['create_period'] == 2
+    assert instrumentation.active() is None
+
+    outer.merge(inner)
+    assert outer.calls['create_period'] == 4
+    assert outer.as_dict()['calls']['create_period'] == 4
+    outer.reset()
+    assert outer.counts == {} and outer.samples == 0
+
+
+def test_adjustment_functions_pickle():
+    assert pickle.loads(pickle.dumps(following)) is following
+    assert following.__name__ == 'following'
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from datetime import datetime
+
+from cred.ledger import BalanceLedger
+
+
+@pytest.fixture
+def ledger():
+    return BalanceLedger([datetime(2021, 3, 15), datetime(2021, 1, 1), datetime(2021, 3, 15), datetime(2021, 6, 1)],
+                         [1_000_000.0, 5_000_000.0, 1_000_000.0, -2_000_000.0])
+
+
+def test_balance(ledger):
+    assert len(ledger) == 3
+    assert ledger.total() == 5_000_000.0
+    assert ledger.balance(datetime(2021, 2, 1)) == 5_000_000.0
+    assert ledger.balance(datetime(2021, 3, 15), include_dt=False) == 5_000_000.0
+    np.testing.assert_allclose(ledger.balance(['2020-12-31', '2021-03-15', '2021-06-01', '2030-01-01']),
+                               [0.0, 7_000_000.0, 5_000_000.0, 5_000_000.0])
+    assert ledger.changes('2021-01-01', '2021-03-15') == 5_000_000.0
+    np.testing.assert_allclose(ledger.changes(['2021-01-02', '2021-03-15'], ['2021-03-16', '2021-07-01']),
+                               [2_000_000.0, 0.0])
+
+
+def test_balance_days_match_daily_sum(ledger):
+    days = np.arange(np.datetime64('2020-12-01'), np.datetime64('2021-08-01'))
+    daily = ledger.balance(days)
+    starts = np.array(['2020-12-01', '2021-01-01', '2021-02-10', '2021-03-15', '2021-05-20'], dtype='datetime64[D]')
+    ends = np.array(['2021-01-05', '2021-03-15', '2021-03-16', '2021-06-01', '2021-07-31'], dtype='datetime64[D]')
+    expected = [daily[(days >= s) & (days < e)].sum() for s, e in zip(starts, ends)]
+    np.testing.assert_allclose(ledger.balance_days(starts, ends), expected)
+    np.testing.assert_allclose(ledger.average_balance(starts, ends), np.array(expected) / (ends - starts).astype(float))
+    assert ledger.average_balance('2021-03-15', '2021-03-15') == 7_000_000.0
+
+
+def test_add_and_empty(ledger):
+    added = ledger.add([datetime(2021, 2, 1)], [500_000.0])
+    assert added.balance('2021-02-01') == 5_500_000.0
+    assert ledger.balance('2021-02-01') == 5_000_000.0
+    assert BalanceLedger().balance('2021-01-01') == 0.0
+    assert BalanceLedger().balance_days('2021-01-01', '2021-02-01') == 0.0
+    with pytest.raises(ValueError):
+        BalanceLedger(['2021-01-01'], [1.0, 2.0])
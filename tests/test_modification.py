@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from datetime import date, datetime
+
+from cred import FixedRateBorrowing, Monthly
+from cred.modification import CouponChange, PrincipalPaydown, modify
+from cred.solvers import level_payment
+
+
+def borrowing(**kwargs):
+    return FixedRateBorrowing(datetime(2020, 1, 15), datetime(2030, 1, 15), Monthly(1), 1_000_000.0, 0.05,
+                              amort_periods=360, io_periods=12, **kwargs)
+
+
+def test_coupon_change_matches_full_build():
+    original = borrowing()
+    result = modify(original, CouponChange(0.06, 38))
+    expected = borrowing(modifications=[CouponChange(0.06, 38)]).cash_flows()
+    cfs = result.borrowing.cash_flows()
+    for field in cfs._fields:
+        np.testing.assert_array_equal(getattr(cfs, field), getattr(expected, field))
+    np.testing.assert_array_equal(cfs.payment[:38], original.cash_flows().payment[:38])
+    assert cfs.interest_rate[38] == 0.06
+    assert cfs.payment[40] == pytest.approx(level_payment(cfs.bop_principal[38], 0.06, 360 - 26))
+    assert result.schedule['payment'].to_numpy() == pytest.approx(cfs.payment)
+    assert original.modifications is None
+
+
+def test_date_effective_modification():
+    result = modify(borrowing(), CouponChange(0.06, datetime(2023, 3, 20)))
+    assert result.borrowing.modifications[0].effective == 38
+    assert list(result.diff.index) == list(range(38, 120))
+    assert result.diff['interest_rate'].to_numpy() == pytest.approx(0.01)
+
+    dates = FixedRateBorrowing(date(2020, 1, 15), date(2030, 1, 15), Monthly(1), 1_000_000.0, 0.05, amort_periods=360)
+    paid = modify(dates, PrincipalPaydown(100_000.0, date(2021, 5, 1)))
+    assert paid.diff.index[0] == 15
+    assert paid.schedule['start_date'].iloc[0].date() == dates.start_date
+
+
+@pytest.mark.parametrize('recast', [False, True])
+def test_principal_paydown(recast):
+    original = borrowing()
+    result = modify(original, PrincipalPaydown(100_000.0, 24, recast=recast))
+    old, new = original.cash_flows(), result.borrowing.cash_flows()
+    assert new.principal_pmt[24] == pytest.approx(old.principal_pmt[24] + 100_000.0)
+    assert result.diff.index[0] == 24
+    if recast:
+        assert new.payment[25] == pytest.approx(level_payment(new.eop_principal[24], 0.05, 347))
+        assert new.payment[25] < old.payment[25]
+    else:
+        np.testing.assert_allclose(new.payment[25:-1], old.payment[25:-1])
+        assert new.payment[-1] < old.payment[-1]
+    assert new.eop_principal[-1] == 0.0
+
+
+def test_paydown_is_capped_at_balance():
+    result = modify(borrowing(), PrincipalPaydown(2_000_000.0, 30))
+    cfs = result.borrowing.cash_flows()
+    assert cfs.principal_pmt[30] == pytest.approx(cfs.bop_principal[30])
+    assert (cfs.payment[31:] == 0).all()
+
+
+def test_repeated_modifications():
+    original = borrowing()
+    first = modify(original, PrincipalPaydown(50_000.0, 24, recast=True))
+    second = modify(first.borrowing, CouponChange(0.04, 60))
+    assert len(second.borrowing.modifications) == 2
+    assert second.diff.index[0] == 60
+    assert second.borrowing.fingerprint() != first.borrowing.fingerprint() != original.fingerprint()
+
+    with pytest.raises(ValueError):
+        modify(original, CouponChange(0.04, 120))
+    with pytest.raises(ValueError):
+        modify(original)
+
+
+def test_modify_in_context():
+    original = borrowing()
+    with original:
+        original.period(3)
+        result = modify(original, CouponChange(0.04, 60))
+    assert not result.borrowing._in_context
+    assert not result.borrowing._cache
+    assert result.borrowing._cached_periods == {}
+    result.borrowing.period(70)
+    assert result.borrowing._cached_periods == {}
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+
+from cred import Defeasance, FixedRateBorrowing, FloatingRateBorrowing, Monthly, SimpleYieldMaintenance, StepDown, \
+    ZeroCurve
+from cred.montecarlo import HullWhite, LognormalForwardModel, MonteCarlo
+
+
+BASE = datetime(2020, 1, 1)
+
+
+@pytest.fixture
+def curve():
+    return ZeroCurve(BASE, [datetime(2021, 1, 1), datetime(2025, 1, 1), datetime(2030, 1, 1)], [0.01, 0.02, 0.025])
+
+
+@pytest.fixture
+def fixed():
+    return FixedRateBorrowing(BASE, datetime(2025, 1, 1), Monthly(1), 1_000_000.0, 0.04, amort_periods=360)
+
+
+@pytest.fixture
+def floating(curve):
+    return FloatingRateBorrowing(BASE, datetime(2025, 1, 1), Monthly(1), 1_000_000.0, curve, spread=0.02)
+
+
+@pytest.fixture
+def settle_dts():
+    return [datetime(2020, 1, 1), datetime(2021, 3, 15), datetime(2023, 6, 1), datetime(2026, 1, 1)]
+
+
+def test_zero_volatility_matches_curve(curve, fixed, floating, settle_dts):
+    engine = MonteCarlo(HullWhite(curve, BASE, mean_reversion=0.05, volatility=0.0), n_paths=3)
+
+    dfz = Defeasance(df_func=curve)
+    costs = engine.prepayment_costs(fixed, settle_dts, prepayment=dfz)
+    assert costs.shape == (3, 4)
+    np.testing.assert_allclose(costs, np.tile(dfz.required_repayments(fixed, settle_dts), (3, 1)), rtol=1e-10)
+
+    ym = SimpleYieldMaintenance(rate_func=curve.zero_rate, margin=0.005, wal_rate=True, min_penalty=0.01)
+    expected = [ym.required_repayment(fixed, dt) for dt in settle_dts[:3]]
+    np.testing.assert_allclose(engine.prepayment_costs(fixed, settle_dts[:3], prepayment=ym)[1], expected, rtol=1e-10)
+
+    np.testing.assert_allclose(engine.cash_flows(floating)[2], floating.cash_flows().payment, rtol=1e-10)
+    cfs = fixed.cash_flows()
+    pv = (cfs.payment * curve.discount_factors([BASE] * len(cfs.pmt_date), cfs.pmt_date)).sum()
+    assert engine.present_values(fixed) == pytest.approx(np.full(3, pv), rel=1e-10)
+
+
+def test_hull_white_reprices_curve(curve):
+    engine = MonteCarlo(HullWhite(curve, BASE, mean_reversion=0.1, volatility=0.01), n_paths=20000, seed=7,
+                        step_days=7)
+    dt, end = np.datetime64('2023-01-01'), np.datetime64('2028-01-01')
+    paths = engine.simulate([dt])
+    deflated = paths.numeraire_discount_factors([dt])[:, 0] * paths.discount_factors(dt, [end])[:, 0]
+    assert deflated.mean() == pytest.approx(curve.discount_factor(BASE, end), rel=2e-3)
+    assert paths.short_rates()[:, 0] == pytest.approx(np.full(20000, curve.zero_rates(np.array([0.0]))[0]), abs=1e-3)
+
+
+def test_rate_uncertainty_spreads_costs(curve, fixed, settle_dts):
+    dfz = Defeasance(df_func=curve)
+    for model in (HullWhite(curve, BASE, 0.05, 0.01), LognormalForwardModel(curve, BASE, 0.3, 0.1)):
+        costs = MonteCarlo(model, n_paths=2000, seed=1).prepayment_costs(fixed, settle_dts, prepayment=dfz)
+        assert costs[:, 0] == pytest.approx(np.full(2000, costs[0, 0]))
+        assert costs[:, 1].std() > 1000
+        assert costs[:, 1].mean() == pytest.approx(dfz.required_repayment(fixed, settle_dts[1]), rel=1e-2)
+        assert np.isnan(costs[:, 3]).all()
+
+
+def test_rate_independent_prepayment(curve, fixed, settle_dts):
+    step_down = StepDown([relativedelta(years=1), relativedelta(years=2)], [0.02, 0.01])
+    engine = MonteCarlo(HullWhite(curve, BASE, 0.05, 0.01), n_paths=5)
+    costs = engine.prepayment_costs(fixed, settle_dts[:3], prepayment=step_down)
+    expected = [step_down.required_repayment(fixed, dt) for dt in settle_dts[:3]]
+    np.testing.assert_allclose(costs, np.tile(expected, (5, 1)))
+
+
+def test_reproducible_shards(curve, floating):
+    model = HullWhite(curve, BASE, 0.05, 0.01)
+    one_shard = MonteCarlo(model, n_paths=1000, seed=3).cash_flows(floating)
+    np.testing.assert_array_equal(one_shard, MonteCarlo(model, n_paths=1000, seed=3).cash_flows(floating))
+    sharded = MonteCarlo(model, n_paths=1000, seed=3, shard_size=300)
+    assert sharded.shards() == [300, 300, 300, 100]
+    values = sharded.present_values(floating)
+    np.testing.assert_array_equal(values, sharded.present_values(floating, workers=2))
+    assert values.shape == (1000,)
+    assert not np.array_equal(one_shard, MonteCarlo(model, n_paths=1000, seed=4).cash_flows(floating))
+
+
+def test_settlement_before_base_date(curve, fixed):
+    engine = MonteCarlo(HullWhite(curve, BASE, 0.05, 0.01), n_paths=5)
+    with pytest.raises(ValueError):
+        engine.prepayment_costs(fixed, [datetime(2019, 12, 31)], prepayment=Defeasance(df_func=curve))
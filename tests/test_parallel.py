@@ -0,0 +1,86 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import pickle
+
+from dateutil.relativedelta import relativedelta
+import numpy as np
+import pandas as pd
+import pytest
+
+from cred import FixedRateBorrowing, FederalReserveHolidays, Monthly, OpenPrepayment, Portfolio, StepDown, following
+from cred import parallel
+
+
+@pytest.fixture
+def borrowings():
+    return [
+        FixedRateBorrowing(
+            start_date=datetime(2020, 1, 1),
+            end_date=datetime(2021 + i % 3, 1, 1),
+            freq=relativedelta(months=1),
+            initial_principal=1_000_000.0 + 1000 * i,
+            coupon=0.04 + 0.001 * i,
+            amort_periods=360 if i % 2 else None,
+            holiday_calendar=FederalReserveHolidays(),
+            pmt_convention=following,
+            prepayment=StepDown([Monthly(6), Monthly(12)], [0.02, 0.01]) if i % 2 else OpenPrepayment()
+        )
+        for i in range(7)
+    ]
+
+
+def test_pickle_stepdown(borrowings):
+    borrowing = borrowings[1]
+    dt = datetime(2020, 3, 15)
+    expected = borrowing.repayment_amount(dt)
+    assert pickle.loads(pickle.dumps(borrowing)).repayment_amount(dt) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('workers,chunksize', [(1, None), (2, None), (2, 1), (3, 5)])
+def test_schedules(borrowings, workers, chunksize):
+    expected = [b.schedule() for b in borrowings]
+    for result, exp in zip(parallel.schedules(borrowings, workers=workers, chunksize=chunksize), expected):
+        pd.testing.assert_frame_equal(result, exp)
+
+
+def test_payments_and_repayment_amounts(borrowings):
+    dts = [datetime(2020, 3, 15), datetime(2020, 9, 1)]
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        pmts = parallel.payments(borrowings, datetime(2020, 6, 1), None, pmt_dt=True, executor=executor)
+        amts = parallel.repayment_amounts(borrowings, dts, executor=executor)
+    assert pmts == [b.payments(datetime(2020, 6, 1), None, pmt_dt=True) for b in borrowings]
+    assert amts == [[b.repayment_amount(dt) for dt in dts] for b in borrowings]
+
+
+def test_portfolio_parallel(borrowings):
+    expected = Portfolio(borrowings).cash_flows()
+    for b in borrowings:
+        b.coupon = b.coupon  # drop cached cash flows
+
+    portfolio = Portfolio(borrowings)
+    cfs = portfolio.cash_flows(workers=2, chunksize=2)
+    for field in cfs._fields:
+        np.testing.assert_array_equal(getattr(cfs, field), getattr(expected, field))
+    assert all(b._cash_flows is not None for b in borrowings)
+
+    amts = portfolio.repayment_amounts([datetime(2020, 3, 15)], workers=2)
+    assert list(amts.iloc[:, 0]) == [b.repayment_amount(datetime(2020, 3, 15)) for b in borrowings]
+
+    with pytest.raises(ValueError):
+        parallel.schedules(borrowings, workers=2, chunksize=0)
+
+
+def test_pickle_compact(borrowings):
+    borrowing = borrowings[1]
+    borrowing.schedule()
+    data = pickle.dumps(borrowing)
+    assert len(data) < 10_000
+    restored = pickle.loads(data)
+    pd.testing.assert_frame_equal(restored.schedule(), borrowing.schedule())
+
+
+def test_pickle_shares_holidays(borrowings):
+    restored = pickle.loads(pickle.dumps(borrowings))
+    assert restored[0]._holiday_calendar is restored[1]._holiday_calendar
+    assert restored[0]._holidays is restored[1]._holidays
+    assert restored[0]._holidays is borrowings[0]._holidays
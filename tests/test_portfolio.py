@@ -0,0 +1,108 @@
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+import numpy as np
+import pandas as pd
+import pytest
+
+from cred import DelayedDrawBorrowing, FixedRateBorrowing, Portfolio, FederalReserveHolidays, Monthly, \
+    modified_following, thirty360
+
+
+@pytest.fixture
+def borrowings():
+    return [
+        FixedRateBorrowing(
+            start_date=datetime(2020, 1, 16),
+            end_date=datetime(2022, 1, 16),
+            first_reg_start=datetime(2020, 2, 1),
+            freq=relativedelta(months=1),
+            initial_principal=1_000_000.0,
+            coupon=0.12,
+            amort_periods=250,
+            holiday_calendar=FederalReserveHolidays(),
+            pmt_convention=modified_following
+        ),
+        FixedRateBorrowing(
+            start_date=datetime(2020, 3, 31),
+            end_date=datetime(2021, 3, 31),
+            freq=Monthly(3),
+            initial_principal=500_000.0,
+            coupon=0.05,
+            year_frac=thirty360
+        ),
+        FixedRateBorrowing(
+            start_date=datetime(2020, 6, 1),
+            end_date=datetime(2021, 6, 1),
+            freq=relativedelta(months=1),
+            initial_principal=250_000.0,
+            coupon=0.06,
+            amort_periods=[1000.0] * 11 + [239_000.0]
+        )
+    ]
+
+
+@pytest.fixture
+def portfolio(borrowings):
+    return Portfolio(borrowings, loan_ids=['a', 'b', 'c'])
+
+
+def test_cash_flows(portfolio, borrowings):
+    cfs = portfolio.cash_flows()
+    assert len(cfs.payment) == sum(len(b.schedule()) for b in borrowings)
+    np.testing.assert_array_equal(portfolio.offsets(), [0, 25, 29, 41])
+    np.testing.assert_array_equal(cfs.loan[24:27], [0, 1, 1])
+    np.testing.assert_array_equal(cfs.period[24:27], [24, 0, 1])
+    np.testing.assert_allclose(cfs.payment[25:29], borrowings[1].schedule()['payment'].values)
+    assert portfolio.cash_flows() is cfs
+
+    borrowings[1].coupon = 0.06
+    assert portfolio.cash_flows() is not cfs
+
+
+def test_to_frame(portfolio, borrowings):
+    expected = pd.concat([b.schedule() for b in borrowings], keys=['a', 'b', 'c'], names=['loan_id'])
+    df = portfolio.to_frame()
+    np.testing.assert_allclose(df['payment'].values, expected['payment'].values)
+    np.testing.assert_array_equal(df['pmt_date'].values, expected['payment_date'].values)
+    assert list(df.index[25]) == ['b', 0]
+
+
+def test_outstanding_principal(portfolio, borrowings):
+    dts = [datetime(2020, 1, 1), datetime(2020, 3, 2), datetime(2020, 6, 30), datetime(2021, 3, 31),
+           datetime(2022, 2, 1)]
+    for include_dt in [True, False]:
+        expected = [sum(b.outstanding_principal(dt, include_dt=include_dt) or 0 for b in borrowings) for dt in dts]
+        assert list(portfolio.outstanding_principal(dts, include_dt=include_dt)) == pytest.approx(expected)
+
+
+def test_aggregate(portfolio, borrowings):
+    expected = pd.concat([b.schedule() for b in borrowings])
+
+    by_date = portfolio.aggregate()
+    expected_by_date = expected.groupby('payment_date')[['interest_payment', 'principal_payment', 'payment']].sum()
+    np.testing.assert_allclose(by_date['payment'].values, expected_by_date['payment'].values)
+    np.testing.assert_array_equal(by_date.index.values, expected_by_date.index.values)
+
+    by_quarter = portfolio.aggregate(by='end_date', freq='Q')
+    expected_by_quarter = expected.groupby(expected['end_date'].dt.to_period('Q'))['interest_payment'].sum()
+    np.testing.assert_allclose(by_quarter['interest_pmt'].values, expected_by_quarter.values)
+    assert by_quarter.index[0] == datetime(2020, 1, 1)
+    assert by_quarter['outstanding_principal'].iloc[0] == pytest.approx(
+        sum(b.outstanding_principal(datetime(2020, 3, 31)) or 0 for b in borrowings))
+    assert by_quarter['outstanding_principal'].iloc[-1] == pytest.approx(0.0)
+
+    with pytest.raises(ValueError):
+        portfolio.aggregate(freq='W')
+
+
+def test_outstanding_principal_with_draws(borrowings):
+    delayed = DelayedDrawBorrowing(datetime(2020, 1, 1), datetime(2021, 1, 1), Monthly(3), 500.0, 0.05,
+                                   draws={datetime(2020, 2, 1): 400.0}, initial_principal=100.0)
+    dts = [datetime(2020, 1, 15), datetime(2020, 3, 1), datetime(2020, 6, 30), datetime(2021, 1, 1)]
+    np.testing.assert_allclose(Portfolio([delayed]).outstanding_principal(dts), [100.0, 500.0, 500.0, 0.0])
+    np.testing.assert_allclose(Portfolio([delayed]).outstanding_principal(dts), delayed.outstanding_principals(dts))
+
+    portfolio = Portfolio(borrowings + [delayed])
+    expected = [sum(b.outstanding_principal(dt) or 0 for b in borrowings + [delayed]) for dt in dts]
+    assert list(portfolio.outstanding_principal(dts)) == pytest.approx(expected)
+    assert portfolio.aggregate()['outstanding_principal'].iloc[-1] == pytest.approx(0.0)
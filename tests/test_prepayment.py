@@ -1,9 +1,10 @@
+import numpy as np
 import pytest
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
-from cred import FixedRateBorrowing, actual360, following, unadjusted, preceding, FederalReserveHolidays, Monthly, \
-    thirty360
+from cred import DelayedDrawBorrowing, FixedRateBorrowing, actual360, following, unadjusted, preceding, \
+    FederalReserveHolidays, Monthly, thirty360
 from cred.prepayment import OpenPrepayment, StepDown, Defeasance, SimpleYieldMaintenance
 
 
@@ -142,6 +143,20 @@ def test_open_ppmt_full_period_following(open_ppmt_full_period, fixed_constant_a
     assert open_ppmt_full_period.required_repayment(fixed_constant_amort_end_stub_following, datetime(2021, 12, 20)) == pytest.approx(985930.936761)
 
 
+def test_open_ppmt_long_loan():
+    # periods late in a long loan are built in order rather than by recursing through every earlier period
+    borrowing = FixedRateBorrowing(datetime(2020, 1, 1), datetime(2060, 1, 1), Monthly(1), 1_000_000.0, 0.05,
+                                   amort_periods=480)
+    cfs = borrowing.cash_flows()
+    borrowing._cash_flows = None
+    amt = OpenPrepayment().required_repayment(borrowing, datetime(2059, 6, 15))
+    assert amt == pytest.approx(cfs.bop_principal[473] + cfs.interest_pmt[473])
+    with borrowing:
+        borrowing.period(3)
+        assert OpenPrepayment().required_repayment(borrowing, datetime(2059, 6, 15)) == pytest.approx(amt)
+        assert len(borrowing._cached_periods) == 480
+
+
 def test_open_ppmt_full_period_outside_dates(open_ppmt_full_period, fixed_constant_amort_end_stub_unadjusted):
     assert open_ppmt_full_period.required_repayment(fixed_constant_amort_end_stub_unadjusted, datetime(2019, 12, 31)) is None
     assert open_ppmt_full_period.required_repayment(fixed_constant_amort_end_stub_unadjusted, datetime(2021, 12, 21)) is None
@@ -200,6 +215,26 @@ def test_stepdown_following_no_open(fixed_constant_amort_end_stub_following, ste
     assert stepdown_no_open.required_repayment(fixed_constant_amort_end_stub_following, datetime(2021, 12, 20)) == pytest.approx(985930.936761)  # final pmt dt
 
 
+def test_stepdown_premium_pcts(fixed_constant_amort_end_stub_following, stepdown_no_open):
+    dts = [datetime(2019, 12, 31), datetime(2020, 6, 30), datetime(2020, 7, 1), datetime(2021, 1, 15),
+           datetime(2022, 1, 31), datetime(2022, 2, 1)]
+    expected = [stepdown_no_open.premium_pct(fixed_constant_amort_end_stub_following, dt) for dt in dts]
+    assert list(stepdown_no_open.premium_pcts(fixed_constant_amort_end_stub_following, dts)) == expected
+    assert expected == [0.03, 0.03, 0.02, 0.015, 0.01, 0.0]
+
+
+def test_stepdown_expiration_dates_cache(fixed_constant_amort_end_stub_following, stepdown_no_open):
+    borrowing = fixed_constant_amort_end_stub_following
+    assert stepdown_no_open.expiration_dates(borrowing)[-1] == datetime(2022, 2, 1)
+    assert stepdown_no_open.premium_pct(borrowing, datetime(2022, 1, 31)) == 0.01
+
+    borrowing.first_reg_start = datetime(2020, 2, 1)
+    assert stepdown_no_open.expiration_dates(borrowing)[-1] == datetime(2022, 3, 1)
+    borrowing.adjust_pmt_date = preceding
+    assert stepdown_no_open.expiration_dates(borrowing)[-1] == datetime(2022, 3, 1)
+    assert stepdown_no_open.expiration_dates(borrowing)[0] == datetime(2020, 7, 31)
+
+
 # Test defeasance
 @pytest.fixture
 def df_func():
@@ -254,6 +289,58 @@ def test_dfz_to_open(dfz_to_open, fixed_constant_amort_end_stub_following):
     assert dfz_to_open.required_repayment(fixed_constant_amort_end_stub_following, datetime(2021, 10, 2)) == pytest.approx(992373.685594)  # first day after open dt
 
 
+def test_dfz_required_repayments(dfz_to_maturity, fixed_constant_amort_end_stub_following):
+    dts = [datetime(2019, 12, 31), datetime(2020, 1, 1), datetime(2020, 8, 1), datetime(2021, 10, 1),
+           datetime(2021, 12, 20), datetime(2021, 12, 21)]
+    expected = [dfz_to_maturity.required_repayment(fixed_constant_amort_end_stub_following, dt) for dt in dts]
+    repayments = dfz_to_maturity.required_repayments(fixed_constant_amort_end_stub_following, dts)
+    assert np.isnan(repayments[0]) and np.isnan(repayments[-1])
+    assert list(repayments[1:-1]) == pytest.approx(expected[1:-1])
+    assert repayments[1:4] == pytest.approx([1215162.77051093, 1156608.52701895, 993130.478363])
+
+
+def test_dfz_vectorized_discount_factors(df_func, fixed_constant_amort_end_stub_following):
+    class VectorizedDF:
+        calls = 0
+
+        def __call__(self, dt1, dt2):
+            raise AssertionError('Should use discount_factors')
+
+        def discount_factors(self, start_dts, end_dts):
+            self.calls += 1
+            months = np.array([thirty360(d1, d2) for d1, d2 in zip(start_dts.tolist(), end_dts.tolist())])
+            return (1 + 0.12 / 12) ** -months
+
+    vectorized_df = VectorizedDF()
+    dfz = Defeasance(df_func=vectorized_df, open_dt_offset=None)
+    dts = [datetime(2020, 1, 1), datetime(2020, 4, 5), datetime(2021, 12, 19)]
+    repayments = dfz.required_repayments(fixed_constant_amort_end_stub_following, dts)
+    assert repayments == pytest.approx([1215162.77051093, 1185574.85298199, 985903.686195882])
+    assert vectorized_df.calls == 1
+
+
+def test_dfz_cost_curve(dfz_to_open, fixed_constant_amort_end_stub_following):
+    curve = dfz_to_open.cost_curve(fixed_constant_amort_end_stub_following)
+    assert len(curve) == 720
+    assert curve.index[0] == datetime(2020, 1, 1)
+    assert curve.index[-1] == datetime(2021, 12, 20)
+    assert curve[datetime(2020, 4, 1)] == pytest.approx(1173353.8376713)
+    assert curve[datetime(2021, 10, 2)] == pytest.approx(992373.685594)
+
+
+def test_dfz_delayed_draw(df_func):
+    borrowing = DelayedDrawBorrowing(datetime(2020, 1, 1), datetime(2022, 1, 1), Monthly(1), 1_000_000.0, 0.05,
+                                     draws={datetime(2020, 3, 15): 600_000.0}, initial_principal=400_000.0)
+    dfz = Defeasance(df_func=df_func, open_dt_offset=Monthly(-3), dfz_to_open=True)
+    dt = datetime(2020, 6, 10)
+    cfs = borrowing.cash_flows()
+    dts, amounts = dfz.collateral_payments(borrowing, dt)
+    assert dts[-1] == np.datetime64('2021-10-01')
+    assert amounts[-1] == pytest.approx(cfs.payment[20] + 1_000_000.0)
+    expected = sum(amt * df_func(dt, pmt_dt) for pmt_dt, amt in zip(dts.tolist(), amounts))
+    assert dfz.required_repayment(borrowing, dt) == pytest.approx(expected)
+
+
 # Test yield maintenance
 @pytest.fixture
 def discount_rate():  # linear interp 6% based on 30 / 360
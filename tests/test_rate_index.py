@@ -0,0 +1,102 @@
+from datetime import datetime
+import pickle
+
+import numpy as np
+import pytest
+from dateutil.relativedelta import relativedelta
+
+from cred import CompoundedInArrears, FloatingRateBorrowing, FlatCurve, OvernightIndex, StepDown
+
+
+DAYS = np.arange(np.datetime64('2019-01-01'), np.datetime64('2022-01-01'))
+BUSINESS_DAYS = DAYS[np.is_busday(DAYS)]
+RATES = 0.01 + 0.01 * np.random.default_rng(0).random(len(BUSINESS_DAYS))
+
+
+@pytest.fixture
+def index():
+    return OvernightIndex(dict(zip(BUSINESS_DAYS.tolist(), RATES)))
+
+
+def compounded(k_start, k_end, lookback=0, lockout=0):
+    # daily compounding loop over business days k_start to k_end
+    growth = 1.0
+    for k in range(k_start, k_end):
+        rate = RATES[k_end - lockout - 1 - lookback] if k >= k_end - lockout else RATES[k - lookback]
+        growth *= 1 + rate * (BUSINESS_DAYS[k + 1] - BUSINESS_DAYS[k]).astype(int) / 360
+    return (growth - 1) * 360 / (BUSINESS_DAYS[k_end] - BUSINESS_DAYS[k_start]).astype(int)
+
+
+@pytest.mark.parametrize('lookback,lockout', [(0, 0), (5, 0), (0, 2), (5, 2)])
+def test_compounded_rates(index, lookback, lockout):
+    k_starts, k_ends = np.array([30, 200, 500]), np.array([52, 263, 522])
+    rates = index.compounded_rates(BUSINESS_DAYS[k_starts], BUSINESS_DAYS[k_ends], lookback, lockout)
+    expected = [compounded(s, e, lookback, lockout) for s, e in zip(k_starts, k_ends)]
+    np.testing.assert_allclose(rates, expected, rtol=1e-12)
+
+
+def test_observation_shift(index):
+    rates = index.compounded_rates([BUSINESS_DAYS[100]], [BUSINESS_DAYS[121]], lookback=5, observation_shift=True)
+    assert rates[0] == pytest.approx(compounded(95, 116), rel=1e-12)
+
+
+def test_non_business_day_dates(index):
+    # a Saturday start accrues Friday's rate until Monday
+    start, end = np.datetime64('2020-02-29'), np.datetime64('2020-03-31')
+    friday, monday, k_end = np.searchsorted(BUSINESS_DAYS, np.array(['2020-02-28', '2020-03-02', end], 'datetime64[D]'))
+    growth = (1 + RATES[friday] * 2 / 360) * (1 + compounded(monday, k_end) * 29 / 360)
+    rate = index.compounded_rates([start], [end])[0]
+    assert rate == pytest.approx((growth - 1) * 360 / 31, rel=1e-12)
+
+
+def test_coverage_errors(index):
+    with pytest.raises(ValueError):
+        index.compounded_rates([datetime(2019, 1, 2)], [datetime(2019, 2, 1)], lookback=5)
+    with pytest.raises(ValueError):
+        index.compounded_rates([datetime(2021, 12, 1)], [datetime(2022, 2, 1)])
+    with pytest.raises(ValueError):
+        index.compounded_rates([datetime(2020, 2, 1)], [datetime(2020, 1, 1)])
+    with pytest.raises(ValueError):
+        index.compounded_rates([datetime(2020, 1, 1)], [datetime(2020, 2, 1)], lookback=2, lockout=2,
+                               observation_shift=True)
+    with pytest.raises(ValueError):
+        OvernightIndex({datetime(2020, 1, 1): np.nan})
+
+
+def test_cached_log_index(index):
+    assert index.log_index(5) is index.log_index(5)
+    copy = pickle.loads(pickle.dumps(index))
+    assert copy._log_index == {}
+    assert copy.fingerprint() == index.fingerprint()
+    np.testing.assert_allclose(copy.compounded_rates([BUSINESS_DAYS[50]], [BUSINESS_DAYS[70]], 5),
+                               index.compounded_rates([BUSINESS_DAYS[50]], [BUSINESS_DAYS[70]], 5))
+
+
+def test_projection():
+    fixings = {datetime(2020, 1, 2): 0.01, datetime(2020, 1, 3): 0.01}
+    index = OvernightIndex(fixings, curve=FlatCurve(0.02), projection_end=datetime(2021, 1, 1),
+                           holidays=[datetime(2020, 12, 25)])
+    assert np.datetime64('2020-12-25') not in index.dates
+    rate = index.compounded_rates([datetime(2020, 6, 1)], [datetime(2020, 12, 1)])[0]
+    assert rate == pytest.approx(np.expm1(0.02 * 183 / 365) * 360 / 183)
+    with pytest.raises(ValueError):
+        OvernightIndex(fixings, curve=FlatCurve(0.02))
+
+
+def test_floating_rate_borrowing(index):
+    borrowing = FloatingRateBorrowing(
+        start_date=datetime(2020, 1, 15),
+        end_date=datetime(2021, 1, 15),
+        freq=relativedelta(months=3),
+        initial_principal=1_000_000.0,
+        index_curve=CompoundedInArrears(index, lookback=5, lockout=2),
+        spread=0.02,
+        floor=0.0,
+        rounding=5,
+        prepayment=StepDown([relativedelta(months=6)], [0.01])
+    )
+    starts = [datetime(2020, 1, 15), datetime(2020, 4, 15), datetime(2020, 7, 15), datetime(2020, 10, 15)]
+    ends = starts[1:] + [datetime(2021, 1, 15)]
+    expected = np.round(index.compounded_rates(starts, ends, 5, 2), 5) + 0.02
+    np.testing.assert_allclose(borrowing.cash_flows().interest_rate, expected)
+    assert borrowing.repayment_amount(datetime(2020, 5, 1)) > 1_010_000.0
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+
+from cred.businessdays import as_datetimes
+from cred import Defeasance, FixedRateBorrowing, FlatCurve, Monthly, Portfolio, ZeroCurve
+from cred.sensitivity import Sensitivity
+
+
+BASE = datetime(2020, 1, 1)
+
+
+@pytest.fixture
+def curve():
+    return ZeroCurve(BASE, [datetime(2021, 1, 1), datetime(2025, 1, 1), datetime(2030, 1, 1)], [0.01, 0.02, 0.025])
+
+
+@pytest.fixture
+def borrowing(curve):
+    return FixedRateBorrowing(BASE, datetime(2030, 1, 1), Monthly(1), 1_000_000.0, 0.04, amort_periods=360,
+                              prepayment=Defeasance(df_func=curve, open_dt_offset=relativedelta(months=-3)))
+
+
+def pv(borrowing, df_func):
+    cfs = borrowing.cash_flows()
+    return sum(payment * df_func(BASE, dt) for payment, dt in zip(cfs.payment, as_datetimes(cfs.pmt_date)))
+
+
+def test_key_rates_add_up_to_parallel(curve):
+    sensitivity = Sensitivity(curve, BASE, tenors=[1, 5, 10])
+    assert sensitivity.labels == ['parallel', '1y', '5y', '10y']
+    shifts = sensitivity.shifts(np.arange(np.datetime64('2020-01-01'), np.datetime64('2045-01-01'), 30))
+    assert shifts[1:].sum(axis=0) == pytest.approx(shifts[0])
+    assert sensitivity.shifts(['2024-12-31', '2027-07-02', '2040-01-01']) == pytest.approx(
+        np.array([[1, 1, 1], [0, 0, 0], [1, 0.5, 0], [0, 0.5, 1]]) * 1e-4, abs=1e-6)
+
+
+def test_values_match_bumped_curve(borrowing, curve):
+    sensitivity = Sensitivity(curve, BASE, size=0.01)
+    values = sensitivity.values(borrowing)
+    assert values[0] == pytest.approx(pv(borrowing, curve))
+
+    def bumped(dt1, dt2):
+        return curve(dt1, dt2) * np.exp(-0.01 * (dt2 - dt1).days / 365)
+    assert values[1] == pytest.approx(pv(borrowing, bumped))
+    assert sensitivity.dv01(borrowing)[1:].sum() == pytest.approx(sensitivity.dv01(borrowing)[0], rel=1e-2)
+
+
+def test_dv01_matches_finite_difference(borrowing):
+    curve = FlatCurve(0.03)
+    dv01 = Sensitivity(curve, BASE, tenors=[]).dv01(borrowing)
+    assert dv01[0] == pytest.approx(pv(borrowing, FlatCurve(0.0301)) - pv(borrowing, curve))
+    assert dv01[0] < 0
+
+
+def test_defeasance_costs(borrowing, curve):
+    dts = [datetime(2019, 6, 1), datetime(2020, 1, 1), datetime(2023, 2, 14), datetime(2029, 11, 15),
+           datetime(2031, 1, 1)]
+    sensitivity = Sensitivity(curve, datetime(2019, 6, 1))
+    costs = sensitivity.defeasance_costs(borrowing, dts)
+    assert costs.shape == (12, 5)
+    np.testing.assert_allclose(costs[0], borrowing.prepayment.required_repayments(borrowing, dts), rtol=1e-12)
+    assert np.isnan(costs[:, [0, 4]]).all()
+    assert costs[:, 3] == pytest.approx(np.full(12, costs[0, 3]))
+
+    dv01 = sensitivity.defeasance_dv01(borrowing, dts[1:3])
+    assert (dv01[0] < 0).all()
+    assert dv01[1:].sum(axis=0) == pytest.approx(dv01[0], rel=1e-3)
+
+    with pytest.raises(ValueError):
+        Sensitivity(curve, datetime(2021, 1, 1)).defeasance_costs(borrowing, dts[1:2])
+
+
+def test_portfolio_values(borrowing, curve):
+    other = FixedRateBorrowing(BASE, datetime(2025, 1, 1), Monthly(1), 500_000.0, 0.05)
+    sensitivity = Sensitivity(curve, datetime(2022, 1, 1))
+    values = sensitivity.portfolio_values(Portfolio([borrowing, other]))
+    np.testing.assert_allclose(values, np.column_stack([sensitivity.values(borrowing), sensitivity.values(other)]))
+    np.testing.assert_allclose(sensitivity.portfolio_dv01(Portfolio([other]))[:, 0], sensitivity.dv01(other))
@@ -0,0 +1,87 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+
+from dateutil.relativedelta import relativedelta
+import numpy as np
+import pytest
+
+from cred import FixedRateBorrowing, FederalReserveHolidays, Portfolio, following
+from cred.shared import SharedCashFlows, shared_cash_flows
+
+
+@pytest.fixture
+def portfolio():
+    return Portfolio([
+        FixedRateBorrowing(
+            start_date=datetime(2020, 1, 1),
+            end_date=datetime(2021 + i % 4, 1, 1),
+            freq=relativedelta(months=1),
+            initial_principal=1_000_000.0 + 1000 * i,
+            coupon=0.04 + 0.001 * i,
+            amort_periods=360 if i % 2 else None,
+            holiday_calendar=FederalReserveHolidays(),
+            pmt_convention=following
+        )
+        for i in range(9)
+    ])
+
+
+def assert_matches(result, expected):
+    for f in SharedCashFlows.fields:
+        np.testing.assert_array_equal(getattr(result, f), getattr(expected, f))
+
+
+@pytest.mark.parametrize('workers,chunksize', [(1, None), (2, None), (2, 1), (3, 4)])
+def test_shared_cash_flows(portfolio, workers, chunksize):
+    expected = portfolio.cash_flows()
+    with portfolio.shared_cash_flows(workers=workers, chunksize=chunksize) as result:
+        assert len(result) == len(expected.payment)
+        assert_matches(result, expected)
+        np.testing.assert_array_equal(result.offsets, portfolio.offsets())
+
+
+def test_shared_cash_flows_executor(portfolio):
+    expected = portfolio.cash_flows()
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        with shared_cash_flows(portfolio.borrowings, chunksize=2, executor=executor) as result:
+            assert_matches(result, expected)
+
+
+def test_shared_cash_flows_read_only(portfolio):
+    with portfolio.shared_cash_flows(workers=1) as result:
+        with pytest.raises(ValueError):
+            result.payment[0] = 0.0
+
+
+def test_close_frees_memory(portfolio):
+    result = portfolio.shared_cash_flows(workers=1)
+    name = result.layout()[0][1]
+    result.close()
+    assert result.closed
+    assert not hasattr(result, 'payment')
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+
+def test_arrays_outlive_close(portfolio):
+    expected = portfolio.cash_flows()
+    result = portfolio.shared_cash_flows(workers=1)
+    payment, end_date = result.payment, result.end_date[:5]
+    result.close()
+    assert result.closed
+    np.testing.assert_array_equal(payment, expected.payment)
+    np.testing.assert_array_equal(end_date, expected.end_date[:5])
+
+
+def test_empty():
+    with shared_cash_flows([], workers=2) as result:
+        assert len(result) == 0
+        assert len(result.payment) == 0
+
+
+def test_period_count(portfolio):
+    for borrowing in portfolio:
+        count = borrowing.period_count()
+        assert count == len(borrowing.cash_flows().payment)
+        assert borrowing.period_count() == count
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from datetime import datetime
+
+from cred import FixedRateBorrowing, Monthly
+from cred.solvers import amort_periods_for_payment, coupon_for_payment, debt_service_coverage, dscr_payment, \
+    level_payment, principal_for_payment
+
+
+def borrowing(coupon, amort_periods, principal=1_000_000.0):
+    return FixedRateBorrowing(datetime(2020, 1, 1), datetime(2030, 1, 1), Monthly(1), principal, coupon,
+                              amort_periods=amort_periods)
+
+
+def test_level_payment_matches_schedule():
+    payments = borrowing(0.045, 360).cash_flows().payment
+    assert level_payment(1_000_000.0, 0.045, 360) == pytest.approx(payments[1:-1])
+    assert level_payment(1_200.0, 0.0, 12) == pytest.approx(100.0)
+    np.testing.assert_allclose(level_payment([1.0, 2.0], [0.03, 0.06], 360),
+                               [level_payment(1.0, 0.03, 360), level_payment(2.0, 0.06, 360)])
+
+
+def test_coupon_for_payment():
+    coupons = np.array([-0.01, 0.0, 1e-10, 0.025, 0.045, 0.12, 0.5])
+    periods = np.array([360, 300, 240, 360, 120, 60, 360])
+    principal = np.linspace(1e5, 1e7, 7)
+    solved = coupon_for_payment(level_payment(principal, coupons, periods), principal, periods)
+    np.testing.assert_allclose(solved, coupons, atol=1e-11)
+
+    coupon = coupon_for_payment(6_000.0, 1_000_000.0, 360)
+    assert borrowing(float(coupon), 360).cash_flows().payment[1:-1] == pytest.approx(6_000.0)
+    assert np.isnan(coupon_for_payment([0.0, -1.0], 1_000_000.0, 360)).all()
+
+
+def test_amort_periods_and_principal_for_payment():
+    payment = level_payment(1_000_000.0, 0.05, 300)
+    assert amort_periods_for_payment(payment, 1_000_000.0, 0.05) == pytest.approx(300)
+    assert amort_periods_for_payment(100.0, 1_200.0, 0.0) == pytest.approx(12)
+    assert amort_periods_for_payment(4_000.0, 1_000_000.0, 0.05) == np.inf
+    assert principal_for_payment(payment, 0.05, 300) == pytest.approx(1_000_000.0)
+
+
+def test_dscr():
+    noi = np.array([100_000.0, 250_000.0, 80_000.0])
+    payment = dscr_payment(noi, 1.25)
+    assert debt_service_coverage(noi, principal_for_payment(payment, 0.05, 360), 0.05, 360) == pytest.approx(1.25)
+
+    periods = np.ceil(amort_periods_for_payment(payment, [1_000_000.0, 3_000_000.0, 2_000_000.0], 0.04))
+    dscrs = debt_service_coverage(noi, [1_000_000.0, 3_000_000.0, 2_000_000.0], 0.04, periods)
+    assert np.isfinite(periods[:2]).all() and periods[2] == np.inf
+    assert (dscrs[:2] >= 1.25).all()
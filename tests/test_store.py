@@ -0,0 +1,116 @@
+from datetime import datetime
+import os
+import pickle
+
+from dateutil.relativedelta import relativedelta
+import numpy as np
+import pandas as pd
+import pytest
+
+from cred import FixedRateBorrowing, FederalReserveHolidays, following
+from cred.store import ScheduleStore, ScheduleStoreWriter, write_store
+
+
+def make_borrowing(i):
+    return FixedRateBorrowing(
+        start_date=datetime(2020, 1, 15),
+        end_date=datetime(2022 + i % 3, 1, 15),
+        first_reg_start=datetime(2020, 2, 1),
+        freq=relativedelta(months=1),
+        initial_principal=1_000_000.0 + 1000 * i,
+        coupon=0.04,
+        amort_periods=360 if i % 2 else [10_000.0] * 60,
+        holiday_calendar=FederalReserveHolidays(),
+        pmt_convention=following
+    )
+
+
+@pytest.fixture
+def borrowings():
+    return [make_borrowing(i) for i in range(5)]
+
+
+@pytest.fixture
+def store(tmp_path, borrowings):
+    return write_store(tmp_path / 'store', borrowings)
+
+
+def assert_cash_flows_equal(actual, expected):
+    for a, e in zip(actual, expected):
+        np.testing.assert_array_equal(a, e)
+
+
+def test_write_and_read(store, borrowings):
+    assert len(store) == 5
+    assert store.rows == sum(len(b.cash_flows().payment) for b in borrowings)
+    assert store.keys() == [b.schedule_fingerprint() for b in borrowings]
+    for b in borrowings:
+        assert b in store
+        assert_cash_flows_equal(store.get(b), b.cash_flows())
+        assert_cash_flows_equal(store.get(b.schedule_fingerprint()), b.cash_flows())
+
+
+def test_memory_mapped(store, borrowings):
+    assert isinstance(store._columns['payment'], np.memmap)
+    assert not store.get(borrowings[0]).payment.flags.writeable
+
+
+def test_missing(store):
+    other = make_borrowing(7)
+    other.coupon = 0.05
+    assert other not in store
+    assert store.get(other) is None
+
+
+def test_date_range(store, borrowings):
+    cfs = borrowings[1].cash_flows()
+    selected = store.get(borrowings[1], datetime(2020, 6, 1), datetime(2021, 1, 31))
+    mask = (cfs.pmt_date >= np.datetime64('2020-06-01')) & (cfs.pmt_date <= np.datetime64('2021-01-31'))
+    assert_cash_flows_equal(selected, [arr[mask] for arr in cfs])
+    assert len(store.get(borrowings[1], first_dt=datetime(2030, 1, 1)).payment) == 0
+    with pytest.raises(ValueError):
+        store.get(borrowings[1], datetime(2020, 6, 1), by='payment')
+
+
+def test_duplicates(tmp_path):
+    with ScheduleStoreWriter(tmp_path / 'store') as writer:
+        assert writer.add(make_borrowing(1))
+        assert not writer.add(make_borrowing(1))
+    assert len(ScheduleStore(tmp_path / 'store')) == 1
+    assert not any(f.endswith('.tmp') for f in os.listdir(tmp_path / 'store'))
+
+
+def test_empty(tmp_path):
+    store = write_store(tmp_path / 'store', [])
+    assert len(store) == 0
+    assert make_borrowing(0) not in store
+
+
+def test_borrowing_uses_store(store):
+    borrowing = make_borrowing(3)
+    expected = borrowing.schedule()
+    expected_payments = borrowing.payments()
+
+    borrowing = make_borrowing(3)
+    borrowing.schedule_store = store
+    borrowing._schedule_periods = None  # fails if periods are built
+    assert_cash_flows_equal(borrowing.cash_flows(), store.get(borrowing))
+    pd.testing.assert_frame_equal(borrowing.schedule(), expected)
+    assert borrowing.payments() == expected_payments
+
+
+def test_borrowing_changed_terms(store):
+    expected = make_borrowing(3)
+    expected.coupon = 0.06
+    borrowing = make_borrowing(3)
+    borrowing.schedule_store = store
+    borrowing.coupon = 0.06
+    assert borrowing not in store
+    pd.testing.assert_frame_equal(borrowing.schedule(), expected.schedule())
+
+
+def test_pickle_drops_store(store):
+    borrowing = make_borrowing(3)
+    borrowing.schedule_store = store
+    assert pickle.loads(pickle.dumps(borrowing)).schedule_store is None
+
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from cred import FixedRateBorrowing, Monthly, OpenPrepayment, Portfolio
+from cred.synthetic import LoanGenerator, TAPE_COLUMNS, synthetic_borrowings, write_tape
+from cred.tape import LoanTape, read_amortizations
+
+
+@pytest.fixture
+def generator():
+    return LoanGenerator(seed=7, block_size=50)
+
+
+def test_deterministic(generator):
+    columns = generator.columns(0, 120)
+    assert list(columns) == list(TAPE_COLUMNS)
+    assert len(columns['loan_id']) == 120
+    again = LoanGenerator(seed=7, block_size=50).columns(0, 120)
+    for c in TAPE_COLUMNS:
+        assert (columns[c] == again[c]).all()
+    other = LoanGenerator(seed=8, block_size=50).columns(0, 120)
+    assert (columns['coupon'] != other['coupon']).any()
+
+
+def test_ranges_independent(generator):
+    full = generator.columns(0, 120)
+    part = LoanGenerator(seed=7, block_size=50).columns(45, 105)
+    for c in TAPE_COLUMNS:
+        assert (part[c] == full[c][45:105]).all()
+    assert len(generator.columns(10, 10)['loan_id']) == 0
+    with pytest.raises(ValueError):
+        generator.columns(10, 5)
+
+
+def test_term_mix():
+    columns = LoanGenerator(seed=1).columns(0, 2000)
+    assert set(columns['prepayment']) == {'', 'open', 'step_down', 'defeasance', 'yield_maintenance'}
+    assert set(columns['freq']) == {'M', 'Q', 'S', 'A'}
+    assert (columns['first_reg_start'] != '').any()
+    assert (columns['amort_schedule'] != '').any()
+    assert (columns['io_periods'] != '').any()
+    assert set(columns['holiday_calendar']) == {'', 'federal_reserve', 'london'}
+
+
+def test_params():
+    columns = LoanGenerator(params={'prepayment': {'open': 1.0}, 'freq': {'Q': 1.0}, 'stub': 0.0}).columns(0, 100)
+    assert set(columns['prepayment']) == {'open'}
+    assert set(columns['freq']) == {'Q'}
+    assert (columns['first_reg_start'] == '').all()
+    with pytest.raises(ValueError):
+        LoanGenerator(params={'pmt_convention': {'next_day': 1.0}})
+    with pytest.raises(ValueError):
+        LoanGenerator(params={'freq': {'M': 0.0}})
+
+
+def test_borrowings_pay_off(generator):
+    for loan_id, borrowing in generator.borrowings(150):
+        assert isinstance(borrowing, FixedRateBorrowing)
+        cfs = borrowing.cash_flows()
+        assert cfs.eop_principal[-1] == pytest.approx(0.0, abs=1e-4)
+        assert cfs.principal_pmt.sum() == pytest.approx(borrowing.initial_principal)
+        if hasattr(borrowing.amort_periods, '__getitem__'):
+            assert len(borrowing.amort_periods) == len(cfs.payment)
+            assert borrowing.amort_periods == generator.amortization(loan_id)
+        if borrowing.prepayment is not None:
+            assert borrowing.repayment_amount(borrowing.first_reg_start) > 0
+        if hasattr(borrowing.prepayment, 'open_date'):
+            open_date = borrowing.prepayment.open_date(borrowing)
+            assert borrowing.start_date < open_date < borrowing.end_date
+            assert any(open_date == borrowing.end_date + Monthly(-m) for m in (3, 6, 12))
+            at_par = OpenPrepayment(borrowing.prepayment.period_breakage).required_repayment(borrowing, open_date)
+            assert borrowing.repayment_amount(open_date) == pytest.approx(at_par)
+
+
+def test_custom_amortization_errors(generator):
+    columns = generator.columns(0, 150)
+    ref = columns['loan_id'][columns['amort_schedule'] == ''][0]
+    with pytest.raises(ValueError):
+        generator.amortization(ref)
+    with pytest.raises(ValueError):
+        generator.amortization('loan')
+
+
+def test_write_tape(tmp_path, generator):
+    path, amortizations_path = generator.write_tape(str(tmp_path / 'tape.csv'), 150, start=25)
+    assert amortizations_path == str(tmp_path / 'tape_amortizations.csv')
+    tape = LoanTape(path, amortizations=read_amortizations(amortizations_path), curve=generator.curve)
+    loans = list(tape)
+    assert len(loans) == 150
+    for (tape_id, tape_borrowing), (loan_id, borrowing) in zip(loans, generator.borrowings(150, start=25)):
+        assert tape_id == loan_id
+        assert tape_borrowing.fingerprint() == borrowing.fingerprint()
+
+
+def test_write_tape_without_custom_schedules(tmp_path):
+    params = {'amortization': {'amortizing': 1.0}, 'prepayment': {None: 1.0, 'open': 1.0}}
+    path, amortizations_path = write_tape(str(tmp_path / 'tape.csv'), 20, params=params)
+    assert amortizations_path is None
+    assert not (tmp_path / 'tape_amortizations.csv').exists()
+    assert len(list(LoanTape(path))) == 20
+
+
+def test_portfolio(generator):
+    portfolio = generator.portfolio(20, start=10)
+    assert isinstance(portfolio, Portfolio)
+    assert len(portfolio) == 20
+    assert len(synthetic_borrowings(5)) == 5
+    assert np.isfinite(portfolio.cash_flows().payment).all()
@@ -0,0 +1,136 @@
+from datetime import datetime
+import csv
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cred import FixedRateBorrowing, FederalReserveHolidays, FlatCurve, Monthly, following
+from cred.interest_rate import thirty360
+from cred.tape import LoanTape, SCHEDULE_COLUMNS, read_amortizations, stream_cash_flows, write_schedules
+
+
+ROWS = [
+    {'loan_id': 'A', 'start_date': '2020-01-01', 'end_date': '2022-01-01', 'freq': 'M', 'initial_principal': '1000000',
+     'coupon': '0.12', 'amort_schedule': 'custom', 'year_frac': 'thirty360'},
+    {'loan_id': 'B', 'start_date': '2020-01-15', 'end_date': '2025-01-15', 'freq': '1', 'initial_principal': '500000',
+     'coupon': '0.05', 'amort_periods': '360', 'io_periods': '12', 'pmt_convention': 'following',
+     'holiday_calendar': 'federal_reserve'},
+    {'loan_id': 'C', 'start_date': '2020-02-01', 'end_date': '2023-02-01', 'first_reg_start': '2020-03-01',
+     'freq': 'Q', 'initial_principal': '250000', 'coupon': '0.04', 'holiday_calendar': 'federal_reserve'},
+]
+
+
+def write_csv(path, rows):
+    columns = sorted({c for row in rows for c in row})
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+@pytest.fixture
+def amortizations(tmp_path):
+    rows = [{'amort_schedule': 'custom', 'principal_payment': amt} for amt in [5_000.0] * 23 + [885000.0]]
+    return read_amortizations(write_csv(tmp_path / 'amortizations.csv', rows))
+
+
+@pytest.fixture
+def tape(tmp_path, amortizations):
+    return LoanTape(write_csv(tmp_path / 'tape.csv', ROWS), amortizations=amortizations, chunksize=2)
+
+
+@pytest.fixture
+def expected():
+    return [
+        FixedRateBorrowing(start_date=datetime(2020, 1, 1), end_date=datetime(2022, 1, 1), freq=Monthly(1),
+                           initial_principal=1_000_000.0, coupon=0.12, amort_periods=[5_000.0] * 23 + [885000.0],
+                           year_frac=thirty360),
+        FixedRateBorrowing(start_date=datetime(2020, 1, 15), end_date=datetime(2025, 1, 15), freq=Monthly(1),
+                           initial_principal=500_000.0, coupon=0.05, amort_periods=360, io_periods=12,
+                           pmt_convention=following, holiday_calendar=FederalReserveHolidays()),
+        FixedRateBorrowing(start_date=datetime(2020, 2, 1), end_date=datetime(2023, 2, 1),
+                           first_reg_start=datetime(2020, 3, 1), freq=Monthly(3), initial_principal=250_000.0,
+                           coupon=0.04, holiday_calendar=FederalReserveHolidays())
+    ]
+
+
+def test_chunks(tape):
+    chunks = list(tape.chunks())
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert [loan_id for chunk in chunks for loan_id, _ in chunk] == ['A', 'B', 'C']
+
+
+def test_borrowings(tape, expected):
+    for (_, borrowing), exp in zip(tape, expected):
+        pd.testing.assert_frame_equal(borrowing.schedule(), exp.schedule())
+
+
+def test_shared_calendar(tape):
+    borrowings = [borrowing for _, borrowing in tape]
+    assert borrowings[1].holiday_calendar is borrowings[2].holiday_calendar
+    assert borrowings[0].holiday_calendar is None
+
+
+def test_column_mapping(tmp_path):
+    rows = [{'id': 'X', 'start': '01/01/2020', 'maturity': '01/01/2021', 'balance': '100', 'rate': '0.1'}]
+    tape = LoanTape(write_csv(tmp_path / 'tape.csv', rows), date_format='%m/%d/%Y',
+                    columns={'loan_id': 'id', 'start_date': 'start', 'end_date': 'maturity',
+                             'initial_principal': 'balance', 'coupon': 'rate'})
+    [(loan_id, borrowing)] = list(tape)
+    assert loan_id == 'X'
+    assert borrowing.end_date == datetime(2021, 1, 1)
+    assert borrowing.coupon == 0.1
+
+
+def test_default_loan_ids(tmp_path):
+    rows = [{k: v for k, v in row.items() if k != 'loan_id'} for row in ROWS[1:]]
+    assert [loan_id for loan_id, _ in LoanTape(write_csv(tmp_path / 'tape.csv', rows))] == [0, 1]
+
+
+def test_invalid_row(tmp_path):
+    rows = [dict(ROWS[1]), dict(ROWS[1], pmt_convention='nearest')]
+    with pytest.raises(ValueError, match='row 2'):
+        list(LoanTape(write_csv(tmp_path / 'tape.csv', rows)))
+
+
+def test_missing_amortization(tmp_path):
+    with pytest.raises(ValueError):
+        list(LoanTape(write_csv(tmp_path / 'tape.csv', ROWS[:1])))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_stream_cash_flows(tape, expected, workers):
+    results = list(stream_cash_flows(tape, workers=workers))
+    assert [len(loan_ids) for loan_ids, _, _ in results] == [2, 1]
+    cash_flows = [cfs for _, _, chunk in results for cfs in chunk]
+    for cfs, exp in zip(cash_flows, expected):
+        for actual, exp_arr in zip(cfs, exp.cash_flows()):
+            np.testing.assert_array_equal(actual, exp_arr)
+
+
+def test_write_schedules(tape, expected, tmp_path):
+    path = tmp_path / 'schedules.csv'
+    loans, rows = write_schedules(tape, path)
+    assert loans == 3
+    out = pd.read_csv(path, parse_dates=['start_date', 'end_date', 'pmt_date'])
+    assert tuple(out.columns) == SCHEDULE_COLUMNS
+    assert len(out) == rows == sum(len(b.cash_flows().payment) for b in expected)
+    loan_b = out[out.loan_id == 'B'].reset_index(drop=True)
+    schedule = expected[1].schedule()
+    np.testing.assert_allclose(loan_b.payment, schedule.payment)
+    np.testing.assert_array_equal(loan_b.pmt_date, schedule.payment_date)
+
+
+@pytest.mark.parametrize('prepayment', ['defeasance', 'yield_maintenance'])
+def test_open_date(tmp_path, prepayment):
+    rows = [{'start_date': '2020-01-01', 'end_date': '2030-01-01', 'initial_principal': '100', 'coupon': '0.05',
+             'prepayment': prepayment, 'open_months': '117'},
+            {'start_date': '2020-01-15', 'end_date': '2027-06-30', 'initial_principal': '100', 'coupon': '0.05',
+             'prepayment': prepayment, 'open_months': '87'}]
+    borrowings = [b for _, b in LoanTape(write_csv(tmp_path / 'tape.csv', rows), curve=FlatCurve(0.02))]
+    assert borrowings[0].prepayment.open_date(borrowings[0]) == datetime(2029, 10, 1)
+    assert borrowings[1].prepayment.open_date(borrowings[1]) == datetime(2027, 4, 30)
+    for borrowing in borrowings:
+        assert borrowing.start_date < borrowing.prepayment.open_date(borrowing) < borrowing.end_date